@@ -0,0 +1,78 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/bench_compression.py
+
+ Benchmarks the camera-frame compression codecs (see payload_codecs.py):
+ CPU cost (encode/decode) vs bytes saved per resolution, so that a codec
+ can be chosen per deployment.
+ Runs outside of UE4 on synthetic game-like frames (static background,
+ a few moving sprites).
+
+ usage: python bench_compression.py [num_frames]
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import sys
+import time
+import numpy as np
+
+import payload_codecs
+
+
+RESOLUTIONS = [(84, 84), (160, 120), (320, 240), (640, 480)]
+
+
+def make_frames(width, height, num_frames, num_sprites=8, seed=0):
+    rng = np.random.RandomState(seed)
+    background = np.zeros((width, height, 3), dtype=np.uint8)
+    background[:, :, 2] = np.linspace(0, 80, height, dtype=np.uint8)[None, :]  # a simple gradient
+    size = max(2, width // 16)
+    positions = rng.randint(0, [width - size, height - size], size=(num_sprites, 2))
+    velocities = rng.randint(-2, 3, size=(num_sprites, 2))
+    colors = rng.randint(0, 256, size=(num_sprites, 3), dtype=np.uint8)
+    frames = []
+    for _ in range(num_frames):
+        frame = background.copy()
+        positions = np.clip(positions + velocities, 0, [width - size, height - size])
+        for (x, y), color in zip(positions, colors):
+            frame[x:x + size, y:y + size] = color
+        frames.append(frame)
+    return frames
+
+
+def bench(codec, frames):
+    encoder = payload_codecs.PayloadEncoder(codec, threshold=0)
+    decoder = payload_codecs.PayloadDecoder()
+    encode_time = decode_time = 0.0
+    num_bytes = 0
+    for frame in frames:
+        t = time.perf_counter()
+        encoded = encoder.encode_obs_dict({"Camera/camera": frame})
+        encode_time += time.perf_counter() - t
+        num_bytes += len(encoded["Camera/camera"]["data"])
+        t = time.perf_counter()
+        decoded = decoder.decode_obs_dict(encoded)
+        decode_time += time.perf_counter() - t
+        assert np.array_equal(decoded["Camera/camera"], frame)
+    n = len(frames)
+    return 1e3 * encode_time / n, 1e3 * decode_time / n, num_bytes / n
+
+
+def main(num_frames=200):
+    codecs = payload_codecs.available_codecs()
+    print("codecs: {} ({} frames per resolution)".format(codecs, num_frames))
+    print("{:>9} {:>11} {:>10} {:>10} {:>12} {:>7}".format("res", "codec", "enc ms", "dec ms", "bytes/frame", "ratio"))
+    for width, height in RESOLUTIONS:
+        frames = make_frames(width, height, num_frames)
+        raw = frames[0].nbytes
+        print("{:>9} {:>11} {:>10} {:>10} {:>12} {:>7}".format("{}x{}".format(width, height), "raw", "-", "-", raw, "1.0"))
+        for codec in codecs:
+            enc, dec, size = bench(codec, frames)
+            print("{:>9} {:>11} {:>10.3f} {:>10.3f} {:>12.0f} {:>7.1f}".format("", codec, enc, dec, size, raw / size))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,84 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/bench_record_layout.py
+
+ Benchmarks msgpack obs_dict step responses against fixed-layout binary
+ records (see record_layout.py; with and without quantization): bytes per
+ response and encode/decode time.
+ Runs outside of UE4 on a synthetic game-like obs_dict (n vector
+ observers with Location/Rotation/Velocity, a few scalars and bools and
+ an optional camera).
+
+ usage: python bench_record_layout.py [num_observers] [camera_size]
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import sys
+import time
+import msgpack
+import msgpack_numpy as mnp
+import numpy as np
+
+import record_layout
+
+
+mnp.patch()
+
+
+def make_game(num_observers, camera_size, seed=0):
+    rng = np.random.RandomState(seed)
+    observation_space_desc, obs_dict = {}, {}
+    for i in range(num_observers):
+        for prop in ("Location", "Rotation", "Velocity"):
+            key = "Observer{}/{}".format(i, prop)
+            observation_space_desc[key] = {"type": "Continuous", "shape": (3,), "min": [-5000.0] * 3, "max": [5000.0] * 3}
+            obs_dict[key] = tuple(rng.uniform(-5000.0, 5000.0, size=3))  # as read from an FVector
+        observation_space_desc["Observer{}/Health".format(i)] = {"type": "Continuous", "shape": (1,)}
+        obs_dict["Observer{}/Health".format(i)] = float(rng.uniform(0.0, 100.0))
+        observation_space_desc["Observer{}/bIsJumping".format(i)] = {"type": "Bool"}
+        obs_dict["Observer{}/bIsJumping".format(i)] = bool(rng.randint(2))
+    if camera_size:
+        observation_space_desc["Camera/camera"] = {"type": "IntBox", "shape": (camera_size, camera_size, 3), "min": 0, "max": 255}
+        obs_dict["Camera/camera"] = rng.randint(0, 256, size=(camera_size, camera_size, 3)).astype(np.uint8)
+    return observation_space_desc, obs_dict
+
+
+def timeit(fn, num=2000):
+    start = time.perf_counter()
+    for _ in range(num):
+        result = fn()
+    return (time.perf_counter() - start) / num, result
+
+
+def main():
+    num_observers = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    camera_size = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    desc, obs_dict = make_game(num_observers, camera_size)
+    response = {"status": "ok", "obs_dict": obs_dict, "_reward": 0.5, "_is_terminal": False}
+
+    print("{} observers, camera={}".format(num_observers, camera_size or "none"))
+    print("{:>22} {:>10} {:>12} {:>12}".format("format", "bytes", "encode us", "decode us"))
+    encode_time, packed = timeit(lambda: msgpack.packb(response))
+    decode_time, _ = timeit(lambda: msgpack.unpackb(packed))
+    print("{:>22} {:>10} {:>12.1f} {:>12.1f}".format("msgpack obs_dict", len(packed), encode_time * 1e6, decode_time * 1e6))
+
+    vector_keys = [key for key, d in desc.items() if d["type"] == "Continuous" and d["shape"] == (3,)]
+    for name, quantize in [("record", None), ("record+float16", {k: "float16" for k in vector_keys}),
+                           ("record+int16", {k: "int16" for k in vector_keys})]:
+        layout = record_layout.RecordLayout(record_layout.compile_fields(desc, quantize))
+
+        def encode():
+            record, _, _ = layout.encode(obs_dict, response["_reward"], response["_is_terminal"])
+            return msgpack.packb({"status": "ok", "record": record, "obs_dict": {}})
+        encode_time, packed = timeit(encode)
+        decode_time, decoded = timeit(lambda: layout.decode(msgpack.unpackb(packed)["record"]))
+        error = max(np.max(np.abs(layout.to_obs_dict(decoded)[k] - np.asarray(obs_dict[k]))) for k in vector_keys)
+        print("{:>22} {:>10} {:>12.1f} {:>12.1f}   (max abs. error: {:.3g})".format(
+            name, len(packed), encode_time * 1e6, decode_time * 1e6, error))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/bench_replay_buffer.py
+
+ Benchmarks the PrioritizedReplayBuffer (see replay_buffer.py) at 1M
+ transitions: memory per transition, batched add throughput and sample/
+ priority-update latency.
+
+ usage: python bench_replay_buffer.py [capacity] [--camera] [--storage-dir DIR]
+   --camera: adds an 84x84x3 camera observation (4-frame stacks); use
+   --storage-dir to memory-map the arrays if they don't fit into RAM.
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import argparse
+import time
+import numpy as np
+
+from replay_buffer import PrioritizedReplayBuffer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("capacity", type=int, nargs="?", default=1000000)
+    parser.add_argument("--camera", action="store_true")
+    parser.add_argument("--storage-dir")
+    args = parser.parse_args()
+
+    # a typical vector-obs spec (as returned by get_spec)
+    observation_space_desc = {"Observer{}/Location".format(i): {"type": "Continuous", "shape": (3,)} for i in range(8)}
+    observation_space_desc["Player/Health"] = {"type": "Continuous", "shape": (1,)}
+    observation_space_desc["Player/bIsFiring"] = {"type": "Bool"}
+    if args.camera:
+        observation_space_desc["Camera/camera"] = {"type": "IntBox", "shape": (84, 84, 3), "min": 0, "max": 255}
+
+    buffer = PrioritizedReplayBuffer(args.capacity, observation_space_desc, action_shape=(2,),
+                                     frame_stack=4 if args.camera else 1, storage_dir=args.storage_dir, seed=0)
+    print("capacity: {}  memory: {:.1f} MB  ({:.1f} bytes/transition)".format(
+        args.capacity, buffer.nbytes() / 1e6, buffer.nbytes() / args.capacity))
+
+    # fill with batches of 1000 transitions (episodes of 500 steps)
+    rng = np.random.RandomState(0)
+    batch = 1000
+    obs = {key: rng.randint(0, 255, size=(batch,) + tuple(desc.get("shape", (1,)))).astype(buffer.obs[key].dtype)
+           for key, desc in observation_space_desc.items()}
+    actions = rng.randn(batch, 2).astype(np.float32)
+    rewards = rng.randn(batch).astype(np.float32)
+    is_terminal = (np.arange(batch) % 500) == 499
+    start = time.perf_counter()
+    for _ in range(args.capacity // batch):
+        buffer.add_batch(obs, actions, rewards, is_terminal)
+    elapsed = time.perf_counter() - start
+    print("add_batch: {:.0f} transitions/s".format(args.capacity / elapsed))
+
+    for batch_size in (32, 256, 1024):
+        num = 200
+        start = time.perf_counter()
+        for _ in range(num):
+            sample = buffer.sample(batch_size)
+        sample_time = (time.perf_counter() - start) / num
+        start = time.perf_counter()
+        for _ in range(num):
+            buffer.update_priorities(sample["indices"], rng.rand(batch_size))
+        update_time = (time.perf_counter() - start) / num
+        print("batch {:5d}: sample {:8.1f}us  update_priorities {:8.1f}us".format(batch_size, 1e6 * sample_time, 1e6 * update_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/bench_transport.py
+
+ Benchmarks loopback TCP vs unix domain sockets for the small-message,
+ high-rate regime (vector observations only, no camera frames).
+ Runs outside of UE4: a stand-in server (same framing as ducandu_server)
+ answers each command with a fake obs_dict.
+
+ usage: python bench_transport.py [num_requests] [num_obs_keys]
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import msgpack
+
+from ducandu_client import DucanduClient
+
+
+def make_response(num_obs_keys):
+    obs_dict = {"Observer{}/Location".format(i): (float(i), 2.0 * i, 3.0 * i) for i in range(num_obs_keys)}
+    return {"status": "ok", "obs_dict": obs_dict, "_reward": 0.0, "_is_terminal": False}
+
+
+def run_stand_in_server(loop, response, host=None, port=None, path=None):
+    """
+    Starts a stand-in server on the given loop (in a background thread) and returns once it is listening.
+    """
+    packed = msgpack.packb(response)
+    framed = bytes("{:08d}".format(len(packed)), encoding="ascii") + packed
+
+    async def new_client_connected(reader, writer):
+        unpacker = msgpack.Unpacker()
+        while True:
+            data = await reader.read(8192)
+            if not data:
+                break
+            unpacker.feed(data)
+            for _ in unpacker:
+                writer.write(framed)
+
+    asyncio.set_event_loop(loop)
+    if path is not None:
+        coro = asyncio.start_unix_server(new_client_connected, path)
+    else:
+        coro = asyncio.start_server(new_client_connected, host, port)
+    server = loop.run_until_complete(coro)
+    ready = threading.Event()
+    loop.call_soon(ready.set)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    ready.wait()
+    return server
+
+
+def bench(client, num_requests):
+    latencies = []
+    message = {"cmd": "step", "delta_time": 1.0/60.0, "num_ticks": 4, "axes": [("MoveRight", 1.0)]}
+    # warm up
+    for _ in range(100):
+        client.request(message)
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        t = time.perf_counter()
+        client.request(message)
+        latencies.append(time.perf_counter() - t)
+    total = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "msgs/s": num_requests / total,
+        "mean_us": 1e6 * sum(latencies) / len(latencies),
+        "p50_us": 1e6 * latencies[len(latencies) // 2],
+        "p99_us": 1e6 * latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def main(num_requests=20000, num_obs_keys=10):
+    response = make_response(num_obs_keys)
+    print("response size: {} bytes; {} requests per transport".format(len(msgpack.packb(response)), num_requests))
+
+    tcp_loop = asyncio.new_event_loop()
+    tcp_server = run_stand_in_server(tcp_loop, response, host="127.0.0.1", port=0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    with DucanduClient(port=port, host="127.0.0.1") as client:
+        results = {"tcp": bench(client, num_requests)}
+
+    if hasattr(socket, "AF_UNIX"):
+        path = os.path.join(tempfile.mkdtemp(), "ducandu_bench.sock")
+        uds_loop = asyncio.new_event_loop()
+        run_stand_in_server(uds_loop, response, path=path)
+        with DucanduClient(socket_path=path) as client:
+            results["uds"] = bench(client, num_requests)
+    else:
+        print("unix domain sockets not supported on this platform")
+
+    for transport, r in results.items():
+        print("{:>4}: {:9.0f} msgs/s  mean={:7.1f}us  p50={:7.1f}us  p99={:7.1f}us".format(
+            transport, r["msgs/s"], r["mean_us"], r["p50_us"], r["p99_us"]))
+    if "uds" in results:
+        print("uds speedup (mean latency): {:.2f}x".format(results["tcp"]["mean_us"] / results["uds"]["mean_us"]))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
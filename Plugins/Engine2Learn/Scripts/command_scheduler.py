@@ -0,0 +1,159 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/command_scheduler.py
+
+ Schedules the execution of the server's command handlers on the game
+ thread (the ue_asyncio loop) between decoding and execution:
+ - each connection has a priority class (control, evaluation,
+   monitoring; see the server's 'schedule' command).
+ - control commands always run right away (in arrival order).
+ - lower-priority commands only run while the current frame's time
+   budget (shared with the control commands of that frame) lasts; the
+   rest is deferred to later frames. Each lower priority class still gets
+   at least one command per frame.
+ While commands are waiting, a ticker task runs once per frame (loop
+ iteration) to start each frame's budget accounting. It is started by the
+ first queued command and exits once all queues are empty (an idle server
+ has no per-frame overhead).
+ Queueing delays and execution times are reported per priority class.
+ Note: Handlers are not preempted: a single heavy command still runs to
+ completion once started.
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import asyncio
+import collections
+import time
+
+
+# the priority classes (highest first)
+PRIORITIES = ("control", "evaluation", "monitoring")
+
+# the default time budget (in seconds) per frame for executing commands
+DEFAULT_FRAME_BUDGET = 0.004
+
+
+class PriorityStats(object):
+    def __init__(self):
+        self.num_commands = 0
+        self.num_queued = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, delay, exec_time):
+        self.num_commands += 1
+        self.total_delay += delay
+        self.max_delay = max(self.max_delay, delay)
+        self.total_time += exec_time
+        self.max_time = max(self.max_time, exec_time)
+
+    def to_dict(self):
+        n = max(self.num_commands, 1)
+        return {"num_commands": self.num_commands, "num_queued": self.num_queued,
+                "mean_delay": self.total_delay / n, "max_delay": self.max_delay,
+                "mean_time": self.total_time / n, "max_time": self.max_time}
+
+
+class CommandScheduler(object):
+    """
+    Executes command handlers by priority class within a per-frame time budget.
+    """
+    def __init__(self, frame_budget=DEFAULT_FRAME_BUDGET):
+        self.frame_budget = frame_budget
+        self.queues = {priority: collections.deque() for priority in PRIORITIES}
+        self.stats = {priority: PriorityStats() for priority in PRIORITIES}
+        self.num_deferred_frames = 0  # frames after which lower-priority commands were left waiting
+        self._inline_time = 0.0  # time spent on (inline) control commands since the last tick (=within the last frame)
+        self._task = None  # the ticker task (runs once per frame)
+
+    def submit(self, priority, fn, *args):
+        """
+        Schedules fn(*args) for execution.
+
+        :param str priority: The priority class (one of PRIORITIES).
+        :return: A future resolving to fn's return value.
+        :rtype: asyncio.Future
+        """
+        if priority not in self.queues:
+            raise ValueError("Unknown priority class ({})! Needs to be one of {}.".format(priority, "|".join(PRIORITIES)))
+        future = asyncio.get_event_loop().create_future()
+        now = time.perf_counter()
+        # control commands run right away (unless other control commands are still waiting)
+        if priority == PRIORITIES[0] and not self.queues[priority]:
+            exec_time = self._execute(priority, fn, args, future, now)
+            # only counts against the budget of a frame with waiting commands (see `_tick`)
+            if self._is_ticking():
+                self._inline_time += exec_time
+            return future
+
+        self.queues[priority].append((fn, args, future, now))
+        self.stats[priority].num_queued = len(self.queues[priority])
+        if not self._is_ticking():
+            self._inline_time = 0.0
+            self._task = asyncio.ensure_future(self._tick())
+        return future
+
+    def close(self):
+        """
+        Stops the ticker task. Commands still waiting are not executed (their futures get cancelled).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            while queue:
+                queue.popleft()[2].cancel()
+            self.stats[priority].num_queued = 0
+
+    def _is_ticking(self):
+        return self._task is not None and not self._task.done()
+
+    def _execute(self, priority, fn, args, future, enqueued):
+        start = time.perf_counter()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        end = time.perf_counter()
+        self.stats[priority].add(start - enqueued, end - start)
+        return end - start
+
+    def _pending(self):
+        return any(self.queues.values())
+
+    async def _tick(self):
+        while self._pending():
+            # a new frame: its budget is shared with the control commands that ran inline since the last tick
+            start = time.perf_counter() - self._inline_time
+            self._inline_time = 0.0
+            self._run_frame(start)
+            # continue in the next loop iteration (=next frame)
+            await asyncio.sleep(0)
+
+    def _run_frame(self, start):
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            num_run = 0
+            while queue:
+                # lower priorities: only within the budget (but at least one command per class and frame, so a
+                # backlog of one class can't starve the classes below it)
+                if priority != PRIORITIES[0] and num_run > 0 and time.perf_counter() - start >= self.frame_budget:
+                    break
+                fn, args, future, enqueued = queue.popleft()
+                if future.cancelled():
+                    continue
+                self._execute(priority, fn, args, future, enqueued)
+                num_run += 1
+            self.stats[priority].num_queued = len(queue)
+        if self._pending():
+            self.num_deferred_frames += 1
+
+    def get_stats(self):
+        return {"frame_budget": self.frame_budget, "num_deferred_frames": self.num_deferred_frames,
+                "priorities": {priority: self.stats[priority].to_dict() for priority in PRIORITIES}}
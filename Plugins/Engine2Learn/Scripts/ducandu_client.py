@@ -0,0 +1,790 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/ducandu_client.py
+
+ Minimal clients for the ducandu_server running inside UE4: a blocking
+ one, an asyncio one and a thread-backed one (the latter two with
+ step_async/step_wait, so the learner can compute while the game ticks),
+ plus a streaming one for the server's free-running real-time mode.
+ Speaks the server's protocol: commands are sent as msgpack'd dicts,
+ responses come back as msgpack'd dicts prepended by an 8-byte (ascii)
+ length field.
+ Connects either via TCP (host + port) or via a unix domain socket
+ (socket_path; see the SocketPath setting of the Engine2Learn plugin).
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import queue
+import socket
+import threading
+import time
+import msgpack
+import msgpack_numpy as mnp
+
+import lazy_response
+import payload_codecs
+import record_layout
+import span_tracer
+
+
+# make msgpack use the numpy-specific de/encoders
+mnp.patch()
+
+# length of the ascii length field prepended to each response
+LEN_FIELD_SIZE = 8
+
+
+def decode_response(payload, decoder=None, layout=None, lazy=False):
+    """
+    Decodes a (length-field stripped) response from the server.
+
+    :param bytes payload: The msgpack'd response.
+    :param Union[PayloadDecoder,None] decoder: The decoder for compressed obs arrays (if compression was negotiated).
+    :param Union[RecordLayout,None] layout: The layout of binary step records (if a layout was negotiated). The
+        'record' field is then replaced by a (read-only) structured numpy view of the record and its _reward and
+        _is_terminal signals are copied into the response.
+    :param bool lazy: Whether to decode the obs entries only on access (see lazy_response.py; the payload buffer must
+        then not be reused). Only applies to responses of at least `lazy_response.LAZY_THRESHOLD` bytes and not if
+        compression was negotiated (delta frames have to be decoded in order).
+    :return: The response dict.
+    :rtype: dict
+    """
+    if lazy and decoder is None and len(payload) >= lazy_response.LAZY_THRESHOLD:
+        response = lazy_response.decode_lazy(payload)
+    else:
+        response = msgpack.unpackb(payload)
+    if layout is not None and "record" in response:
+        record = response["record"] = layout.decode(response["record"])
+        response["_reward"] = float(record["_reward"])
+        response["_is_terminal"] = bool(record["_is_terminal"])
+    # (with a layout, the obs_dict holds the observations that are not part of the record, e.g. compressed images)
+    if decoder is not None and "obs_dict" in response:
+        decoder.decode_obs_dict(response["obs_dict"])
+    return response
+
+
+class Commands(object):
+    """
+    Convenience wrappers for the server's commands. Each wrapper returns whatever the client's `request` returns (the
+    response dict for the blocking client, an awaitable for the asyncio client).
+    """
+    def seed(self, value):
+        return self.request({"cmd": "seed", "value": value})
+
+    def reset(self, setters=None, multi_agent=None):
+        """
+        :param Union[bool,None] multi_agent: Whether to return the batched multi-agent first observation (see
+            `step_multi_agent`). None for the server's default (multi-agent if the previous steps were).
+        """
+        return self.request(self._reset_message(setters, multi_agent))
+
+    @staticmethod
+    def _reset_message(setters, multi_agent):
+        message = {"cmd": "reset"}
+        if setters:
+            message["setters"] = setters
+        if multi_agent is not None:
+            message["multi_agent"] = multi_agent
+        return message
+
+    def step(self, delta_time=1.0/60.0, num_ticks=4, axes=None, actions=None):
+        return self.request(self._step_message(delta_time, num_ticks, axes, actions))
+
+    def auto_reset(self, enabled=True, setters=None):
+        """
+        Switches the server's auto-reset mode on/off: terminal steps trigger a background level restart (optionally
+        applying the given setters) and the next `reset` returns the new episode's first observation right away.
+        Until then, other state-changing commands (e.g. `step`) are refused while the restart is still pending.
+        """
+        return self.request({"cmd": "auto_reset", "enabled": enabled, "setters": setters})
+
+    @staticmethod
+    def _step_message(delta_time, num_ticks, axes, actions):
+        message = {"cmd": "step", "delta_time": delta_time, "num_ticks": num_ticks}
+        if axes:
+            message["axes"] = axes
+        if actions:
+            message["actions"] = actions
+        return message
+
+    def step_multi_agent(self, delta_time=1.0/60.0, num_ticks=4, agent_axes=None, agent_actions=None):
+        """
+        Steps all agents (player controllers) at once.
+
+        :param Union[dict,None] agent_axes: Dict mapping axis key names to N-length arrays (one float per agent).
+        :param Union[dict,None] agent_actions: Dict mapping action key names to N-length arrays (one bool per agent).
+        :return: The server's response with batched (first axis=agent) 'agent_obs_dict', '_reward' and '_is_terminal'.
+        :rtype: dict
+        """
+        message = {"cmd": "step", "delta_time": delta_time, "num_ticks": num_ticks,
+                   "agent_axes": agent_axes or {}, "agent_actions": agent_actions or {}}
+        return self.request(message)
+
+    def upload_policy(self, policy):
+        """
+        Uploads a small numpy policy spec (see embedded_policy.EmbeddedPolicy) to be run inside the game.
+        """
+        return self.request({"cmd": "upload_policy", "policy": policy})
+
+    def rollout(self, num_steps, seed=None, deterministic=False, delta_time=1.0/60.0, num_ticks=4):
+        """
+        Runs the uploaded policy inside the game for num_steps steps (or until is_terminal) and returns the trajectory.
+        """
+        message = {"cmd": "rollout", "num_steps": num_steps, "deterministic": deterministic,
+                   "delta_time": delta_time, "num_ticks": num_ticks}
+        if seed is not None:
+            message["seed"] = seed
+        return self.request(message)
+
+    def set(self, setters):
+        """
+        :param list setters: List of (selector, value[, is_relative]) setter commands. A value may also be a numpy
+            array with one row per uobject matched by the selector (same order as returned by `get`).
+        """
+        return self.request({"cmd": "set", "setters": setters})
+
+    def get(self, selectors):
+        """
+        Reads a property of all uobjects matched by each of the given actor[:comp]*:prop selectors.
+
+        :return: The server's response with (per selector) the stacked 'values' and the matched uobjects' 'names'.
+        :rtype: dict
+        """
+        return self.request({"cmd": "get", "selectors": list(selectors)})
+
+    def get_spec(self):
+        return self.request({"cmd": "get_spec"})
+
+    def get_stats(self):
+        return self.request({"cmd": "get_stats"})
+
+    def schedule(self, priority=None, frame_budget=None):
+        """
+        Sets this connection's priority class (control|evaluation|monitoring) and/or the server's per-frame command
+        time budget (in seconds) and returns the scheduler's stats.
+        """
+        message = {"cmd": "schedule"}
+        if priority is not None:
+            message["priority"] = priority
+        if frame_budget is not None:
+            message["frame_budget"] = frame_budget
+        return self.request(message)
+
+    def subscribe(self, every=1, max_queued=4):
+        """
+        Turns this connection into a read-only spectator connection: afterwards, the observations of each (every n-th)
+        step/reset of the game arrive as "broadcast" messages (receive them with `recv_broadcast`). The only command
+        the server accepts on a spectator connection is 'unsubscribe'.
+        """
+        return self.request({"cmd": "subscribe", "every": every, "max_queued": max_queued})
+
+    def unsubscribe(self):
+        """
+        Turns a spectator connection back into a normal one. Broadcast frames that arrive before the response are kept
+        for `recv_broadcast`.
+
+        :return: The server's response (the subscription's stats).
+        """
+        return self.request({"cmd": "unsubscribe"})
+
+    def trace(self, action="start", **kwargs):
+        """
+        Controls the server's span tracing (see the server's 'trace' command for the actions and kwargs).
+        """
+        return self.request(dict(kwargs, cmd="trace", action=action))
+
+    def profile(self, action="start", **kwargs):
+        """
+        Starts/stops profiling inside the game or fetches the results (see the server's 'profile' command for the kwargs).
+        """
+        return self.request(dict(kwargs, cmd="profile", action=action))
+
+
+class DucanduClient(Commands):
+    """
+    Blocking client connection into a running UE4 game (ducandu_server).
+    """
+    def __init__(self, port=None, host="localhost", socket_path=None, timeout=None, lazy=False):
+        """
+        :param Union[int,None] port: The TCP port the game listens on (ignored if socket_path is given).
+        :param str host: The TCP host the game runs on (ignored if socket_path is given).
+        :param Union[str,None] socket_path: The path of the game's unix domain socket (preferred if learner and game share a machine).
+        :param Union[float,None] timeout: Socket timeout in seconds (None for blocking forever).
+        :param bool lazy: Whether to decode obs_dict entries of large responses only when accessed (the response's
+            obs_dict is then a read-only `lazy_response.LazyObsDict`; numpy arrays are zero-copy views into the
+            response's own buffer).
+        """
+        if port is None and socket_path is None:
+            raise ValueError("Either port or socket_path has to be given!")
+        self.port = port
+        self.host = host
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.lazy = lazy
+        self.tracer = span_tracer.SpanTracer("engine2learn client")  # client-side spans (see `start_trace`)
+        self.socket = None
+        self._len_buffer = bytearray(LEN_FIELD_SIZE)
+        self._buffer = bytearray(0)  # reused receive buffer (grows to the largest response seen so far)
+        self.decoder = None  # PayloadDecoder for compressed obs arrays (set via negotiate_compression)
+        self.layout = None  # RecordLayout of binary step records (set via negotiate_layout)
+        self._broadcasts = collections.deque()  # broadcast frames received while waiting for a response
+
+    def connect(self):
+        if self.socket_path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(self.timeout)
+            self.socket.connect(self.socket_path)
+        else:
+            self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            # we send many small messages -> don't wait for more data to come (Nagle)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def send(self, message):
+        """
+        Sends a command dict to the server.
+        """
+        with self.tracer.span("send", {"cmd": message.get("cmd")}):
+            self.socket.sendall(msgpack.packb(message))
+
+    def recv(self):
+        """
+        Blocks until the next (length-prefixed) response has arrived and returns it as a dict.
+        """
+        with self.tracer.span("wait"):
+            self._recv_into(memoryview(self._len_buffer))
+        len_ = int(self._len_buffer)
+        # lazy responses keep referencing their buffer -> receive each one into a new buffer
+        lazy = self.lazy and len_ >= lazy_response.LAZY_THRESHOLD
+        if lazy:
+            payload = bytearray(len_)
+        else:
+            if len(self._buffer) < len_:
+                self._buffer = bytearray(len_)
+            payload = memoryview(self._buffer)[:len_]
+        with self.tracer.span("recv", {"bytes": len_}):
+            self._recv_into(memoryview(payload))
+        with self.tracer.span("decode"):
+            return decode_response(payload, self.decoder, self.layout, lazy=lazy)
+
+    def request(self, message):
+        """
+        Sends a command dict and waits for its response (broadcast frames of a spectator connection that arrive before
+        the response are kept for `recv_broadcast`).
+        """
+        self.send(message)
+        while True:
+            response = self.recv()
+            if response.get("cmd") != "broadcast":
+                return response
+            self._broadcasts.append(response)
+
+    def recv_broadcast(self):
+        """
+        Blocks until the next broadcast frame (see `subscribe`) has arrived and returns it.
+        """
+        if self._broadcasts:
+            return self._broadcasts.popleft()
+        return self.recv()
+
+    def _recv_into(self, view):
+        received = 0
+        while received < len(view):
+            n = self.socket.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("Server closed the connection!")
+            received += n
+
+    def negotiate_compression(self, codecs=None, threshold=payload_codecs.DEFAULT_THRESHOLD):
+        """
+        Asks the server to compress large (image) arrays in all following obs_dicts.
+        Decoded camera arrays are written into preallocated arrays, which are reused for the next response.
+
+        :param Union[List[str],None] codecs: The acceptable codecs in order of preference (None for all codecs that
+            this process supports; [] to switch compression off).
+        :param int threshold: Only uint8 arrays with at least this many bytes are compressed.
+        :return: The server's response (field 'codec' holds the chosen codec or None).
+        :rtype: dict
+        """
+        if codecs is None:
+            codecs = payload_codecs.available_codecs()
+        response = self.request({"cmd": "negotiate_compression", "codecs": codecs, "threshold": threshold})
+        if response.get("status") == "ok":
+            self.decoder = payload_codecs.PayloadDecoder() if response["codec"] else None
+        return response
+
+    def negotiate_layout(self, quantize=None, enabled=True, max_field_bytes=record_layout.DEFAULT_MAX_FIELD_BYTES):
+        """
+        Asks the server to send all following step/reset responses as fixed-layout binary records (see
+        record_layout.py): the response's 'record' field is then a structured numpy view with one field per numeric obs
+        key (see `RecordLayout.to_obs_dict` for de-quantized values).
+
+        :param Union[dict,None] quantize: Dict mapping obs keys of Continuous spaces to "float16", "int16" or
+            {"type": "int16", "scale": [float]}.
+        :param bool enabled: False switches back to normal msgpack obs_dicts.
+        :param Union[int,None] max_field_bytes: Observations larger than this (e.g. camera images) stay in the obs_dict
+            (None: no limit).
+        :return: The server's response (field 'fields' holds the layout).
+        :rtype: dict
+        """
+        response = self.request({"cmd": "negotiate_layout", "quantize": quantize or {}, "enabled": enabled,
+                                 "max_field_bytes": max_field_bytes})
+        if response.get("status") == "ok":
+            self.layout = record_layout.RecordLayout(response["fields"]) if response["fields"] else None
+        return response
+
+    def start_trace(self, capacity=None):
+        """
+        Starts span tracing on both sides: in this client (send, wait, recv, decode) and in the server (see the
+        server's 'trace' command).
+        """
+        self.tracer.start(capacity)
+        return self.trace("start", capacity=capacity)
+
+    def dump_trace(self, path):
+        """
+        Stops tracing (on both sides) and writes the client's and the server's spans into one Chrome trace-event JSON
+        file (open in chrome://tracing or ui.perfetto.dev).
+
+        :return: The server's trace stats.
+        :rtype: dict
+        """
+        self.tracer.stop()
+        self.trace("stop")
+        response = self.trace("dump")
+        if response.get("status") == "ok":
+            span_tracer.write_trace(path, self.tracer.get_events(), response.pop("events"))
+        return response
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ThreadedDucanduClient(DucanduClient):
+    """
+    Blocking client whose requests all run on one background thread (in order), so that a step can be sent off with
+    `step_async` and its response collected later with `step_wait`, while the calling thread keeps computing (the
+    socket calls release the GIL).
+    """
+    def __init__(self, port=None, host="localhost", socket_path=None, timeout=None, lazy=False):
+        super(ThreadedDucanduClient, self).__init__(port, host, socket_path, timeout, lazy)
+        self._executor = None
+        self._pending_step = None
+
+    def connect(self):
+        super(ThreadedDucanduClient, self).connect()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="e2l-client")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending_step = None
+        super(ThreadedDucanduClient, self).close()
+
+    def request_async(self, message):
+        """
+        Sends a command dict from the background thread.
+
+        :return: A future resolving to the response dict.
+        :rtype: concurrent.futures.Future
+        """
+        return self._executor.submit(DucanduClient.request, self, message)
+
+    def request(self, message):
+        return self.request_async(message).result()
+
+    def reset_async(self, setters=None, multi_agent=None):
+        return self.request_async(self._reset_message(setters, multi_agent))
+
+    def step_async(self, delta_time=1.0/60.0, num_ticks=4, axes=None, actions=None):
+        """
+        Sends a step command without waiting for its response (see `step` for the args).
+
+        :return: A future resolving to the step's response dict (also collected by `step_wait`).
+        :rtype: concurrent.futures.Future
+        """
+        if self._pending_step is not None:
+            raise RuntimeError("step_async called again before step_wait!")
+        self._pending_step = self.request_async(self._step_message(delta_time, num_ticks, axes, actions))
+        return self._pending_step
+
+    def step_wait(self, timeout=None):
+        """
+        Waits for the response of the step sent by `step_async`.
+        """
+        if self._pending_step is None:
+            raise RuntimeError("step_wait called without a pending step_async!")
+        future, self._pending_step = self._pending_step, None
+        return future.result(timeout)
+
+
+class StreamingDucanduClient(DucanduClient):
+    """
+    Blocking client for the server's free-running (real-time) streaming mode: after `start_stream`, a background thread
+    receives the pushed observation frames and only keeps the latest one (see `latest`), while actions are sent with
+    `act` (no round trip). All other responses are handed to `request` as usual.
+    """
+    def __init__(self, port=None, host="localhost", socket_path=None, timeout=None, lazy=False):
+        super(StreamingDucanduClient, self).__init__(port, host, socket_path, timeout, lazy)
+        self._reader = None
+        self._responses = queue.Queue()  # responses to requests (while the reader thread is running)
+        self._latest = None
+        self._latest_cond = threading.Condition()
+        self._consumed_seq = 0  # the seq of the last frame handed out by `latest`
+        self._action_seq = 0
+        self.num_frames = 0  # number of stream frames received
+        self.num_missed = 0  # number of stream frames received but replaced by newer ones before being consumed
+
+    def start_stream(self, rate=30.0):
+        """
+        Switches the game into streaming mode: it runs at native speed and pushes the latest observations `rate` times
+        per second.
+
+        :return: The server's response.
+        :rtype: dict
+        """
+        response = self.request({"cmd": "stream", "rate": rate})
+        if response.get("status") == "ok" and self._reader is None:
+            self._reader = threading.Thread(target=self._read_frames, name="e2l-stream", daemon=True)
+            self._reader.start()
+        return response
+
+    def stop_stream(self):
+        """
+        Pauses the game again (back to lockstep mode).
+
+        :return: The server's response (the stream's stats).
+        :rtype: dict
+        """
+        return self.request({"cmd": "stream", "enabled": False})
+
+    def act(self, axes=None, actions=None):
+        """
+        Sends axis/action inputs to the streaming game (applied as soon as they arrive; nothing is returned by the
+        server). Each action message is stamped with a running 'seq' number and the client's wall-clock time, which come
+        back in the frames' 'last_action' (see `get_latency`). Actions the server could not apply are reported there
+        as well (field 'error').
+
+        :return: The seq number of this action message.
+        :rtype: int
+        """
+        self._action_seq += 1
+        self.send({"cmd": "act", "axes": axes or [], "actions": actions or [], "seq": self._action_seq,
+                   "client_time": time.time()})
+        return self._action_seq
+
+    def latest(self, timeout=None, newer_than=None):
+        """
+        Returns the latest stream frame.
+
+        :param Union[float,None] timeout: Max. time to wait (in seconds) for a (new) frame (None for forever).
+        :param Union[int,None] newer_than: Wait for a frame with a larger 'seq' than this (e.g. the seq of the previously
+            consumed frame; None to return any frame received so far).
+        :return: The frame dict (with 'seq', 'server_time', 'client_time' (receive time), 'last_action', 'obs_dict', etc.)
+            or None if no such frame arrived in time.
+        :rtype: Union[dict,None]
+        """
+        with self._latest_cond:
+            self._latest_cond.wait_for(
+                lambda: self._latest is not None and (newer_than is None or self._latest["seq"] > newer_than), timeout)
+            if self._latest is None or (newer_than is not None and self._latest["seq"] <= newer_than):
+                return None
+            self._consumed_seq = self._latest["seq"]
+            return self._latest
+
+    @staticmethod
+    def get_latency(frame):
+        """
+        :return: The time (in seconds) from sending the frame's last applied action (see `act`) to receiving the frame
+            (None if no action was applied yet). Measured on the client's clock only.
+        :rtype: Union[float,None]
+        """
+        last_action = frame.get("last_action")
+        if not last_action or last_action.get("client_time") is None:
+            return None
+        return frame["client_time"] - last_action["client_time"]
+
+    def request(self, message):
+        if self._reader is None:
+            return super(StreamingDucanduClient, self).request(message)
+        self.send(message)
+        response = self._responses.get(timeout=self.timeout)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def _read_frames(self):
+        try:
+            while True:
+                response = self.recv()
+                if response.get("cmd") == "broadcast":
+                    self._broadcasts.append(response)
+                    continue
+                if response.get("cmd") != "stream":
+                    self._responses.put(response)
+                    continue
+                response["client_time"] = time.time()
+                with self._latest_cond:
+                    if self._latest is not None and self._latest["seq"] > self._consumed_seq:
+                        self.num_missed += 1
+                    self._latest = response
+                    self.num_frames += 1
+                    self._latest_cond.notify_all()
+        except (ConnectionError, OSError) as e:
+            self._responses.put(ConnectionError("Stream reader stopped: {}".format(e)))
+
+    def close(self):
+        super(StreamingDucanduClient, self).close()
+        if self._reader is not None:
+            self._reader.join(timeout=1.0)
+            self._reader = None
+
+
+class _ResponseProtocol(asyncio.BufferedProtocol):
+    """
+    Receives length-prefixed responses into one reused (growing) buffer and resolves the waiting futures in order.
+    Broadcast frames (spectator connections) are handed out separately (see `next_broadcast`).
+    """
+    def __init__(self, decode):
+        self.decode = decode
+        self.transport = None
+        self._buffer = bytearray(65536)
+        self._start = 0  # start of the first not yet decoded response in the buffer
+        self._end = 0  # end of the received data in the buffer
+        self._waiters = collections.deque()  # futures waiting for the next responses (in order)
+        self._responses = collections.deque()  # responses nobody is waiting for yet
+        self._broadcast_waiters = collections.deque()  # same for the broadcast frames of a spectator connection
+        self._broadcasts = collections.deque()
+        self._exception = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        if self._start == self._end:
+            self._start = self._end = 0
+        # make room: move the incomplete response to the front and/or grow the buffer
+        needed = max(sizehint, 1, self._needed())
+        if len(self._buffer) - self._end < needed:
+            pending = self._end - self._start
+            if self._start > 0:
+                self._buffer[:pending] = self._buffer[self._start:self._end]
+                self._start, self._end = 0, pending
+            if len(self._buffer) - self._end < needed:
+                self._buffer.extend(bytearray(max(needed, len(self._buffer))))
+        return memoryview(self._buffer)[self._end:]
+
+    def _needed(self):
+        # the number of bytes still missing for the incomplete response at the front of the buffer
+        available = self._end - self._start
+        if available < LEN_FIELD_SIZE:
+            return LEN_FIELD_SIZE - available
+        return LEN_FIELD_SIZE + int(self._buffer[self._start:self._start + LEN_FIELD_SIZE]) - available
+
+    def buffer_updated(self, nbytes):
+        self._end += nbytes
+        view = memoryview(self._buffer)
+        while self._end - self._start >= LEN_FIELD_SIZE:
+            len_ = int(self._buffer[self._start:self._start + LEN_FIELD_SIZE])
+            if self._end - self._start < LEN_FIELD_SIZE + len_:
+                break
+            payload = view[self._start + LEN_FIELD_SIZE:self._start + LEN_FIELD_SIZE + len_]
+            self._start += LEN_FIELD_SIZE + len_
+            try:
+                response = self.decode(payload)
+            except Exception as e:
+                self._deliver(None, e)
+            else:
+                self._deliver(response, None)
+        view.release()
+
+    def _deliver(self, response, exception):
+        # broadcast frames (spectator connections) never answer a request
+        if exception is None and response.get("cmd") == "broadcast":
+            waiters, responses = self._broadcast_waiters, self._broadcasts
+        else:
+            waiters, responses = self._waiters, self._responses
+        while waiters:
+            future = waiters.popleft()
+            if future.cancelled():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(response)
+            return
+        if exception is None:
+            responses.append(response)
+
+    def connection_lost(self, exc):
+        self._exception = ConnectionError("Server closed the connection!")
+        for waiters in (self._waiters, self._broadcast_waiters):
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    future.set_exception(self._exception)
+
+    def next_response(self):
+        return self._next(self._waiters, self._responses)
+
+    def next_broadcast(self):
+        return self._next(self._broadcast_waiters, self._broadcasts)
+
+    def _next(self, waiters, responses):
+        future = asyncio.get_event_loop().create_future()
+        if responses:
+            future.set_result(responses.popleft())
+        elif self._exception is not None:
+            future.set_exception(self._exception)
+        else:
+            waiters.append(future)
+        return future
+
+
+class AsyncDucanduClient(Commands):
+    """
+    asyncio client connection into a running UE4 game (ducandu_server). All command wrappers return coroutines.
+    Responses are received into one reused buffer and handed out in order, so requests can be pipelined: `step_async`
+    sends a step right away and `step_wait` awaits its response later.
+    Note: The server answers 'reset' asynchronously (one game tick later), so don't send anything else behind a reset
+    before its response has arrived.
+    """
+    def __init__(self, port=None, host="localhost", socket_path=None, lazy=False):
+        if port is None and socket_path is None:
+            raise ValueError("Either port or socket_path has to be given!")
+        self.port = port
+        self.host = host
+        self.socket_path = socket_path
+        self.lazy = lazy  # decode obs_dict entries only on access (see `DucanduClient`)
+        self.tracer = span_tracer.SpanTracer("engine2learn async client")  # client-side spans (see `start_trace`)
+        self.transport = None
+        self.protocol = None
+        self.decoder = None  # PayloadDecoder for compressed obs arrays (set via negotiate_compression)
+        self.layout = None  # RecordLayout of binary step records (set via negotiate_layout)
+        self._pending_step = None
+
+    async def connect(self):
+        loop = asyncio.get_event_loop()
+        protocol_factory = lambda: _ResponseProtocol(self._decode)
+        if self.socket_path is not None:
+            self.transport, self.protocol = await loop.create_unix_connection(protocol_factory, self.socket_path)
+        else:
+            self.transport, self.protocol = await loop.create_connection(protocol_factory, self.host, self.port)
+            sock = self.transport.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _decode(self, payload):
+        with self.tracer.span("decode", {"bytes": len(payload)}):
+            # lazy responses keep referencing their buffer -> copy them out of the protocol's reused receive buffer
+            if self.lazy and len(payload) >= lazy_response.LAZY_THRESHOLD:
+                return decode_response(bytes(payload), self.decoder, self.layout, lazy=True)
+            return decode_response(payload, self.decoder, self.layout)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self._pending_step = None
+
+    def send(self, message):
+        with self.tracer.span("send", {"cmd": message.get("cmd")}):
+            self.transport.write(msgpack.packb(message))
+
+    def recv(self):
+        """
+        :return: A future resolving to the next (not yet received or claimed) response.
+        :rtype: asyncio.Future
+        """
+        return self.protocol.next_response()
+
+    def recv_broadcast(self):
+        """
+        :return: A future resolving to the next (not yet received or claimed) broadcast frame (see `subscribe`).
+        :rtype: asyncio.Future
+        """
+        return self.protocol.next_broadcast()
+
+    async def request(self, message):
+        self.send(message)
+        start = time.perf_counter_ns()
+        response = await self.recv()
+        if self.tracer.enabled:
+            self.tracer.record("wait", start, time.perf_counter_ns())
+        return response
+
+    async def start_trace(self, capacity=None):
+        """
+        See `DucanduClient.start_trace`.
+        """
+        self.tracer.start(capacity)
+        return await self.trace("start", capacity=capacity)
+
+    async def dump_trace(self, path):
+        """
+        See `DucanduClient.dump_trace`.
+        """
+        self.tracer.stop()
+        await self.trace("stop")
+        response = await self.trace("dump")
+        if response.get("status") == "ok":
+            span_tracer.write_trace(path, self.tracer.get_events(), response.pop("events"))
+        return response
+
+    def step_async(self, delta_time=1.0/60.0, num_ticks=4, axes=None, actions=None):
+        """
+        Sends a step command right away (no need to await anything) without waiting for its response.
+
+        :return: A future resolving to the step's response dict (also collected by `step_wait`).
+        :rtype: asyncio.Future
+        """
+        if self._pending_step is not None:
+            raise RuntimeError("step_async called again before step_wait!")
+        self.send(self._step_message(delta_time, num_ticks, axes, actions))
+        self._pending_step = self.recv()
+        return self._pending_step
+
+    async def step_wait(self):
+        """
+        Awaits the response of the step sent by `step_async`.
+        """
+        if self._pending_step is None:
+            raise RuntimeError("step_wait called without a pending step_async!")
+        future, self._pending_step = self._pending_step, None
+        return await future
+
+    async def negotiate_compression(self, codecs=None, threshold=payload_codecs.DEFAULT_THRESHOLD):
+        """
+        See `DucanduClient.negotiate_compression`.
+        """
+        if codecs is None:
+            codecs = payload_codecs.available_codecs()
+        response = await self.request({"cmd": "negotiate_compression", "codecs": codecs, "threshold": threshold})
+        if response.get("status") == "ok":
+            self.decoder = payload_codecs.PayloadDecoder() if response["codec"] else None
+        return response
+
+    async def negotiate_layout(self, quantize=None, enabled=True, max_field_bytes=record_layout.DEFAULT_MAX_FIELD_BYTES):
+        """
+        See `DucanduClient.negotiate_layout`.
+        """
+        response = await self.request({"cmd": "negotiate_layout", "quantize": quantize or {}, "enabled": enabled,
+                                       "max_field_bytes": max_field_bytes})
+        if response.get("status") == "ok":
+            self.layout = record_layout.RecordLayout(response["fields"]) if response["fields"] else None
+        return response
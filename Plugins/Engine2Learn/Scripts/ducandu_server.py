@@ -14,18 +14,28 @@
 
 import unreal_engine as ue
 import asyncio
+import collections
 import ue_asyncio
 import server_utils as util
+import command_scheduler
+import payload_codecs
+import record_layout
+import embedded_policy
+import server_profiler
 from unreal_engine.classes import Engine2LearnSettings, GameplayStatics, InputSettings
 from unreal_engine.structs import Key
 from unreal_engine.enums import EInputEvent
 
 import msgpack
 import msgpack_numpy as mnp
+import numpy as np
 
-import re
+import os
 import pydevd
+import socket
+import stat
 import sys
+import time
 
 
 # make msgpack use the numpy-specific de/encoders
@@ -50,39 +60,217 @@ def seed(message):
     # set the random seed through the UnrealEnginePython interface
     value = int(message["value"])
     ue.set_random_seed(value)
+    # also seed the server-side RNG (used e.g. for sampling randomized setter values)
+    util.CONTEXT.rng.seed(value)
 
     return {"status": "ok", "new_seed": value}
 
 
-def reset(writer):
+def reset(message, connection):
     """
     Resets the Game to its default start position and returns the resulting obs_dict.
+    Optionally, a list of 'setters' (same format as for the 'set' command; values may also be distribution specs, see
+    `server_utils.sample_setter_values`) can be passed in, which are sampled and applied right after the level restart
+    (domain randomization), such that the returned obs_dict already reflects the new property values.
+    Multi-agent clients get the batched first observation (see `server_utils.compile_multi_agent_obs_dict`): either
+    requested explicitly through the 'multi_agent' field or - by default - if the client's steps are multi-agent steps
+    (or, before its first step, if the world has more than one player controller).
+    If the level was already restarted after an auto-reset (see `auto_reset`), no second restart happens: the pending
+    first obs_dict is returned or - if 'setters' are given - these are applied on top of the auto-reset's setters once
+    the new episode has started.
     """
-    playing_world = util.get_playing_world()
-    if not playing_world:
+    if not util.CONTEXT.playing_world:
         return {"status": "error", "message": "No playing world!"}
 
+    setters = message.get("setters")
+    if setters is not None and not isinstance(setters, (list, tuple)):
+        return {"status": "error", "message": "Field 'setters' in 'reset' command message must be a list of setter commands!"}
+
+    # the level was already restarted in the background (see `start_auto_reset`) -> serve its first observation
+    pending, connection.pending_reset = connection.pending_reset, None
+    episode, connection.pending_episode = connection.pending_episode, None
+    multi_agent = message.get("multi_agent", is_multi_agent(connection))
+    if pending is not None and not setters:
+        if pending.done():
+            return pending.result()
+        asyncio.ensure_future(send_when_done_async(pending, connection))
+        return None
+    elif pending is not None:
+        pending.cancel()
+        asyncio.ensure_future(get_and_send_episode_obs_dict_async(episode, connection, setters, multi_agent))
+        return None
+
     # DEBUG
     #pydevd.settrace("localhost", port=20023, stdoutToServer=True, stderrToServer=True)  # DEBUG
     # END: DEBUG
 
     ue.log("Resetting level.")
-    # reset level
-    playing_world.restart_level()
+    # trigger the level restart (happens on a later tick; see `compile_reset_obs_dict_async`)
+    util.CONTEXT.restart_level()
+    asyncio.ensure_future(get_and_send_obs_dict_async(connection, reward=0.0, setters=setters, multi_agent=multi_agent))
+
+    return None
+
+
+def is_multi_agent(connection):
+    """
+    :return: Whether the given connection's client steps in multi-agent mode (its last step was a multi-agent step; before
+        its first step: whether the world has more than one player controller).
+    :rtype: bool
+    """
+    if connection.multi_agent is None:
+        return len(util.CONTEXT.controllers) > 1
+    return connection.multi_agent
 
-    # enqueue pausing the game for upcoming tick
-    asyncio.ensure_future(util.pause_game())
-    asyncio.ensure_future(get_and_send_obs_dict_async(writer, reward=0.0))
 
+async def get_and_send_obs_dict_async(connection, reward=0.0, setters=None, multi_agent=False):
+    """
+    Calls compile_obs_dict asynchronously and sends the message back through the connection.
+    If `setters` are given, these are applied (see `apply_setters`) before the obs_dict is compiled.
+    """
+    message = await compile_reset_obs_dict_async(reward, setters, multi_agent)
+    send_message(message, connection)
     return None
 
 
-async def get_and_send_obs_dict_async(writer, reward=0.0):
+async def compile_reset_obs_dict_async(reward=0.0, setters=None, multi_agent=False):
+    """
+    Waits for the level restart to happen, pauses the game, applies the (optional) setters and compiles the first obs_dict
+    of the new episode (to be scheduled right after `ServerContext.restart_level`).
+    For multi-agent clients, the first obs_dict is the batched one (see `server_utils.compile_multi_agent_obs_dict`).
+    """
+    message = await start_episode_async(reward, setters)
+    if message is None:
+        message = compile_reset_obs_dict(multi_agent)
+    return message
+
+
+async def start_episode_async(reward=0.0, setters=None):
+    """
+    Waits for the level restart to happen, pauses the game, resets the accumulated rewards and applies the (optional)
+    setters.
+
+    :return: An error response dict (to be sent back to the client) or None if everything went fine.
+    :rtype: Union[dict,None]
+    """
+    await util.CONTEXT.wait_for_restart()
+    await util.pause_game()
+    util.reset_rewards(reward)
+    if setters:
+        return apply_setters(setters)
+    return None
+
+
+def compile_reset_obs_dict(multi_agent=False):
+    """
+    Compiles the first obs_dict of a new episode (see `start_episode_async`; rewards are relative to the reset rewards).
+    """
+    if multi_agent:
+        message = util.compile_multi_agent_obs_dict()
+    else:
+        message = util.compile_obs_dict()
+    update_obs_stats(message)
+    publish(message)
+    return message
+
+
+async def send_when_done_async(future, connection):
+    send_message(await future, connection)
+
+
+async def get_and_send_episode_obs_dict_async(episode, connection, setters, multi_agent=False):
+    """
+    Waits for an already started episode (see `start_auto_reset`), applies the given setters and sends back the episode's
+    first obs_dict.
+    """
+    message = await asyncio.shield(episode)
+    if message is None:
+        message = apply_setters(setters)
+    if message is None:
+        message = compile_reset_obs_dict(multi_agent)
+    send_message(message, connection)
+
+
+def auto_reset(message, connection):
     """
-    Calls compile_obs_dict asynchronously and sends the message back via writer
+    Switches auto-reset mode on or off for this connection (field 'enabled'; default: True). In auto-reset mode, as soon
+    as a step ends in a terminal state (in multi-agent mode: all agents are terminal), the server restarts the level right
+    away (in the background; applying the optional 'setters'), returns the terminal transition (with 'auto_reset'=True)
+    and answers the client's next 'reset' with the already compiled first obs_dict of the new episode (a 'reset' with
+    its own setters reuses the restart, see `reset`).
+    Any other state-changing command sent instead of that 'reset' is refused until the level restart has happened (it
+    would act on the old level); afterwards, it discards the pending reset observation (the new episode, incl. the
+    setters, has started nevertheless).
     """
-    message = util.compile_obs_dict(reward=reward)
-    send_message(message, writer)
+    setters = message.get("setters")
+    if setters is not None and not isinstance(setters, (list, tuple)):
+        return {"status": "error", "message": "Field 'setters' in 'auto_reset' command message must be a list of setter commands!"}
+    connection.auto_reset = bool(message.get("enabled", True))
+    connection.auto_reset_setters = setters
+
+    return {"status": "ok", "enabled": connection.auto_reset}
+
+
+def start_auto_reset(connection):
+    """
+    Restarts the level in the background after a terminal step (see `auto_reset`).
+    """
+    ue.log("Auto-resetting level.")
+    util.CONTEXT.restart_level()
+    # starting the new episode (incl. the setters) always happens, only its first obs_dict may be discarded
+    connection.pending_episode = episode = asyncio.ensure_future(start_episode_async(0.0, connection.auto_reset_setters))
+    connection.pending_reset = asyncio.ensure_future(compile_auto_reset_obs_dict_async(episode, is_multi_agent(connection)))
+
+
+async def compile_auto_reset_obs_dict_async(episode, multi_agent):
+    """
+    Compiles the first obs_dict of an auto-reset episode, once the episode was started (see `start_auto_reset`).
+    The returned message is a copy: it is only sent when the client asks for it, until then, other compiles reuse (and
+    change) the global obs_dict.
+    """
+    # shielded: cancelling the (not picked up) reset observation must not cancel the episode start
+    message = await asyncio.shield(episode)
+    if message is None:
+        message = compile_reset_obs_dict(multi_agent)
+    return _snapshot(message)
+
+
+def apply_setters(setters):
+    """
+    Applies a list of setter commands (see `set_props`) to the playing world.
+    Instead of a plain value, a setter may specify a distribution dict (see `server_utils.sample_setter_values`), in which
+    case the values for all matching uobjects are sampled at once (either one shared value or one value per uobject).
+
+    :param list setters: The list of setter commands: (/?actor:[component(s):]?prop-name, value, is_relative).
+    :return: An error response dict (to be sent back to the client) or None if everything went fine.
+    :rtype: Union[dict,None]
+    """
+    actors = util.CONTEXT.actors  # dict of uobjects: key=name (w/o number extension), value: list of actors that share this key (name)
+
+    # each set_cmd is a tuple
+    for set_cmd in setters:
+        if not isinstance(set_cmd, (list, tuple)) or len(set_cmd) < 2:
+            return {"status": "error", "message": "Malformatted setter command {}. Needs to be ([actor:prop], [value][, is_relative]?).".format(set_cmd)}
+        prop_spec, value, is_relative = set_cmd[0], set_cmd[1], False if len(set_cmd) < 3 else set_cmd[2]
+        try:
+            uobjects, prop_name = util.resolve_prop_spec(prop_spec, actors)
+            # value is a distribution -> sample all values at once
+            if isinstance(value, dict):
+                values = util.sample_setter_values(value, len(uobjects), util.CONTEXT.rng)
+            # value is an array with one row per uobject -> scatter
+            elif util.is_per_uobject_value(value, uobjects, prop_name):
+                values = value
+            else:
+                values = None
+        except ValueError as e:
+            return {"status": "error", "message": "{}".format(e)}
+
+        # go through all collected uobjects and change the property
+        if values is not None:
+            values = values.tolist()  # convert all values at once (instead of one numpy scalar/row per uobject)
+        for i, uobj in enumerate(uobjects):
+            util.set_property_value(uobj, prop_name, value if values is None else values[i], is_relative)
+
     return None
 
 
@@ -93,7 +281,9 @@ def set_props(message):
     (/?actor:[component(s):]?prop-name, value, is_relative)
     - actor/component/prop string could be a pattern. The syntax corresponds to perl regular expressions if the
     string starts with a '/'
-    - value: the new value for the property to be set to
+    - value: the new value for the property to be set to (or a distribution dict to sample the new value(s) from, or a
+    numpy array with one row per matched uobject (e.g. Nx3 for vectors; same order as returned by the 'get' command)
+    to scatter across the uobjects)
     - is_relative: if True, the old value of the property will be incremented by the given value (negative values decrement the property value)
 
     :param dict message: The incoming message from the client.
@@ -101,98 +291,108 @@ def set_props(message):
     :rtype: dict
     """
 
-    playing_world = util.get_playing_world()
-    if not playing_world:
+    if not util.CONTEXT.playing_world:
         return {"status": "error", "message": "No playing world!"}
 
     if "setters" not in message:
         return {"status": "error", "message": "Field 'setters' missing in 'set' command message!"}
 
-    actors = {}  # dict of uobjects: key=name (w/o number extension), value: list of actors that share this key (name)
-    for a in playing_world.all_actors():
-        name = re.sub(r'_\d+$', "", a.get_name(), 1)  # remove trailing _[digits]
-        if name not in actors:
-            actors[name] = [a]
-        else:
-            actors[name].append(a)
-
     # DEBUG
     #pydevd.settrace("localhost", port=20023, stdoutToServer=True, stderrToServer=True)  # DEBUG
     # END: DEBUG
 
-    # each set_cmd is a tuple
-    for set_cmd in message["setters"]:
-        if not isinstance(set_cmd, (list, tuple)) or len(set_cmd) < 2:
-            return {"status": "error", "message": "Malformatted setter command {}. Needs to be ([actor:prop], [value][, is_relative]?).".format(set_cmd)}
-        prop_spec, value, is_relative = set_cmd[0], set_cmd[1], False if len(set_cmd) < 3 else set_cmd[2]
-        uobjects = None  # the final uobject (could be an actor or a component or a component of a component, etc..)
-        while True:
-            mo = re.match(r':?(\w+)((:\w+)*)', prop_spec)
-            if not mo:
-                return {"status" : "error",
-                        "message": "Malformatted actor[:comp]?:property specifier ({}). "+
-                                   "Needs to be [actor-pattern[:comp-pattern(s)]*:property-pattern].".format(prop_spec)}
-            next_, prop_spec, _ = mo.groups()
-            # next_ is a pattern for actor names
-            if uobjects is None:
-                uobjects = []
-                # go through list of actors to collect the matching ones
-                for a, l in actors.items():
-                    if re.match(next_, a):
-                        uobjects.extend(l)  # playing_world.find_object(next_)
-            # next_ is a pattern for some sub-component of an Actor/other Component (still something left of the prop_spec)
-            elif prop_spec:
-                # go through list of uobjects to see whether they have components with the given name (next_)
-                uobjects_next = []
-                for uobj in uobjects:
-                    comps = uobj.get_actor_components()
-                    for comp in comps:
-                        if re.match(next_, comp.get_name()):
-                            uobjects_next.append(comp)  # playing_world.find_object(next_)
-                # update our list of matching components
-                uobjects = uobjects_next
-            # next_ is the name of the property
-            else:
-                # go through all collected uobjects and change the property
-                for uobj in uobjects:
-                    print("trying to change uobj->{}".format(next_))
-                    if uobj.has_property(next_):
-                        if is_relative:
-                            old_val = uobj.get_property(next_)
-                            uobj.set_property(next_, old_val + value)
-                        else:
-                            uobj.set_property(next_, value)
-                break
+    error = apply_setters(message["setters"])
+    if error:
+        return error
 
     return util.compile_obs_dict()
 
 
+def get_props(message):
+    """
+    Reads a property of many Actors/Components at once. Field 'selectors' is a list of
+    /?actor:[component(s):]?prop-name specifiers (same syntax as for the 'set' command).
+    For each selector, the response contains the stacked values (one row per matched uobject; Nx3 for vectors, see
+    `server_utils.get_property_values`) under 'values' and the labels of the matched uobjects (in the same order) under
+    'names'.
+    """
+    if not util.CONTEXT.playing_world:
+        return {"status": "error", "message": "No playing world!"}
+    if "selectors" not in message or not isinstance(message["selectors"], (list, tuple)):
+        return {"status": "error", "message": "Field 'selectors' missing in 'get' command message (or not a list)!"}
+
+    actors = util.CONTEXT.actors
+    values, names = {}, {}
+    for selector in message["selectors"]:
+        try:
+            uobjects, prop_name = util.resolve_prop_spec(selector, actors)
+        except ValueError as e:
+            return {"status": "error", "message": "{}".format(e)}
+        values[selector] = util.get_property_values(uobjects, prop_name)
+        names[selector] = [util.get_uobject_label(uobj) for uobj in uobjects]
+
+    return {"status": "ok", "values": values, "names": names}
+
+
+def get_agent_inputs(message, num_agents):
+    """
+    Converts the batched multi-agent inputs of a step command into per-agent axes/actions lists.
+    Batched inputs are given as dicts mapping key names to N-length lists/arrays (one value per agent):
+    'agent_axes' (float values) and 'agent_actions' (bool values).
+
+    :param dict message: The incoming step message.
+    :param int num_agents: The number of agents (player controllers) in the playing world.
+    :return: Tuple: list (one item per agent) of tuples (axes, actions), an error response dict (or None).
+    :rtype: tuple
+    """
+    inputs = [([], []) for _ in range(num_agents)]
+    for field, j in (("agent_axes", 0), ("agent_actions", 1)):
+        for key_name, values in message.get(field, {}).items():
+            if len(values) != num_agents:
+                return None, {"status": "error", "message": "Field '{}' of 'step' command has {} values for key {}, but there are {} agents!".
+                              format(field, len(values), key_name, num_agents)}
+            for i, value in enumerate(values):
+                inputs[i][j].append((key_name, value.item() if hasattr(value, "item") else value))
+    return inputs, None
+
+
 def step(message):
     """
     Performs a single step in the game (could be several ticks) given some action/axis mappings.
     The number of ticks to perform can be specified through `num_ticks` (default=4).
     The fake amount of time (dt) that each tick will use can be specified through `delta_time` (default=1/60s).
+    Multi-agent mode: If the message contains `agent_axes` and/or `agent_actions` (see `get_agent_inputs`), all player
+    controllers of the world are driven at once and the response contains batched per-agent observations, rewards and
+    is_terminal signals (see `server_utils.compile_multi_agent_obs_dict`).
     """
-    playing_world = util.get_playing_world()
+    playing_world = util.CONTEXT.playing_world
     if not playing_world:
         return {"status": "error", "message": "No playing world!"}
 
     delta_time = message.get("delta_time", 1.0/60.0)  # the force-set delta time (dt) for each tick
     num_ticks = message.get("num_ticks", 4)  # the number of ticks to work through (all with the given action/axis mappings valid)
-    controller = playing_world.get_player_controller()
+    multi_agent = "agent_axes" in message or "agent_actions" in message
+    # list of tuples: (controller, axes, actions)
+    if multi_agent:
+        controllers = util.CONTEXT.controllers
+        inputs, error = get_agent_inputs(message, len(controllers))
+        if error:
+            return error
+        agents = [(controller, axes, actions) for controller, (axes, actions) in zip(controllers, inputs)]
+    else:
+        agents = [(util.CONTEXT.controller, message.get("axes", []), message.get("actions", []))]
 
-    ue.log("step command: delta_time={} num_ticks={}".format(delta_time, num_ticks))
+    ue.log("step command: delta_time={} num_ticks={} num_agents={}".format(delta_time, num_ticks, len(agents)))
 
     # DEBUG
     #pydevd.settrace("localhost", port=20023, stdoutToServer=True, stderrToServer=True)  # DEBUG
     # END: DEBUG
 
-    if "axes" in message:
-        for axis in message["axes"]:
+    for controller, axes, actions in agents:
+        for axis in axes:
             # ue.log("-> axis {}={} (key={})".format(key_name, axis[1], Key(KeyName=key_name)))
             controller.input_axis(Key(KeyName=axis[0]), axis[1], delta_time)
-    if "actions" in message:
-        for action in message["actions"]:
+        for action in actions:
             # ue.log("-> action {}={}".format(action_name, action[1]))
             controller.input_key(Key(KeyName=action[0]), EInputEvent.IE_Pressed if action[1] else EInputEvent.IE_Released)
 
@@ -203,11 +403,12 @@ def step(message):
             ue.log("WARNING: un-pausing game for next step was not successful!")
 
         # TODO: how do we collect rewards over the single ticks if we don't query the observers after each (have to always accumulate and compare to previous value)?
-        playing_world.world_tick(delta_time, True)
+        with util.TRACER.span("world_tick"):
+            playing_world.world_tick(delta_time, True)
 
         # after the first tick, reset all action mappings to False again (otherwise sending True in two succinct steps would not(!) repeat the action)
-        if "actions" in message:
-            for action in message["actions"]:
+        for controller, _, actions in agents:
+            for action in actions:
                 controller.input_key(Key(KeyName=action[0]), EInputEvent.IE_Released)
 
         # pause again
@@ -215,15 +416,440 @@ def step(message):
         if not was_paused:
             ue.log("->WARNING: re-pausing game after step was not successful!")
 
-    return util.compile_obs_dict()
+    # actors could have been spawned/destroyed during the ticks
+    util.CONTEXT.invalidate_actors()
+
+    with util.TRACER.span("compile_obs_dict"):
+        if multi_agent:
+            response = util.compile_multi_agent_obs_dict(drain=True)
+        else:
+            response = util.compile_obs_dict(drain=True)
+    update_obs_stats(response)
+    publish(response)
+    return response
+
+
+def update_obs_stats(response):
+    """
+    Updates the server's running observation statistics (see obs_statistics.py) with the obs of a compiled response.
+    """
+    if response["status"] != "ok":
+        return
+    util.CONTEXT.obs_stats.update(response["obs_dict"])
+    if "agent_obs_dict" in response:
+        util.CONTEXT.obs_stats.update(response["agent_obs_dict"], batched=True)
+
+
+def upload_policy(message, connection):
+    """
+    Uploads a small numpy policy (see embedded_policy.py) for this connection, which can then be run inside the game
+    via the 'rollout' command. The policy spec is passed in as field 'policy'.
+    """
+    if "policy" not in message:
+        return {"status": "error", "message": "Field 'policy' missing in 'upload_policy' command message!"}
+
+    spec = util.get_spec()
+    if spec["status"] != "ok":
+        return spec
+    try:
+        connection.policy = embedded_policy.EmbeddedPolicy(message["policy"], spec["observation_space_desc"], spec["action_space_desc"])
+    except (ValueError, KeyError) as e:
+        return {"status": "error", "message": "Invalid policy: {}".format(e)}
+
+    return {"status": "ok", "input_size": connection.policy.input_size, "num_outputs": len(connection.policy.outputs)}
+
+
+def rollout(message, connection):
+    """
+    Runs the uploaded policy (see `upload_policy`) inside the game for `num_steps` steps (or until is_terminal) and returns
+    the whole trajectory at once: the policy inputs ('obs'), the sampled action values ('actions'; one column per policy
+    output), 'rewards', 'is_terminal' flags, 'log_probs' and the obs_dict after the last step ('last_obs_dict').
+    Optional fields: `seed` (for sampling the actions), `deterministic`, `delta_time` and `num_ticks` (see `step`).
+    The policy's inputs are checked against the game's current observations (see `get_spec`) before the first step.
+    """
+    policy = connection.policy
+    if policy is None:
+        return {"status": "error", "message": "No policy uploaded for this connection (use the 'upload_policy' command)!"}
+    if "num_steps" not in message:
+        return {"status": "error", "message": "Field 'num_steps' missing in 'rollout' command message!"}
+    num_steps = message["num_steps"]
+    if not isinstance(num_steps, int) or isinstance(num_steps, bool) or num_steps < 1:
+        return {"status": "error", "message": "Field 'num_steps' ({}) in 'rollout' command must be an int >= 1!".format(num_steps)}
+    try:
+        rng = np.random.RandomState(message["seed"]) if "seed" in message else util.CONTEXT.rng
+    except (ValueError, TypeError) as e:
+        return {"status": "error", "message": "Invalid 'seed' in 'rollout' command: {}".format(e)}
+
+    # observers may have been added/removed since the policy was uploaded
+    spec = util.get_spec()
+    if spec["status"] != "ok":
+        return spec
+    try:
+        policy.check_inputs(spec["observation_space_desc"])
+    except ValueError as e:
+        return {"status": "error", "message": "Uploaded policy does not fit the game anymore: {}".format(e)}
+    deterministic = message.get("deterministic", False)
+    step_message = {"delta_time": message.get("delta_time", 1.0/60.0), "num_ticks": message.get("num_ticks", 4)}
+
+    obs = np.zeros((num_steps, policy.input_size), dtype=np.float32)
+    actions = np.zeros((num_steps, len(policy.outputs)), dtype=np.float32)
+    rewards = np.zeros((num_steps,), dtype=np.float32)
+    is_terminal = np.zeros((num_steps,), dtype=bool)
+    log_probs = np.zeros((num_steps,), dtype=np.float32)
+
+    response = util.compile_obs_dict()
+    t = 0
+    while t < num_steps:
+        if response["status"] != "ok":
+            return response
+        try:
+            obs[t] = policy.featurize(response["obs_dict"])
+        except (KeyError, ValueError) as e:
+            return {"status": "error", "message": "Observations of step {} don't fit the policy's inputs ({})!".format(t, e)}
+        actions[t], step_message["axes"], step_message["actions"], log_probs[t] = policy.act(obs[t], rng, deterministic)
+        response = step(step_message)
+        if response["status"] != "ok":
+            return response
+        rewards[t] = response["_reward"]
+        is_terminal[t] = response["_is_terminal"]
+        t += 1
+        if is_terminal[t - 1]:
+            break
+
+    return {"status": "ok", "num_steps": t, "obs": obs[:t], "actions": actions[:t], "rewards": rewards[:t],
+            "is_terminal": is_terminal[:t], "log_probs": log_probs[:t], "last_obs_dict": response["obs_dict"]}
+
+
+def negotiate_compression(message, connection):
+    """
+    Negotiates the compression codec used for large (image) arrays in all obs_dicts sent through this connection.
+    The client sends a list of acceptable codecs (field 'codecs', in order of preference) and optionally the minimum
+    size in bytes of arrays to compress (field 'threshold'). An empty list switches compression off.
+    See payload_codecs.py for the available codecs.
+    """
+    if "codecs" not in message or not isinstance(message["codecs"], (list, tuple)):
+        return {"status": "error", "message": "Field 'codecs' missing in 'negotiate_compression' command message (or not a list)!"}
+    threshold = message.get("threshold", payload_codecs.DEFAULT_THRESHOLD)
+
+    codec = payload_codecs.choose_codec(message["codecs"])
+    connection.encoder = payload_codecs.PayloadEncoder(codec, threshold) if codec else None
+    ue.log("compression codec for client {} is now: {}".format(connection.name, codec))
+
+    return {"status": "ok", "codec": codec, "threshold": threshold, "available_codecs": payload_codecs.available_codecs()}
+
+
+def negotiate_layout(message, connection):
+    """
+    Switches this connection to fixed-layout binary step responses (see record_layout.py): all numeric observations
+    (plus _reward and _is_terminal) of each response are sent as one packed binary record under 'record'; non-numeric
+    and large (e.g. image) observations stay in the (then much smaller) 'obs_dict', where they are still compressed
+    with the negotiated codec (see 'negotiate_compression'). The layout is compiled from the current get_spec.
+    Int16 quantized obs keys whose values were clipped to the int16 range are listed in the response's 'saturated'
+    field.
+    Optional fields:
+    - 'quantize': Dict mapping obs keys of Continuous spaces to "float16", "int16" or {"type": "int16", "scale": [float]}.
+    - 'max_field_bytes' (int): Observations larger than this stay in the obs_dict (default: 4096; None: no limit).
+    - 'enabled' (bool): False switches back to normal msgpack obs_dicts.
+    Note: Multi-agent responses (with 'agent_obs_dict') are always sent as msgpack. Layouts can't be combined with
+    pre-normalized observations (see 'obs_stats'), as the record's integer and bool fields can't hold normalized values.
+    """
+    if not message.get("enabled", True):
+        connection.layout = None
+        return {"status": "ok", "fields": None}
+    if connection.normalize_obs:
+        return {"status": "error", "message": "Record layouts can't be used with normalized observations (switch off normalization first)!"}
+
+    spec = util.get_spec()
+    if spec["status"] != "ok":
+        return spec
+    try:
+        connection.layout = record_layout.RecordLayout(record_layout.compile_fields(
+            spec["observation_space_desc"], message.get("quantize"),
+            message.get("max_field_bytes", record_layout.DEFAULT_MAX_FIELD_BYTES)))
+    except ValueError as e:
+        return {"status": "error", "message": "{}".format(e)}
+
+    return {"status": "ok", "fields": connection.layout.describe(), "itemsize": connection.layout.itemsize}
+
+
+def profile(message):
+    """
+    Profiles the python code running inside the game for the next `num_steps` step commands and/or `duration` seconds.
+    Field 'action':
+    - "start": starts profiling (fields: 'mode' (deterministic|sampling; default: sampling), 'num_steps', 'duration',
+      'interval' (sampling interval in s) and 'file' (path to write the raw results to)).
+    - "stats": returns the aggregated stats of the last finished run (or running=True if still running).
+    - "stop": stops profiling right away and returns the aggregated stats.
+    """
+    global PROFILE_TIMER
+
+    action = message.get("action", "start")
+    if action == "start":
+        try:
+            PROFILER.start(message.get("mode", "sampling"), message.get("num_steps"), message.get("duration"),
+                           message.get("interval", 0.005), message.get("file"))
+        except ValueError as e:
+            return {"status": "error", "message": "{}".format(e)}
+        # a previous run's timer must not stop this run
+        cancel_profile_timer()
+        if message.get("duration"):
+            # make sure we stop in time even if no more commands come in
+            PROFILE_TIMER = asyncio.get_event_loop().call_later(message["duration"], PROFILER.stop)
+        return {"status": "ok", "running": True}
+    elif action == "stats":
+        if PROFILER.running:
+            return {"status": "ok", "running": True}
+        if PROFILER.stats is None:
+            return {"status": "error", "message": "No profiling results available!"}
+        return {"status": "ok", "running": False, "stats": PROFILER.stats}
+    elif action == "stop":
+        cancel_profile_timer()
+        stats = PROFILER.stop(message.get("top", 30))
+        if stats is None:
+            return {"status": "error", "message": "No profiling results available!"}
+        return {"status": "ok", "running": False, "stats": stats}
+
+    return {"status": "error", "message": "Unknown 'profile' action ({})! Needs to be one of start|stats|stop.".format(action)}
+
+
+def cancel_profile_timer():
+    """
+    Cancels the pending stop of a duration-limited profiling run (see `profile`).
+    """
+    global PROFILE_TIMER
 
+    if PROFILE_TIMER is not None:
+        PROFILE_TIMER.cancel()
+        PROFILE_TIMER = None
 
-def manage_message(message, writer):
+
+def obs_stats(message, connection):
+    """
+    Returns the server's running statistics (count, mean, var, std, min, max) of all numeric observations (optionally
+    only for the obs keys given in field 'keys').
+    Optional fields:
+    - 'reset' (bool): Drops all statistics gathered so far (before returning them).
+    - 'update' (bool): Switches updating the statistics on every step/reset on or off (e.g. off for evaluation runs).
+    - 'normalize' (bool): Switches pre-normalized observations for this connection on or off: all tracked observations in
+      the obs_dicts sent through this connection are replaced by their float32 (value - mean) / std (not possible
+      while a record layout is active, see 'negotiate_layout').
+    - 'clip' (float): Clips normalized observations to [-clip, clip].
+    """
+    if message.get("normalize") and connection.layout is not None:
+        return {"status": "error", "message": "Normalized observations can't be sent in record layouts (switch off the layout first)!"}
+    stats = util.CONTEXT.obs_stats
+    if message.get("reset"):
+        stats.reset()
+    if "update" in message:
+        stats.enabled = bool(message["update"])
+    if "normalize" in message:
+        connection.normalize_obs = bool(message["normalize"])
+    if "clip" in message:
+        connection.normalize_clip = message["clip"]
+
+    return {"status": "ok", "stats": stats.get_stats(message.get("keys")), "update": stats.enabled,
+            "normalize": connection.normalize_obs, "clip": connection.normalize_clip}
+
+
+def flow_control(message, connection):
+    """
+    Configures the write-side flow control of this connection (see `send_message`) and returns its buffer metrics.
+    Optional fields:
+    - 'policy': What to do once more than 'high_water' bytes of responses are waiting to be sent to the client:
+      "block" (default; stop reading this client's commands until the buffer has drained below 'low_water'),
+      "drop" (drop the non-essential, i.e. image, observations from the responses until the buffer has drained; a
+      response without any image observations is sent in full and - as for "block" - no further commands are read
+      until the buffer has drained; counted in 'num_drop_fallbacks') or "disconnect" (close the connection).
+    - 'high_water' and 'low_water': The buffer limits in bytes.
+    """
+    policy = message.get("policy", connection.flow_policy)
+    if policy not in FLOW_POLICIES:
+        return {"status": "error", "message": "Unknown flow control policy ({})! Needs to be one of {}.".format(policy, "|".join(FLOW_POLICIES))}
+    high_water = int(message.get("high_water", connection.high_water))
+    low_water = int(message.get("low_water", min(connection.low_water, high_water // 4)))
+    if not 0 <= low_water <= high_water:
+        return {"status": "error", "message": "Need 0 <= low_water ({}) <= high_water ({})!".format(low_water, high_water)}
+    connection.set_flow_control(policy, high_water, low_water)
+
+    return dict(connection.get_buffer_stats(), status="ok")
+
+
+def subscribe(message, connection):
+    """
+    Turns this connection into a read-only spectator connection, which receives a copy of the observations of each step
+    and reset (of any controlling connection) as a message with cmd="broadcast" and a running 'seq' number (gaps mean
+    that frames were skipped or dropped).
+    Optional fields:
+    - 'every' (int): Only send every n-th frame (default: 1).
+    - 'max_queued' (int): The max. number of frames waiting to be sent to this spectator; if the spectator does not keep
+      up reading, the oldest frames are dropped (default: 4).
+    All commands but 'unsubscribe' are refused on a spectator connection. Its response may arrive after some broadcast
+    frames (the clients' `request` keeps these for `recv_broadcast`). Streaming connections (see `stream`) can't
+    subscribe.
+    Note: Broadcast frames are serialized once for all spectators (no per-connection compression or normalization).
+    """
+    if connection.stream is not None:
+        return {"status": "error", "message": "A streaming connection can't subscribe (stop streaming first)!"}
+    every = int(message.get("every", 1))
+    max_queued = int(message.get("max_queued", 4))
+    if every < 1 or max_queued < 1:
+        return {"status": "error", "message": "Fields 'every' ({}) and 'max_queued' ({}) must be >= 1!".format(every, max_queued)}
+    if connection.subscription is not None:
+        connection.subscription.close()
+    connection.subscription = Subscription(connection, every, max_queued)
+    SPECTATORS.add(connection)
+
+    return {"status": "ok", "every": every, "max_queued": max_queued}
+
+
+def unsubscribe(connection):
+    """
+    Turns a spectator connection (see `subscribe`) back into a normal one.
+    Note: Broadcast frames that were already being sent may still arrive before this command's response.
+    """
+    if connection.subscription is None:
+        return {"status": "error", "message": "This connection is not subscribed!"}
+    stats = connection.subscription.get_stats()
+    connection.subscription.close()
+    connection.subscription = None
+    SPECTATORS.discard(connection)
+
+    return dict(stats, status="ok")
+
+
+def stream(message, connection):
+    """
+    Switches this connection into free-running (real-time) streaming mode (field 'enabled'; default: True): the game is
+    unpaused and runs at native speed, while the server pushes the latest observations at a fixed 'rate' (frames per
+    second; default: 30) as messages with cmd="stream" (see `ObsStream`). Actions are sent with the 'act' command (no
+    response) and are applied as soon as they arrive.
+    Lockstep commands ('step', 'rollout') are not allowed (on any connection) while a stream is active. Switching
+    streaming off pauses the game again and returns the stream's stats.
+    """
+    if not message.get("enabled", True):
+        if connection.stream is None:
+            return {"status": "error", "message": "This connection is not streaming!"}
+        stats = connection.stream.get_stats()
+        connection.stream.close()
+        connection.stream = None
+        return dict(stats, status="ok")
+
+    if not util.CONTEXT.playing_world:
+        return {"status": "error", "message": "No playing world!"}
+    try:
+        rate = float(message.get("rate", 30.0))
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "Field 'rate' ({}) in 'stream' command must be a number!".format(message.get("rate"))}
+    if rate <= 0.0:
+        return {"status": "error", "message": "Field 'rate' ({}) in 'stream' command must be > 0!".format(rate)}
+    if connection.stream is not None:
+        connection.stream.close()
+    connection.stream = ObsStream(connection, rate)
+
+    return {"status": "ok", "rate": rate, "server_time": time.time()}
+
+
+def act(message, connection):
+    """
+    Applies the given 'axes' and 'actions' (same format as for 'step') to the streaming game (see `stream`) right away.
+    Axis values are held (re-applied every frame) until changed, actions stay pressed/released until changed.
+    The optional fields 'seq' and 'client_time' are echoed back (together with the server's receive time) in the next
+    stream frames' 'last_action', so the client can measure its action-to-observation latency.
+    Never returns a response (the client does not wait for one): errors are logged and - if the connection is
+    streaming - reported in the next stream frames' 'last_action' (field 'error').
+    """
+    if connection.subscription is not None:
+        error = "Command act is not allowed on a spectator connection (unsubscribe first)!"
+    elif connection.stream is None:
+        error = "Command 'act' is only allowed in streaming mode (see 'stream' command)!"
+    else:
+        error = connection.stream.apply(message)
+    if error:
+        ue.log("act (client {}): {}".format(connection.name, error))
+    return None
+
+
+def schedule(message, connection):
+    """
+    Configures the command scheduler (see command_scheduler.py) and returns its stats (queueing delays and execution
+    times per priority class).
+    Optional fields:
+    - 'priority': The priority class of this connection's commands: "control" (default; e.g. the training connection;
+      always executed right away), "evaluation" or "monitoring" (only executed within the per-frame time budget, the rest
+      is deferred to later frames).
+    - 'frame_budget': The per-frame time budget (in seconds) for executing commands (shared by all connections).
+    """
+    if "priority" in message:
+        if message["priority"] not in command_scheduler.PRIORITIES:
+            return {"status": "error", "message": "Unknown priority class ({})! Needs to be one of {}.".format(
+                message["priority"], "|".join(command_scheduler.PRIORITIES))}
+        connection.priority = message["priority"]
+    if "frame_budget" in message:
+        try:
+            frame_budget = float(message["frame_budget"])
+        except (TypeError, ValueError):
+            frame_budget = 0.0
+        if not frame_budget > 0.0:
+            return {"status": "error", "message": "Field 'frame_budget' must be a positive number (seconds)!"}
+        SCHEDULER.frame_budget = frame_budget
+
+    return dict(SCHEDULER.get_stats(), status="ok", priority=connection.priority)
+
+
+def trace(message):
+    """
+    Opt-in span tracing of the game thread's hot paths (manage_message, world_tick, CaptureScene, property reads,
+    send_message, etc.; see span_tracer.py).
+    Field 'action':
+    - "start": clears all recorded spans and starts tracing (field 'capacity': max. number of spans kept per thread).
+    - "stop": stops tracing (the recorded spans are kept).
+    - "stats": returns the number of recorded spans.
+    - "dump": returns the recorded spans as Chrome trace events (field 'events'; written to a file by the client, see
+      `span_tracer.write_trace`). The server never writes trace files itself.
+    """
+    tracer = util.TRACER
+    action = message.get("action", "start")
+    if action == "start":
+        tracer.start(message.get("capacity"))
+    elif action == "stop":
+        tracer.stop()
+    elif action == "dump":
+        return dict(tracer.get_stats(), status="ok", events=tracer.get_events())
+    elif action != "stats":
+        return {"status": "error", "message": "Unknown 'trace' action ({})! Needs to be one of start|stop|stats|dump.".format(action)}
+
+    return dict(tracer.get_stats(), status="ok")
+
+
+def get_stats(connection):
+    """
+    Returns some server statistics (e.g. for load tests and monitoring): the connected clients, the process' memory usage,
+    the total size of all connections' write buffers and the stats of the requesting connection.
+    """
+    return {"status": "ok", "num_connections": len(CONNECTIONS), "memory_rss_kb": server_profiler.get_memory_usage_kb(),
+            "write_buffer_size_total": sum(c.get_write_buffer_size() for c in CONNECTIONS),
+            "num_spectators": len(SPECTATORS),
+            "scheduler": SCHEDULER.get_stats(),
+            "connection": dict(connection.get_buffer_stats(), name=str(connection.name),
+                               num_messages=connection.num_messages, num_bytes_sent=connection.num_bytes_sent),
+            "capture_pool": util.CONTEXT.capture_pool.get_stats()}
+
+
+def release_captures():
+    """
+    Releases all pooled render targets of the observers' scene captures (they will be re-created on demand).
+    """
+    num = len(util.CONTEXT.capture_pool.get_stats()["render_targets"])
+    util.CONTEXT.capture_pool.release_all()
+    return {"status": "ok", "num_released": num}
+
+
+def manage_message(message, connection):
     """
     Handles all incoming message by forwarding the message to one of our command-handling functions (e.g. reset, step, etc..)
 
     :param dict message: The incoming message dict.
-    :param writer: The writer object to send async messages back to once done.
+    :param ClientConnection connection: The connection the message came in through (to send async messages back to once done).
     :return: A response dict to be sent back to the client.
     :rtype: dict
     """
@@ -232,45 +858,470 @@ def manage_message(message, writer):
     if "cmd" not in message:
         return {"status": "error", "message": "Field 'cmd' missing in message!"}
     cmd = message["cmd"]
+    # 'act' never gets a response (not even an error; see `act`)
+    if cmd == "act":
+        return act(message, connection)
+    # spectator connections only receive broadcast frames (no responses to mix them up with, see `subscribe`)
+    if connection.subscription is not None and cmd != "unsubscribe":
+        return {"status": "error", "message": "Command {} is not allowed on a spectator connection (unsubscribe first)!".format(cmd)}
+    # the client did not pick up its auto-reset observation (see 'auto_reset' command) -> drop it (but never act on the
+    # old level while its restart is still pending)
+    if connection.pending_reset is not None and cmd in CONTROLLING_COMMANDS and cmd != "reset":
+        if not connection.pending_episode.done():
+            return {"status": "error", "message": "Command {} is not allowed while the auto-reset's level restart is pending (send 'reset' first)!".format(cmd)}
+        connection.pending_reset.cancel()
+        connection.pending_reset = None
+        connection.pending_episode = None
+    # the game runs freely in streaming mode (of any connection)
+    if cmd in LOCKSTEP_COMMANDS and any(c.stream is not None for c in CONNECTIONS):
+        return {"status": "error", "message": "Command {} is not allowed while a stream is active (stop streaming first)!".format(cmd)}
     if cmd == "step":
-        return step(message)
+        connection.multi_agent = "agent_axes" in message or "agent_actions" in message
+        response = step(message)
+        if connection.auto_reset and response["status"] == "ok" and np.all(response["_is_terminal"]):
+            start_auto_reset(connection)
+            response["auto_reset"] = True
+        return response
     elif cmd == "reset":
-        return reset(writer)
+        return reset(message, connection)
     elif cmd == "seed":
         return seed(message)
     elif cmd == "set":
         return set_props(message)
+    elif cmd == "get":
+        return get_props(message)
     elif cmd == "get_spec":
         return util.get_spec()
+    elif cmd == "negotiate_compression":
+        return negotiate_compression(message, connection)
+    elif cmd == "negotiate_layout":
+        return negotiate_layout(message, connection)
+    elif cmd == "upload_policy":
+        return upload_policy(message, connection)
+    elif cmd == "rollout":
+        return rollout(message, connection)
+    elif cmd == "get_stats":
+        return get_stats(connection)
+    elif cmd == "profile":
+        return profile(message)
+    elif cmd == "trace":
+        return trace(message)
+    elif cmd == "release_captures":
+        return release_captures()
+    elif cmd == "obs_stats":
+        return obs_stats(message, connection)
+    elif cmd == "flow_control":
+        return flow_control(message, connection)
+    elif cmd == "auto_reset":
+        return auto_reset(message, connection)
+    elif cmd == "schedule":
+        return schedule(message, connection)
+    elif cmd == "stream":
+        return stream(message, connection)
+    elif cmd == "subscribe":
+        return subscribe(message, connection)
+    elif cmd == "unsubscribe":
+        return unsubscribe(connection)
 
     return {"status": "error", "message": "Unknown method ({}) to call!".format(cmd)}
 
 
-def send_message(message, writer):
+# commands that change the game's state (and discard a not picked up auto-reset observation)
+CONTROLLING_COMMANDS = ("step", "reset", "seed", "set", "upload_policy", "rollout", "stream", "act")
+
+# commands that tick the (paused) game themselves (not allowed in streaming mode)
+LOCKSTEP_COMMANDS = ("step", "rollout")
+
+# write-side flow control policies (see 'flow_control' command) and default buffer limits (in bytes)
+FLOW_POLICIES = ("block", "drop", "disconnect")
+DEFAULT_HIGH_WATER = 16 * 1024 * 1024
+DEFAULT_LOW_WATER = 4 * 1024 * 1024
+
+
+class ClientConnection(object):
+    """
+    Per-connection state of a connected client.
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        self.name = writer.get_extra_info("peername")
+        # write-side flow control
+        self.flow_policy = None
+        self.high_water = None
+        self.low_water = None
+        self.set_flow_control("block", DEFAULT_HIGH_WATER, DEFAULT_LOW_WATER)
+        self.max_write_buffer_size = 0
+        self.num_blocked = 0  # number of times the command loop had to wait for the write buffer to drain
+        self.time_blocked = 0.0
+        self.num_dropped_obs = 0  # number of image observations dropped from responses
+        self.num_drop_fallbacks = 0  # number of responses without anything to drop ("drop" policy -> blocked instead)
+        self.drop_fallback = False  # the last response had nothing to drop -> block the command loop (see `should_block`)
+        self.encoder = None  # the negotiated PayloadEncoder (None for no compression)
+        self.layout = None  # the negotiated RecordLayout (None for msgpack obs_dicts)
+        self.policy = None  # the uploaded EmbeddedPolicy (see 'upload_policy' command)
+        self.normalize_obs = False  # send pre-normalized observations (see 'obs_stats' command)
+        self.normalize_clip = None
+        self.num_messages = 0  # number of commands received through this connection
+        self.num_bytes_sent = 0
+        self.subscription = None  # the Subscription if this is a (read-only) spectator connection
+        self.auto_reset = False  # restart the level in the background after terminal steps (see 'auto_reset' command)
+        self.auto_reset_setters = None
+        self.pending_reset = None  # future of the first obs_dict of the auto-reset episode
+        self.pending_episode = None  # future of the auto-reset episode's start (level restart, setters)
+        self.priority = "control"  # the priority class of this connection's commands (see 'schedule' command)
+        self.stream = None  # the ObsStream if this connection is in streaming mode (see 'stream' command)
+        self.multi_agent = None  # whether the client's last step was a multi-agent step (None: no step yet)
+
+    def set_flow_control(self, policy, high_water, low_water):
+        self.flow_policy = policy
+        self.high_water = high_water
+        self.low_water = low_water
+        # the transport pauses writing (-> `drain` blocks) above high_water and resumes below low_water
+        self.writer.transport.set_write_buffer_limits(high=high_water, low=low_water)
+
+    def get_write_buffer_size(self):
+        return self.writer.transport.get_write_buffer_size()
+
+    def is_over_high_water(self):
+        return self.get_write_buffer_size() > self.high_water
+
+    def should_block(self):
+        """
+        :return: Whether the command loop has to stop reading commands until the write buffer has drained: when over
+            the high-water mark with the "block" policy or with the "drop" policy, if the last response had nothing
+            to drop (see `drop_image_observations`).
+        :rtype: bool
+        """
+        if not self.is_over_high_water():
+            return False
+        return self.flow_policy == "block" or (self.flow_policy == "drop" and self.drop_fallback)
+
+    def get_buffer_stats(self):
+        return {"policy": self.flow_policy, "high_water": self.high_water, "low_water": self.low_water,
+                "write_buffer_size": self.get_write_buffer_size(), "max_write_buffer_size": self.max_write_buffer_size,
+                "num_blocked": self.num_blocked, "time_blocked": self.time_blocked,
+                "num_dropped_obs": self.num_dropped_obs, "num_drop_fallbacks": self.num_drop_fallbacks}
+
+
+class Subscription(object):
+    """
+    The broadcast frames queued for one spectator connection and the task writing them out (at the spectator's pace).
+    """
+    def __init__(self, connection, every, max_queued):
+        self.connection = connection
+        self.every = every
+        self.queue = collections.deque(maxlen=max_queued)  # drop-oldest
+        self.num_offered = 0
+        self.num_sent = 0
+        self.num_dropped = 0
+        self._ready = asyncio.Event()
+        self._task = asyncio.ensure_future(self._write_frames())
+
+    def offer(self, frame):
+        self.num_offered += 1
+        if (self.num_offered - 1) % self.every != 0:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.num_dropped += 1
+        self.queue.append(frame)
+        self._ready.set()
+
+    async def _write_frames(self):
+        writer = self.connection.writer
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self.queue and not writer.is_closing():
+                frame = self.queue.popleft()
+                writer.write(frame)
+                self.connection.num_bytes_sent += len(frame)
+                self.num_sent += 1
+                try:
+                    await writer.drain()
+                # the spectator went away -> stop broadcasting to it (its command loop cleans up the rest)
+                except ConnectionError as e:
+                    ue.log("spectator {} lost ({}): unsubscribing".format(self.connection.name, e))
+                    SPECTATORS.discard(self.connection)
+                    self.queue.clear()
+                    writer.close()
+                    return
+
+    def close(self):
+        self._task.cancel()
+        self.queue.clear()
+
+    def get_stats(self):
+        return {"num_offered": self.num_offered, "num_sent": self.num_sent, "num_dropped": self.num_dropped,
+                "num_queued": len(self.queue)}
+
+
+class ObsStream(object):
+    """
+    Free-running (real-time) observation stream of one connection (see 'stream' command): the game runs unpaused and,
+    once per frame (loop iteration of the ue_asyncio ticker), the held axis inputs are applied and - at the stream's rate
+    - the latest observations are compiled and pushed to the client. Each frame carries a running 'seq' number, the
+    server's wall-clock 'server_time' and the last applied action ('last_action').
+    If the client does not keep up reading (write buffer over its high-water mark), frames are skipped (latest-value
+    semantics).
+    """
+    def __init__(self, connection, rate):
+        self.connection = connection
+        self.interval = 1.0 / rate
+        self.axes = {}  # key=axis key name, value=held axis value
+        self.last_action = None
+        self.seq = 0
+        self.num_actions = 0
+        self.num_skipped = 0
+        self.num_frames = 0  # number of engine frames (loop iterations) the stream was running for
+        GameplayStatics.SetGamePaused(util.CONTEXT.playing_world, False)
+        self._task = asyncio.ensure_future(self._run())
+
+    def apply(self, message):
+        """
+        Applies the inputs of an 'act' message (see `act`).
+
+        :return: An error message (also reported in the next frames' 'last_action') or None if everything went fine.
+        :rtype: Union[str,None]
+        """
+        self.last_action = {"seq": message.get("seq"), "client_time": message.get("client_time"), "server_time": time.time()}
+        controller = util.CONTEXT.controller
+        if controller is None:
+            self.last_action["error"] = "No player controller to apply the action to!"
+            return self.last_action["error"]
+        for key_name, value in message.get("axes", []):
+            self.axes[key_name] = value
+        for key_name, pressed in message.get("actions", []):
+            controller.input_key(Key(KeyName=key_name), EInputEvent.IE_Pressed if pressed else EInputEvent.IE_Released)
+        self.num_actions += 1
+        return None
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        last_frame = next_push = loop.time()
+        while True:
+            # next engine frame
+            await asyncio.sleep(0)
+            now = loop.time()
+            self.num_frames += 1
+            playing_world = util.CONTEXT.playing_world
+            if not playing_world:
+                continue
+            # e.g. a 'reset' pauses the game again
+            if GameplayStatics.IsGamePaused(playing_world):
+                GameplayStatics.SetGamePaused(playing_world, False)
+            controller = util.CONTEXT.controller
+            if controller is not None:
+                for key_name, value in self.axes.items():
+                    controller.input_axis(Key(KeyName=key_name), value, now - last_frame)
+            last_frame = now
+
+            if now < next_push:
+                continue
+            # don't try to catch up on missed frames (no bursts)
+            next_push = max(next_push + self.interval, now)
+            if self.connection.is_over_high_water():
+                self.num_skipped += 1
+                continue
+            util.CONTEXT.invalidate_actors()
+            with util.TRACER.span("compile_obs_dict"):
+                response = util.compile_obs_dict(drain=True)
+            if response["status"] != "ok":
+                ue.log("stream: {}".format(response["message"]))
+                continue
+            update_obs_stats(response)
+            publish(response)
+            self.seq += 1
+            response["cmd"] = "stream"
+            response["seq"] = self.seq
+            response["server_time"] = time.time()
+            response["last_action"] = self.last_action
+            send_message(response, self.connection)
+
+    def close(self):
+        self._task.cancel()
+        playing_world = util.CONTEXT.playing_world
+        if playing_world:
+            GameplayStatics.SetGamePaused(playing_world, True)
+
+    def get_stats(self):
+        return {"num_sent": self.seq, "num_skipped": self.num_skipped, "num_actions": self.num_actions,
+                "num_frames": self.num_frames}
+
+
+def publish(response):
+    """
+    Broadcasts the observations of a step/reset response to all spectators (see `subscribe`). The frame is serialized
+    only once (for all spectators) and only after the controlling connection's response has been sent.
+    """
+    global _BROADCAST_SEQ
+    if not SPECTATORS or response["status"] != "ok":
+        return
+    _BROADCAST_SEQ += 1
+    # snapshot (the response's dicts and arrays may be reused/changed before the frame gets serialized)
+    frame = {"status": "ok", "cmd": "broadcast", "seq": _BROADCAST_SEQ}
+    for field in ("obs_dict", "agent_obs_dict", "_reward", "_is_terminal", "_events"):
+        if field in response:
+            frame[field] = _snapshot(response[field])
+    asyncio.get_event_loop().call_soon(_broadcast, frame)
+
+
+def _snapshot(value):
+    """
+    :return: A copy of the given (nested) response value: dicts, lists and numpy arrays are copied, everything else
+        is immutable.
+    :rtype: any
+    """
+    if isinstance(value, dict):
+        return {key: _snapshot(v) for key, v in value.items()}
+    elif isinstance(value, list):
+        return [_snapshot(v) for v in value]
+    elif isinstance(value, np.ndarray):
+        return value.copy()
+    return value
+
+
+def _broadcast(frame):
+    frame = msgpack.packb(frame)
+    frame = bytes("{:08d}".format(len(frame)), encoding="ascii") + frame
+    for connection in SPECTATORS:
+        connection.subscription.offer(frame)
+
+
+# all currently connected clients
+CONNECTIONS = set()
+
+# all spectator connections (see 'subscribe' command) and the running number of broadcast frames
+SPECTATORS = set()
+_BROADCAST_SEQ = 0
+
+# the on-demand profiler (see 'profile' command)
+PROFILER = server_profiler.Profiler()
+PROFILE_TIMER = None  # the handle of the timer stopping a duration-limited profiling run
+
+# executes the command handlers by priority class within a per-frame time budget (see 'schedule' command)
+SCHEDULER = command_scheduler.CommandScheduler()
+
+
+def drop_image_observations(message, connection):
+    """
+    :return: A copy of the message without any image (uint8 with 3 dims) observations; their keys are listed under
+        'dropped_obs'.
+    :rtype: dict
+    """
+    message = dict(message)
+    dropped = []
+    for field in ("obs_dict", "agent_obs_dict"):
+        if field not in message:
+            continue
+        obs_dict = {}
+        for key, value in message[field].items():
+            if isinstance(value, np.ndarray) and value.dtype == np.uint8 and value.ndim >= 3:
+                dropped.append(key)
+            else:
+                obs_dict[key] = value
+        message[field] = obs_dict
+    message["dropped_obs"] = dropped
+    connection.num_dropped_obs += len(dropped)
+    return message
+
+
+def handle_message(message, connection):
+    """
+    Runs `manage_message` (traced as one span per command).
+    """
+    with util.TRACER.span("manage_message", {"cmd": message.get("cmd")}):
+        return manage_message(message, connection)
+
+
+def send_message(message, connection):
+    with util.TRACER.span("send_message"):
+        _send_message(message, connection)
+
+
+def _send_message(message, connection):
+    if connection.writer.is_closing():
+        return
+    # write-side flow control: the client does not keep up with reading our responses
+    if connection.is_over_high_water():
+        if connection.flow_policy == "disconnect":
+            ue.log("client {} does not keep up reading (write buffer: {} bytes) -> disconnecting".format(
+                connection.name, connection.get_write_buffer_size()))
+            connection.writer.transport.abort()
+            return
+        elif connection.flow_policy == "drop":
+            message = drop_image_observations(message, connection)
+            # nothing to drop -> the response goes out in full and the command loop blocks (as for "block")
+            if not message["dropped_obs"]:
+                connection.num_drop_fallbacks += 1
+                connection.drop_fallback = True
+        # "block": the command loop (see `new_client_connected`) waits for the buffer to drain before reading on
+    # replace the observations by their normalized values (running server-side statistics)
+    if connection.normalize_obs and "obs_dict" in message:
+        message = dict(message, obs_dict=util.CONTEXT.obs_stats.normalize(message["obs_dict"], connection.normalize_clip))
+        if "agent_obs_dict" in message:
+            message["agent_obs_dict"] = util.CONTEXT.obs_stats.normalize(message["agent_obs_dict"], connection.normalize_clip)
+    # pack all numeric observations into one fixed-layout binary record (layout negotiated for this connection)
+    if connection.layout is not None and "obs_dict" in message and "agent_obs_dict" not in message:
+        record, missing, saturated = connection.layout.encode(message["obs_dict"], message["_reward"], message["_is_terminal"])
+        # non-numeric and large observations (not part of the record) stay in the obs_dict
+        obs_dict = {key: value for key, value in message["obs_dict"].items() if key not in connection.layout.key_set}
+        message = {key: value for key, value in message.items() if key not in ("obs_dict", "_reward", "_is_terminal")}
+        message["record"] = record
+        message["obs_dict"] = obs_dict
+        if missing:
+            message["missing"] = missing
+        if saturated:
+            message["saturated"] = saturated
+    # compress large (image) arrays with the codec negotiated for this connection
+    if connection.encoder is not None and "obs_dict" in message:
+        message = dict(message, obs_dict=connection.encoder.encode_obs_dict(message["obs_dict"]))
     message = msgpack.packb(message)
     len_ = len(message)
     # ue.log("Got message cmd={} -> sending response of len={}".format(message["cmd"], len_))
-    writer.write(bytes("{:08d}".format(len_), encoding="ascii") + message)  # prepend 8-byte len field to all our messages
+    connection.writer.write(bytes("{:08d}".format(len_), encoding="ascii") + message)  # prepend 8-byte len field to all our messages
+    connection.num_bytes_sent += len_ + 8
+    connection.max_write_buffer_size = max(connection.max_write_buffer_size, connection.get_write_buffer_size())
 
 
 # this is called whenever a new client connects
 async def new_client_connected(reader, writer):
-    name = writer.get_extra_info("peername")
+    connection = ClientConnection(writer)
+    name = connection.name
     ue.log("new client connection from {0}".format(name))
+    CONNECTIONS.add(connection)
     unpacker = msgpack.Unpacker()
-    while True:
-        # wait for a line
-        # TODO: what if incoming command is longer than 8192? -> Add len field to beginning of messages (in both directions)
-        data = await reader.read(8192)
-        if not data:
-            break
-        unpacker.feed(data)
-        for message in unpacker:
-            response = manage_message(message, writer)
-            # write back immediately
-            if response:
-                send_message(response, writer)
-            # async calls -> do nothing here (async will handle it)
+    try:
+        while True:
+            # wait for a line
+            # TODO: what if incoming command is longer than 8192? -> Add len field to beginning of messages (in both directions)
+            data = await reader.read(8192)
+            if not data:
+                break
+            unpacker.feed(data)
+            for message in unpacker:
+                connection.num_messages += 1
+                response = await SCHEDULER.submit(connection.priority, handle_message, message, connection)
+                # write back immediately
+                if response:
+                    send_message(response, connection)
+                PROFILER.after_command(message.get("cmd"))
+                # don't read any further commands until the client has caught up reading our responses
+                if connection.should_block():
+                    start = time.perf_counter()
+                    await writer.drain()
+                    connection.num_blocked += 1
+                    connection.time_blocked += time.perf_counter() - start
+                connection.drop_fallback = False
+                # async calls -> do nothing here (async will handle it)
+    finally:
+        CONNECTIONS.discard(connection)
+        SPECTATORS.discard(connection)
+        if connection.subscription is not None:
+            connection.subscription.close()
+        if connection.pending_reset is not None:
+            connection.pending_reset.cancel()
+        if connection.stream is not None:
+            connection.stream.close()
 
     ue.log('client {0} disconnected'.format(name))
 
@@ -278,23 +1329,51 @@ async def new_client_connected(reader, writer):
 # this spawns the server
 # the try/finally trick allows for gentle shutdown of the server
 async def spawn_server(host, port):
+    coro = None
     try:
         coro = await asyncio.start_server(new_client_connected, host, port)
         ue.log('tcp server spawned on {0}:{1}'.format(host, port))
         await coro.wait_closed()
     finally:
-        coro.close()
+        if coro is not None:
+            coro.close()
+        SCHEDULER.close()
         ue.log('tcp server ended')
 
+
+# this spawns the server on a unix domain socket (cheaper than loopback tcp if learner and game share a machine)
+async def spawn_unix_server(path):
+    # remove a stale socket file left over from a previous run (before binding; never any other kind of file)
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+    coro = None
+    try:
+        coro = await asyncio.start_unix_server(new_client_connected, path)
+        ue.log('unix socket server spawned on {0}'.format(path))
+        await coro.wait_closed()
+    finally:
+        if coro is not None:
+            coro.close()
+        SCHEDULER.close()
+        ue.log('unix socket server ended')
+
     
 """
-Main Program: Get UE4 settings and start listening on port for incoming connections.
+Main Program: Get UE4 settings and start listening on port (and/or unix socket) for incoming connections.
 """
 
 settings = ue.get_mutable_default(Engine2LearnSettings)
 if settings.Address and settings.Port:
     asyncio.ensure_future(spawn_server(settings.Address, settings.Port))
-else:
+elif not settings.SocketPath:
     ue.log("No settings for either address ({}) or port ({})!".format(settings.Address, settings.Port))
+if settings.SocketPath:
+    if hasattr(socket, "AF_UNIX"):
+        asyncio.ensure_future(spawn_unix_server(settings.SocketPath))
+    else:
+        ue.log("Unix domain sockets are not supported on this platform (SocketPath={})!".format(settings.SocketPath))
 
 
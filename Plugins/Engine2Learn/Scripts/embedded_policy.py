@@ -0,0 +1,211 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/embedded_policy.py
+
+ A small numpy policy (linear or MLP) that can be uploaded by the client
+ and run inside the game server (see the server's 'upload_policy' and
+ 'rollout' commands), so that on-policy algorithms with cheap policies
+ don't pay a network round trip for each single action decision.
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import math
+import numpy as np
+
+
+# probabilities are clamped to [_EPS, 1 - _EPS] before taking their log (-> finite log-probs)
+_EPS = 1e-7
+
+_ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "linear": lambda x: x,
+}
+
+
+def _space_size(desc):
+    """
+    :return: The number of (flattened) input values of an observation_space descriptor (None if not numeric).
+    :rtype: Union[int,None]
+    """
+    if desc["type"] == "Bool":
+        return 1
+    elif desc["type"] in ("Continuous", "IntBox"):
+        return int(np.prod(desc.get("shape", (1,))))
+    return None
+
+
+def _get_inputs(keys, observation_space_desc):
+    """
+    :return: List of tuples (obs key, size) for the given policy input keys.
+    :rtype: List[tuple]
+    :raises ValueError: If a key is not a (numeric) observation of the given observation_space_desc.
+    """
+    inputs = []
+    for key in keys:
+        if key not in observation_space_desc:
+            raise ValueError("Policy input {} is not an observation of this game!".format(key))
+        size = _space_size(observation_space_desc[key])
+        if size is None:
+            raise ValueError("Policy input {} is not numeric ({})!".format(key, observation_space_desc[key]["type"]))
+        inputs.append((key, size))
+    return inputs
+
+
+def _log_normal_cdf(z):
+    """
+    :return: log(P(X <= z)) for a standard normal X (clamped to a finite value).
+    :rtype: float
+    """
+    return math.log(max(0.5 * math.erfc(-z / math.sqrt(2.0)), _EPS))
+
+
+class EmbeddedPolicy(object):
+    """
+    A feed-forward policy: concatenated (flattened) observations -> hidden layers -> output logits/means, which are
+    mapped onto the game's action- and axis-mappings:
+    - {"name": [ActionName], "type": "action"}: 1 output (logit of a Bernoulli: pressed or not).
+    - {"name": [AxisName], "type": "axis", "values": [list of axis values]}: len(values) outputs (logits of a categorical).
+    - {"name": [AxisName], "type": "axis", "log_std": [float]}: 1 output (mean of a Gaussian, clipped to [-1.0, 1.0];
+      the log-probability is that of the clipped value, i.e. the clipped tails count as point masses at -1.0 and 1.0).
+    Axis-mappings are driven through their first key with a non-zero scale.
+    """
+    def __init__(self, spec, observation_space_desc, action_space_desc):
+        """
+        :param dict spec: The uploaded policy spec with keys: 'inputs' (list of obs keys), 'layers' (list of dicts with
+            'W' (in x out) and 'b' (out) arrays), 'outputs' (list of output specs, see above) and optionally 'activation'
+            (tanh|relu|linear; default: tanh), 'input_mean' and 'input_std' (arrays for input normalization).
+        :param dict observation_space_desc: The observation_space_desc of the game (see server_utils.get_spec).
+        :param dict action_space_desc: The action_space_desc of the game (see server_utils.get_spec).
+        :raises ValueError: If the spec does not match the game's spaces or the layer shapes don't fit together.
+        """
+        for field in ("inputs", "layers", "outputs"):
+            if field not in spec:
+                raise ValueError("Field '{}' missing in policy spec!".format(field))
+
+        # the inputs (obs keys -> flat float32 vector)
+        self.inputs = _get_inputs(spec["inputs"], observation_space_desc)  # list of tuples: (obs key, size)
+        self.input_size = sum(size for _, size in self.inputs)
+        self.input_mean = np.asarray(spec.get("input_mean", 0.0), dtype=np.float32)
+        self.input_std = np.asarray(spec.get("input_std", 1.0), dtype=np.float32)
+
+        # the layers
+        if spec.get("activation", "tanh") not in _ACTIVATIONS:
+            raise ValueError("Unknown activation ({})! Needs to be one of {}.".format(spec["activation"], list(_ACTIVATIONS)))
+        self.activation = _ACTIVATIONS[spec.get("activation", "tanh")]
+        self.layers = []
+        size = self.input_size
+        for layer in spec["layers"]:
+            W, b = np.asarray(layer["W"], dtype=np.float32), np.asarray(layer["b"], dtype=np.float32)
+            if W.ndim != 2 or W.shape[0] != size or b.shape != (W.shape[1],):
+                raise ValueError("Policy layer shapes W={} b={} don't fit the layer's input size ({})!".format(W.shape, b.shape, size))
+            self.layers.append((W, b))
+            size = W.shape[1]
+
+        # the outputs (slices of the last layer -> action/axis key names)
+        self.outputs = []  # list of tuples: (type, key name, key scale, slice, values or None, log_std or None)
+        offset = 0
+        for output in spec["outputs"]:
+            name, type_ = output.get("name"), output.get("type")
+            if name not in action_space_desc or action_space_desc[name]["type"] != type_:
+                raise ValueError("Policy output {} is not an {}-mapping of this game!".format(name, type_))
+            if type_ == "action":
+                key_name, scale, n, values, log_std = action_space_desc[name]["keys"][0], 1.0, 1, None, None
+            else:
+                keys = [(key_name, scale) for key_name, scale in action_space_desc[name]["keys"] if scale != 0.0]
+                if not keys:
+                    raise ValueError("Policy output {} has no key with a non-zero scale!".format(name))
+                key_name, scale = keys[0]
+                if "values" in output:
+                    values = np.asarray(output["values"], dtype=np.float32)
+                    n, log_std = len(values), None
+                else:
+                    n, values, log_std = 1, None, float(output.get("log_std", 0.0))
+            self.outputs.append((type_, key_name, scale, slice(offset, offset + n), values, log_std))
+            offset += n
+        if offset != size:
+            raise ValueError("Policy outputs need {} values, but the last layer has {}!".format(offset, size))
+
+    def check_inputs(self, observation_space_desc):
+        """
+        Checks the policy's inputs against the game's current observation_space_desc (observers may have been added or
+        removed since the policy was uploaded).
+
+        :raises ValueError: If an input is no longer a numeric observation of the game or its size changed.
+        """
+        for (key, size), (_, new_size) in zip(self.inputs, _get_inputs([key for key, _ in self.inputs], observation_space_desc)):
+            if new_size != size:
+                raise ValueError("Policy input {} has {} values, but the observation now has {}!".format(key, size, new_size))
+
+    def featurize(self, obs_dict):
+        """
+        :return: The flat (normalized) float32 input vector for the given obs_dict.
+        :rtype: np.ndarray
+        :raises KeyError: If an input is missing in the obs_dict.
+        :raises ValueError: If an input has the wrong number of values.
+        """
+        x = np.empty((self.input_size,), dtype=np.float32)
+        offset = 0
+        for key, size in self.inputs:
+            x[offset:offset + size] = np.asarray(obs_dict[key], dtype=np.float32).reshape(-1)
+            offset += size
+        return (x - self.input_mean) / self.input_std
+
+    def forward(self, x):
+        for i, (W, b) in enumerate(self.layers):
+            x = x.dot(W) + b
+            if i < len(self.layers) - 1:
+                x = self.activation(x)
+        return x
+
+    def act(self, x, rng, deterministic=False):
+        """
+        Samples one action for the given input vector.
+
+        :param np.ndarray x: The input vector (see `featurize`).
+        :param np.random.RandomState rng: The RNG to sample with.
+        :param bool deterministic: If True, picks the most likely action instead of sampling.
+        :return: Tuple: the raw action values (one per output), the step message's 'axes' and 'actions' lists, the
+            log-probability of the sampled action.
+        :rtype: tuple
+        """
+        out = self.forward(x)
+        raw = np.empty((len(self.outputs),), dtype=np.float32)
+        axes, actions = [], []
+        log_prob = 0.0
+        for i, (type_, key_name, scale, slice_, values, log_std) in enumerate(self.outputs):
+            o = out[slice_]
+            # Bernoulli (action pressed or not)
+            if type_ == "action":
+                logit = min(max(float(o[0]), -50.0), 50.0)
+                p = min(max(1.0 / (1.0 + math.exp(-logit)), _EPS), 1.0 - _EPS)
+                pressed = (p > 0.5) if deterministic else (rng.random_sample() < p)
+                log_prob += np.log(p if pressed else 1.0 - p)
+                raw[i] = float(pressed)
+                actions.append((key_name, bool(pressed)))
+                continue
+            # categorical over discrete axis values
+            if values is not None:
+                logits = o - o.max()
+                probs = np.exp(logits) / np.exp(logits).sum()
+                j = int(probs.argmax()) if deterministic else rng.choice(len(probs), p=probs)
+                log_prob += np.log(probs[j])
+                value = values[j]
+            # Gaussian (clipped)
+            else:
+                mean, std = float(o[0]), math.exp(log_std)
+                value = mean if deterministic else mean + std * rng.standard_normal()
+                if value >= 1.0:
+                    value = 1.0
+                    log_prob += _log_normal_cdf((mean - 1.0) / std)
+                elif value <= -1.0:
+                    value = -1.0
+                    log_prob += _log_normal_cdf((-1.0 - mean) / std)
+                else:
+                    log_prob += -0.5 * ((value - mean) / std) ** 2 - log_std - 0.5 * math.log(2.0 * math.pi)
+            raw[i] = value
+            axes.append((key_name, float(value / scale)))
+        return raw, axes, actions, float(log_prob)
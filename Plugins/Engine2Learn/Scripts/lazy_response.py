@@ -0,0 +1,202 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/lazy_response.py
+
+ Lazy (on-access) decoding of the server's msgpack responses (client
+ side).
+ The top-level fields of a response are decoded right away, except for
+ the obs_dict (and agent_obs_dict): for these, only the byte offsets of
+ each entry are indexed once (by walking the msgpack headers, without
+ decoding any values) and an entry is only decoded when it is accessed.
+ numpy arrays (msgpack_numpy records) come back as zero-copy
+ `np.frombuffer` views into the response's buffer, so agents that skip
+ frames or only look at the reward/terminal signals never pay for
+ deserializing camera images.
+ Indexing costs a roughly constant ~30us (python), whereas msgpack's eager
+ decoding copies all array bytes, so lazy decoding only pays off for large
+ responses (see LAZY_THRESHOLD).
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import collections.abc
+import struct
+import msgpack
+import msgpack_numpy as mnp
+import numpy as np
+
+
+# the response fields that are decoded lazily
+LAZY_FIELDS = ("obs_dict", "agent_obs_dict")
+
+# responses smaller than this (in bytes) are decoded eagerly (faster than indexing them)
+LAZY_THRESHOLD = 512 * 1024
+
+# fixed sizes (incl. the type byte) of msgpack's nil/bool/number/fixext types
+_FIXED_SIZES = {0xc0: 1, 0xc2: 1, 0xc3: 1, 0xca: 5, 0xcb: 9, 0xcc: 2, 0xcd: 3, 0xce: 5, 0xcf: 9, 0xd0: 2, 0xd1: 3,
+                0xd2: 5, 0xd3: 9, 0xd4: 3, 0xd5: 4, 0xd6: 6, 0xd7: 10, 0xd8: 18}
+_UINT8, _UINT16, _UINT32 = struct.Struct(">B"), struct.Struct(">H"), struct.Struct(">I")
+# bin/str/ext types with a length field: type byte -> (length field, extra bytes (ext type))
+_SIZED_TYPES = {0xc4: (_UINT8, 0), 0xc5: (_UINT16, 0), 0xc6: (_UINT32, 0), 0xd9: (_UINT8, 0), 0xda: (_UINT16, 0),
+                0xdb: (_UINT32, 0), 0xc7: (_UINT8, 1), 0xc8: (_UINT16, 1), 0xc9: (_UINT32, 1)}
+# array/map types with a 16/32-bit item count: type byte -> (count field, number of nested objects per item)
+_CONTAINER_TYPES = {0xdc: (_UINT16, 1), 0xdd: (_UINT32, 1), 0xde: (_UINT16, 2), 0xdf: (_UINT32, 2)}
+
+
+def _is_map(b):
+    return 0x80 <= b <= 0x8f or b in (0xde, 0xdf)
+
+
+def _read_header(buf, pos):
+    """
+    :return: Tuple: number of nested objects following the header (2 per map entry) or None for non-containers, the
+        position after the header.
+    :rtype: tuple
+    """
+    b = buf[pos]
+    if 0x80 <= b <= 0x8f:
+        return 2 * (b & 0x0f), pos + 1
+    elif 0x90 <= b <= 0x9f:
+        return b & 0x0f, pos + 1
+    elif b in _CONTAINER_TYPES:
+        field, per_item = _CONTAINER_TYPES[b]
+        return per_item * field.unpack_from(buf, pos + 1)[0], pos + 1 + field.size
+    return None, pos
+
+
+def _skip(buf, pos):
+    """
+    :return: The position right after the msgpack object starting at pos (nothing is decoded).
+    :rtype: int
+    """
+    # iterative (no recursion): count down the objects still to be skipped
+    remaining = 1
+    while remaining:
+        remaining -= 1
+        b = buf[pos]
+        if b <= 0x7f or b >= 0xe0:
+            pos += 1
+        elif 0xa0 <= b <= 0xbf:
+            pos += 1 + (b & 0x1f)
+        elif b in _FIXED_SIZES:
+            pos += _FIXED_SIZES[b]
+        elif b in _SIZED_TYPES:
+            field, extra = _SIZED_TYPES[b]
+            pos += 1 + field.size + extra + field.unpack_from(buf, pos + 1)[0]
+        else:
+            n, pos_ = _read_header(buf, pos)
+            if n is None:
+                raise ValueError("Invalid msgpack type byte 0x{:02x} at position {}!".format(b, pos))
+            remaining += n
+            pos = pos_
+    return pos
+
+
+def _index_map(buf, pos, nested_keys=()):
+    """
+    :param tuple nested_keys: Keys whose values are (map) values to be indexed as well (instead of just skipped).
+    :return: Tuple: list of (decoded key, start of value, end of value or - for nested_keys - a tuple (the nested map's
+        entries, its end)) of the msgpack map starting at pos, the position after the map.
+    :rtype: tuple
+    """
+    if not _is_map(buf[pos]):
+        raise ValueError("Expected a msgpack map at position {}!".format(pos))
+    n, pos = _read_header(buf, pos)
+    entries = []
+    for _ in range(n // 2):
+        b = buf[pos]
+        # fast path: short str keys (e.g. obs keys)
+        if 0xa0 <= b <= 0xbf:
+            end = pos + 1 + (b & 0x1f)
+            key = bytes(buf[pos + 1:end]).decode("utf-8")
+        else:
+            end = _skip(buf, pos)
+            key = msgpack.unpackb(buf[pos:end])
+        if key in nested_keys:
+            nested, end = _index_map(buf, end)
+            entries.append((key, nested, end))
+        else:
+            pos, end = end, _skip(buf, end)
+            entries.append((key, pos, end))
+        pos = end
+    return entries, pos
+
+
+def _decode_value(buf, start, end):
+    """
+    Decodes one obs_dict value; numpy arrays are returned as zero-copy views into buf.
+    """
+    if _is_map(buf[start]):
+        entries, _ = _index_map(buf, start)
+        fields = {key: msgpack.unpackb(buf[s:e]) for key, s, e in entries if key != b"data"}
+        # plain (non-structured, non-object) msgpack_numpy array
+        if fields.get(b"nd") is True and fields.get(b"kind", b"") == b"":
+            dtype = np.dtype(fields[b"type"])
+            shape = tuple(fields[b"shape"])
+            data_end = [e for key, _, e in entries if key == b"data"][0]
+            count = int(np.prod(shape))
+            # the raw bytes are the last count * itemsize bytes of the bin object (behind its header)
+            offset = data_end - count * dtype.itemsize
+            return np.frombuffer(buf, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return msgpack.unpackb(buf[start:end], object_hook=mnp.decode)
+
+
+class LazyObsDict(collections.abc.Mapping):
+    """
+    Read-only obs_dict, whose entries are decoded from the response buffer on first access (and then cached).
+    """
+    def __init__(self, buf, offsets):
+        """
+        :param Union[bytes,bytearray] buf: The response buffer (must not be altered while this obs_dict is in use).
+        :param dict offsets: Dict mapping obs keys to (start, end) of their msgpack'd value in buf.
+        """
+        self._buf = buf
+        self._offsets = offsets
+        self._decoded = {}
+
+    def __getitem__(self, key):
+        if key not in self._decoded:
+            start, end = self._offsets[key]
+            self._decoded[key] = _decode_value(self._buf, start, end)
+        return self._decoded[key]
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, key):
+        return key in self._offsets
+
+    @property
+    def num_decoded(self):
+        return len(self._decoded)
+
+    def to_dict(self):
+        """
+        :return: A plain dict with all entries decoded.
+        :rtype: dict
+        """
+        return {key: self[key] for key in self._offsets}
+
+
+def decode_lazy(buf, lazy_fields=LAZY_FIELDS):
+    """
+    Decodes a (length-field stripped) response, leaving its obs entries encoded until accessed (see `LazyObsDict`).
+
+    :param Union[bytes,bytearray] buf: The msgpack'd response. Not copied: it must not be reused for the next response.
+    :param tuple lazy_fields: The (map) fields of the response to decode lazily.
+    :return: The response dict.
+    :rtype: dict
+    """
+    entries, _ = _index_map(buf, 0, lazy_fields)
+    response = {}
+    for key, start, end in entries:
+        if key in lazy_fields:
+            response[key] = LazyObsDict(buf, {obs_key: (s, e) for obs_key, s, e in start})
+        else:
+            response[key] = msgpack.unpackb(buf[start:end], object_hook=mnp.decode)
+    return response
@@ -0,0 +1,265 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/load_generator.py
+
+ Soak/load generator: opens N concurrent clients against one server (a
+ real game's ducandu_server or a local stub backend) and has each of them
+ send a configurable mix of commands at a configurable rate.
+ Reports per-client latency percentiles, fairness (Jain's index over the
+ clients' throughputs), server memory growth (via the 'get_stats'
+ command) and dropped connections.
+
+ usage:
+   python load_generator.py --address localhost:6025 --clients 16 --duration 60
+   python load_generator.py --stub --clients 64 --mix step=0.7,set=0.1,get_spec=0.1,reset=0.1 --rate 30
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import msgpack
+import numpy as np
+
+from ducandu_client import AsyncDucanduClient, LEN_FIELD_SIZE
+from rollout_collector import parse_address
+from server_profiler import get_memory_usage_kb
+
+
+COMMANDS = {
+    "step": {"cmd": "step", "delta_time": 1.0/60.0, "num_ticks": 4},
+    "set": {"cmd": "set", "setters": [("Player:Health", 100.0, False)]},
+    "get_spec": {"cmd": "get_spec"},
+    "reset": {"cmd": "reset"},
+}
+
+
+def parse_mix(mix):
+    """
+    :param str mix: Comma separated list of command=weight pairs (e.g. "step=0.7,reset=0.3").
+    :return: Tuple: list of command names, array of normalized weights.
+    :rtype: tuple
+    """
+    names, weights = [], []
+    for item in mix.split(","):
+        name, weight = item.split("=")
+        if name not in COMMANDS:
+            raise ValueError("Unknown command in mix ({})! Needs to be one of {}.".format(name, list(COMMANDS)))
+        names.append(name)
+        weights.append(float(weight))
+    weights = np.asarray(weights)
+    return names, weights / weights.sum()
+
+
+class ClientStats(object):
+    def __init__(self):
+        self.latencies = {}  # key=command name, value=list of latencies (s)
+        self.num_requests = 0
+        self.num_errors = 0
+        self.num_dropped = 0  # connections that were lost (or timed out)
+
+    def all_latencies(self):
+        return np.concatenate([np.asarray(l) for l in self.latencies.values()]) if self.latencies else np.zeros((0,))
+
+
+async def run_client(address, names, weights, rate, stats, stop_time, timeout, seed):
+    """
+    Sends randomly chosen commands (see `parse_mix`) at the given rate (0=as fast as possible) until stop_time.
+    Lost connections are counted and re-established.
+    """
+    rng = np.random.RandomState(seed)
+    client = None
+    next_time = time.perf_counter()
+    while time.perf_counter() < stop_time:
+        if client is None:
+            client = AsyncDucanduClient(**parse_address(address))
+            try:
+                await asyncio.wait_for(client.connect(), timeout)
+            except (OSError, asyncio.TimeoutError):
+                stats.num_dropped += 1
+                client = None
+                await asyncio.sleep(0.1)
+                continue
+        name = names[rng.choice(len(names), p=weights)]
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.request(COMMANDS[name]), timeout)
+        except (OSError, asyncio.TimeoutError):
+            stats.num_dropped += 1
+            client.close()
+            client = None
+            continue
+        stats.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        stats.num_requests += 1
+        if response.get("status") != "ok":
+            stats.num_errors += 1
+        if rate > 0:
+            next_time += 1.0 / rate
+            await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+    if client is not None:
+        client.close()
+
+
+async def monitor_memory(address, samples, stop_time, interval=1.0):
+    """
+    Polls the server's 'get_stats' command through a separate connection.
+    """
+    client = AsyncDucanduClient(**parse_address(address))
+    await client.connect()
+    try:
+        while time.perf_counter() < stop_time:
+            response = await client.request({"cmd": "get_stats"})
+            samples.append((time.perf_counter(), response.get("memory_rss_kb"), response.get("num_connections")))
+            await asyncio.sleep(interval)
+    finally:
+        client.close()
+
+
+def jain_fairness(values):
+    """
+    :return: Jain's fairness index (1.0=all values equal, 1/n=one value gets everything).
+    :rtype: float
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0 or not values.any():
+        return 1.0
+    return values.sum() ** 2 / (len(values) * (values ** 2).sum())
+
+
+async def run_load(address, num_clients, names, weights, rate, duration, timeout):
+    stop_time = time.perf_counter() + duration
+    stats = [ClientStats() for _ in range(num_clients)]
+    memory = []
+    tasks = [asyncio.ensure_future(monitor_memory(address, memory, stop_time))]
+    tasks += [asyncio.ensure_future(run_client(address, names, weights, rate, s, stop_time, timeout, i)) for i, s in enumerate(stats)]
+    await asyncio.gather(*tasks)
+    return stats, memory
+
+
+def report(stats, memory, duration):
+    print("{:>6} {:>8} {:>9} {:>9} {:>9} {:>9} {:>7} {:>7}".format("client", "requests", "req/s", "p50 ms", "p95 ms", "p99 ms", "errors", "dropped"))
+    throughputs = []
+    for i, s in enumerate(stats):
+        latencies = s.all_latencies() * 1e3
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+        throughputs.append(s.num_requests / duration)
+        print("{:>6} {:>8} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>7} {:>7}".format(i, s.num_requests, throughputs[-1], p50, p95, p99, s.num_errors, s.num_dropped))
+
+    all_latencies = np.concatenate([s.all_latencies() for s in stats]) * 1e3
+    if len(all_latencies):
+        print("all clients: {:.1f} req/s  p50={:.2f}ms p95={:.2f}ms p99={:.2f}ms max={:.2f}ms".format(
+            sum(throughputs), *np.percentile(all_latencies, [50, 95, 99, 100])))
+    for name in sorted({n for s in stats for n in s.latencies}):
+        l = np.concatenate([np.asarray(s.latencies[name]) for s in stats if name in s.latencies]) * 1e3
+        print("  {:>9}: n={:<8} p50={:.2f}ms p99={:.2f}ms".format(name, len(l), *np.percentile(l, [50, 99])))
+    print("fairness (Jain's index over client throughputs): {:.3f}".format(jain_fairness(throughputs)))
+    print("dropped connections: {}  error responses: {}".format(sum(s.num_dropped for s in stats), sum(s.num_errors for s in stats)))
+    rss = [m for _, m, _ in memory if m is not None]
+    if rss:
+        print("server memory: start={:.1f}MB end={:.1f}MB growth={:+.1f}MB (peak connections: {})".format(
+            rss[0] / 1024, rss[-1] / 1024, (rss[-1] - rss[0]) / 1024, max(c for _, _, c in memory)))
+    else:
+        print("server memory: not reported by server")
+
+
+def run_stub(port, service_time_ms=2.0, camera_size=0):
+    """
+    A stub backend (same framing and command set as ducandu_server) for load-testing the client side and the
+    single-loop server architecture without running a game. Handlers block the loop for `service_time_ms` (just like the
+    real handlers block the game thread); resets are answered one loop iteration later (as in the real server).
+    """
+    connections = set()
+    obs_dict = {"Observer{}/Location".format(i): (float(i), 0.0, 0.0) for i in range(10)}
+    if camera_size:
+        obs_dict["Camera/camera"] = np.zeros((camera_size, camera_size, 3), dtype=np.uint8)
+    import msgpack_numpy as mnp
+    mnp.patch()
+
+    def send(writer, message):
+        packed = msgpack.packb(message)
+        writer.write(bytes("{:0{}d}".format(len(packed), LEN_FIELD_SIZE), encoding="ascii") + packed)
+
+    async def client_connected(reader, writer):
+        connections.add(writer)
+        unpacker = msgpack.Unpacker()
+        try:
+            while True:
+                data = await reader.read(8192)
+                if not data:
+                    break
+                unpacker.feed(data)
+                for message in unpacker:
+                    cmd = message.get("cmd")
+                    if cmd == "get_stats":
+                        send(writer, {"status": "ok", "num_connections": len(connections), "memory_rss_kb": get_memory_usage_kb()})
+                        continue
+                    time.sleep(service_time_ms / 1000.0)
+                    response = {"status": "ok", "obs_dict": obs_dict, "_reward": 0.0, "_is_terminal": False}
+                    if cmd == "reset":
+                        asyncio.get_event_loop().call_soon(send, writer, response)
+                    elif cmd == "get_spec":
+                        send(writer, {"status": "ok", "action_space_desc": {}, "observation_space_desc": {}})
+                    else:
+                        send(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            connections.discard(writer)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(asyncio.start_server(client_connected, "127.0.0.1", port))
+    print("stub backend listening on 127.0.0.1:{}".format(port), flush=True)
+    loop.run_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for ducandu_server.")
+    parser.add_argument("--address", help="host:port or unix:/path of the server")
+    parser.add_argument("--stub", action="store_true", help="start a local stub backend instead of using a real server")
+    parser.add_argument("--stub-port", type=int, default=16999)
+    parser.add_argument("--stub-service-time", type=float, default=2.0, help="stub: time (ms) each command blocks the loop")
+    parser.add_argument("--stub-camera-size", type=int, default=0, help="stub: add a camera obs of this width/height")
+    parser.add_argument("--run-stub", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", default="step=0.7,set=0.1,get_spec=0.1,reset=0.1")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests/sec per client (0=as fast as possible)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds after which a request counts as dropped")
+    args = parser.parse_args()
+
+    if args.run_stub:
+        run_stub(args.stub_port, args.stub_service_time, args.stub_camera_size)
+        return
+
+    stub = None
+    address = args.address
+    if args.stub:
+        stub = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--run-stub", "--stub-port", str(args.stub_port),
+                                 "--stub-service-time", str(args.stub_service_time), "--stub-camera-size", str(args.stub_camera_size)],
+                                stdout=subprocess.PIPE)
+        stub.stdout.readline()  # wait until it listens
+        address = "127.0.0.1:{}".format(args.stub_port)
+    elif not address:
+        parser.error("Either --address or --stub is required!")
+
+    names, weights = parse_mix(args.mix)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        stats, memory = loop.run_until_complete(run_load(address, args.clients, names, weights, args.rate, args.duration, args.timeout))
+        report(stats, memory, args.duration)
+    finally:
+        if stub is not None:
+            stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/obs_statistics.py
+
+ Running statistics (count, mean, variance, min, max) per observation
+ key, kept inside the game server and updated from the compiled obs on
+ every step (see the server's 'obs_stats' command). Batches (e.g. the
+ stacked per-agent observations) are merged with Chan's parallel variant
+ of Welford's algorithm, so one node-wide estimate serves all clients
+ (consistent normalization, no per-worker bookkeeping).
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import numpy as np
+
+
+class RunningStats(object):
+    """
+    Element-wise running count/mean/variance/min/max of one observation key (shape of a single observation).
+    """
+    def __init__(self, shape):
+        self.shape = shape
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)  # sum of squared deviations from the mean
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+        self._out = np.zeros(shape, dtype=np.float32)  # reused output buffer for `normalize`
+
+    @property
+    def var(self):
+        return self.m2 / self.count if self.count > 0 else np.ones(self.shape)
+
+    def update(self, batch):
+        """
+        :param np.ndarray batch: n observations (shape: n x self.shape).
+        """
+        n = len(batch)
+        if n == 0:
+            return
+        batch_mean = batch.mean(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.mean += delta * (n / total)
+        self.m2 += ((batch - batch_mean) ** 2).sum(axis=0) + delta ** 2 * (self.count * n / total)
+        self.count = total
+        np.minimum(self.min, batch.min(axis=0), out=self.min)
+        np.maximum(self.max, batch.max(axis=0), out=self.max)
+
+    def normalize(self, value, clip=None, epsilon=1e-8):
+        """
+        :return: The float32 (value - mean) / std (clipped to [-clip, clip] if clip is given).
+            Note: For single observations, the returned array is reused by the next call.
+        :rtype: np.ndarray
+        """
+        out = self._out if np.shape(value) == self.shape else None
+        out = np.divide(np.subtract(value, self.mean), np.sqrt(self.var + epsilon), out=out, casting="unsafe")
+        if clip is not None:
+            np.clip(out, -clip, clip, out=out)
+        return out.astype(np.float32, copy=False)
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "var": self.var, "std": np.sqrt(self.var),
+                "min": self.min, "max": self.max}
+
+
+class ObsStatistics(object):
+    """
+    RunningStats for all numeric observation keys. Non-numeric (e.g. str) observations are ignored, as are arrays with
+    more than `max_size` elements (e.g. camera images; their per-pixel stats would cost more than they are worth).
+    """
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.enabled = True
+        self.stats = {}  # key=obs key, value=RunningStats
+        self._ignored = set()
+
+    def reset(self):
+        self.stats = {}
+        self._ignored = set()
+
+    def update(self, obs_dict, batched=False):
+        """
+        :param dict obs_dict: The compiled obs_dict.
+        :param bool batched: Whether each value holds a batch of observations (first axis; e.g. the agent_obs_dict).
+        """
+        if not self.enabled:
+            return
+        for key, value in obs_dict.items():
+            if key in self._ignored:
+                continue
+            value = np.asarray(value)
+            if value.dtype.kind not in "biuf" or value.size > self.max_size * (len(value) if batched else 1):
+                self._ignored.add(key)
+                continue
+            batch = value if batched else value[np.newaxis]
+            if key not in self.stats:
+                self.stats[key] = RunningStats(batch.shape[1:])
+            elif self.stats[key].shape != batch.shape[1:]:
+                # the observation changed its shape -> start over for this key
+                self.stats[key] = RunningStats(batch.shape[1:])
+            self.stats[key].update(batch.astype(np.float64, copy=False))
+
+    def normalize(self, obs_dict, clip=None):
+        """
+        :return: A new obs_dict with all tracked observations replaced by their float32 normalized values (all other
+            observations are passed through unchanged).
+        :rtype: dict
+        """
+        return {key: self.stats[key].normalize(value, clip) if key in self.stats and self.stats[key].count > 0 else value
+                for key, value in obs_dict.items()}
+
+    def get_stats(self, keys=None):
+        """
+        :param Union[list,None] keys: The obs keys to return the stats for (default: all tracked keys).
+        :return: Dict mapping obs keys to dicts with keys: count, mean, var, std, min, max.
+        :rtype: dict
+        """
+        return {key: s.to_dict() for key, s in self.stats.items() if keys is None or key in keys}
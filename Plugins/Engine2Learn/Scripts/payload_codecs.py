@@ -0,0 +1,146 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/payload_codecs.py
+
+ Compression codecs for large (image) arrays in obs_dicts, shared by the
+ server (encoding) and the client (decoding).
+ A codec is negotiated per connection (see the server's
+ 'negotiate_compression' command). Codec names:
+ - zlib, lz4 (if the lz4 package is installed): plain compression.
+ - delta+zlib, delta+lz4: XOR each frame against the previous frame of
+   the same obs key before compressing (mostly-static game scenes turn
+   into mostly-zero bytes, which compress a lot better).
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import zlib
+import numpy as np
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# only uint8 arrays with at least this many bytes are compressed
+DEFAULT_THRESHOLD = 4096
+
+_COMPRESSORS = {
+    "zlib": (lambda b: zlib.compress(b, 1), zlib.decompress),
+}
+if lz4_frame is not None:
+    _COMPRESSORS["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+
+
+def available_codecs():
+    """
+    :return: All codec names supported by this process (in order of preference).
+    :rtype: List[str]
+    """
+    codecs = []
+    for name in ("lz4", "zlib"):
+        if name in _COMPRESSORS:
+            codecs.extend(["delta+" + name, name])
+    return codecs
+
+
+def choose_codec(requested):
+    """
+    Picks the first codec from the requested list (in the client's order of preference) that we support.
+
+    :param List[str] requested: The codec names requested by the client.
+    :return: The chosen codec's name or None if none of the requested codecs is supported.
+    :rtype: Union[str,None]
+    """
+    supported = available_codecs()
+    for codec in requested:
+        if codec in supported:
+            return codec
+    return None
+
+
+def _split_codec(codec):
+    if codec not in available_codecs():
+        raise ValueError("Unsupported compression codec ({})! Supported are {}.".format(codec, available_codecs()))
+    if codec.startswith("delta+"):
+        return True, codec[6:]
+    return False, codec
+
+
+class PayloadEncoder(object):
+    """
+    Compresses large uint8 arrays of an obs_dict (server side). Keeps the previous frame per obs key for delta codecs.
+    """
+    def __init__(self, codec, threshold=DEFAULT_THRESHOLD):
+        self.codec = codec
+        self.threshold = threshold
+        self.delta, compressor = _split_codec(codec)
+        self._compress = _COMPRESSORS[compressor][0]
+        self._prev_frames = {}  # key=obs key, value=last sent frame (contiguous copy)
+
+    def encode_obs_dict(self, obs_dict):
+        """
+        :param dict obs_dict: The obs_dict to encode (will not be altered).
+        :return: A (shallow) copy of obs_dict, in which all large uint8 arrays are replaced by compressed records
+            (dicts with keys: codec, shape, dtype, delta, data).
+        :rtype: dict
+        """
+        encoded = None
+        for key, value in obs_dict.items():
+            if not isinstance(value, np.ndarray) or value.dtype != np.uint8 or value.nbytes < self.threshold:
+                continue
+            if encoded is None:
+                encoded = dict(obs_dict)
+            frame = np.ascontiguousarray(value)
+            is_delta = False
+            if self.delta:
+                prev = self._prev_frames.get(key)
+                if prev is not None and prev.shape == frame.shape:
+                    payload = np.bitwise_xor(frame, prev)
+                    is_delta = True
+                else:
+                    payload = frame
+                self._prev_frames[key] = frame if frame is not value else frame.copy()
+            else:
+                payload = frame
+            encoded[key] = {"codec": self.codec, "shape": frame.shape, "dtype": frame.dtype.str, "delta": is_delta,
+                            "data": self._compress(payload.data)}
+        return obs_dict if encoded is None else encoded
+
+
+class PayloadDecoder(object):
+    """
+    Decompresses compressed records of an obs_dict (client side) into preallocated arrays (one per obs key).
+    Note: The returned arrays are reused for the next response, copy them if they need to be kept around.
+    """
+    def __init__(self):
+        self._frames = {}  # key=obs key, value=preallocated array holding the last decoded frame
+
+    def decode_obs_dict(self, obs_dict):
+        """
+        Decodes all compressed records of the given obs_dict in place.
+
+        :param dict obs_dict: The obs_dict as received from the server.
+        :return: The same obs_dict (now with numpy arrays instead of compressed records).
+        :rtype: dict
+        """
+        for key, value in obs_dict.items():
+            if not isinstance(value, dict) or "codec" not in value:
+                continue
+            _, compressor = _split_codec(value["codec"])
+            raw = np.frombuffer(_COMPRESSORS[compressor][1](value["data"]), dtype=np.dtype(value["dtype"]))
+            raw = raw.reshape(tuple(value["shape"]))
+            frame = self._frames.get(key)
+            if value["delta"]:
+                if frame is None or frame.shape != raw.shape:
+                    raise ValueError("Received delta frame for obs key {} without a previous key frame!".format(key))
+                np.bitwise_xor(frame, raw, out=frame)
+            else:
+                if frame is None or frame.shape != raw.shape or frame.dtype != raw.dtype:
+                    frame = self._frames[key] = np.empty_like(raw)
+                np.copyto(frame, raw)
+            obs_dict[key] = frame
+        return obs_dict
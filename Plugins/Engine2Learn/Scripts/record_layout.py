@@ -0,0 +1,256 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/record_layout.py
+
+ Fixed-layout binary step responses, shared by the server (encoding) and
+ the client (decoding).
+ A layout is compiled once from get_spec's observation_space_desc (see
+ the server's 'negotiate_layout' command): key order, dtypes and shapes
+ are fixed, so each response only carries one packed binary record
+ (numpy structured array: scalars and vectors at known offsets) instead
+ of a msgpack map repeating all key strings. Large observations (e.g.
+ camera images) can be left out of the record (see `compile_fields`):
+ they stay in the msgpack obs_dict, where the connection's codec (see
+ payload_codecs.py) can compress them.
+ Fields are grouped by dtype, so encoding gathers all (small) values of
+ one dtype into one flat list and packs it with a single precompiled
+ struct (instead of one numpy assignment per key); large arrays are
+ copied into their field's view.
+ Continuous observations can be quantized per key:
+ - "float16": half precision.
+ - "int16": fixed point (value = int16 * scale); the scale is given by
+   the client or derived from the space's (observed) min/max bounds.
+   Values outside of the int16 range are clipped (and reported, see
+   `RecordLayout.encode`).
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import struct
+import numpy as np
+
+
+# the response signals stored in each record (besides the observations)
+SIGNAL_FIELDS = [("_reward", "<f4", (), None), ("_is_terminal", "|b1", (), None)]
+
+# the int16 range used for quantized values (symmetric)
+INT16_MAX = 32767
+
+# observations larger than this (in bytes; e.g. camera images) are by default not part of the record
+DEFAULT_MAX_FIELD_BYTES = 4096
+
+# struct format characters of the record's dtypes
+_STRUCT_CODES = {"<f4": "f", "<f2": "e", "|b1": "?", "|u1": "B", "<i4": "i"}
+
+# fields with more values than this are copied via numpy (instead of packed via struct)
+_MAX_PACKED_SIZE = 64
+
+
+def compile_fields(observation_space_desc, quantize=None, max_field_bytes=None):
+    """
+    Compiles the record fields for all numeric observations of the given observation_space_desc (grouped by dtype and
+    sorted by key; int16 quantized fields come last, so they can be quantized in one vectorized pass).
+
+    :param dict observation_space_desc: The observation_space_desc as returned by get_spec.
+    :param Union[dict,None] quantize: Dict mapping obs keys of Continuous spaces to "float16", "int16" or
+        {"type": "int16", "scale": [float]}.
+    :param Union[int,None] max_field_bytes: Observations larger than this (in bytes; e.g. camera images) are not part
+        of the record. None for no limit.
+    :return: List of field tuples (obs key, dtype str, shape, scale or None).
+    :rtype: List[tuple]
+    :raises ValueError: If a quantization option is unknown or does not fit the obs key's space.
+    """
+    quantize = quantize or {}
+    for key in quantize:
+        if key not in observation_space_desc:
+            raise ValueError("Cannot quantize {}: not an observation of this game!".format(key))
+
+    fields = []
+    for key, desc in sorted(observation_space_desc.items()):
+        if key in quantize and desc["type"] != "Continuous":
+            raise ValueError("Cannot quantize {}: not a Continuous space!".format(key))
+        shape = tuple(desc.get("shape", (1,)))
+        scale = None
+        if desc["type"] == "Bool":
+            dtype = "|b1"
+        elif desc["type"] == "IntBox":
+            dtype = "|u1" if desc.get("min", -1) >= 0 and desc.get("max", 256) <= 255 else "<i4"
+        elif desc["type"] == "Continuous":
+            dtype = "<f4"
+            option = quantize.get(key)
+            if isinstance(option, dict):
+                option, scale = option.get("type"), option.get("scale")
+            if option == "float16":
+                dtype = "<f2"
+            elif option == "int16":
+                dtype = "<i2"
+                if scale is None:
+                    if "min" not in desc:
+                        raise ValueError("Cannot quantize {} to int16: no scale given and the space has no bounds!".format(key))
+                    scale = float(np.max(np.abs([desc["min"], desc["max"]]))) / INT16_MAX or 1.0
+                scale = float(scale)
+            elif option is not None:
+                raise ValueError("Unknown quantization ({}) for {}! Needs to be one of float16|int16.".format(option, key))
+        # non-numeric (e.g. str) observations are not part of the record
+        else:
+            continue
+        if max_field_bytes is not None and int(np.prod(shape)) * np.dtype(dtype).itemsize > max_field_bytes:
+            if key in quantize:
+                raise ValueError("Cannot quantize {}: too large for the record (> {} bytes)!".format(key, max_field_bytes))
+            continue
+        fields.append((key, dtype, shape, scale))
+    return sorted(fields, key=lambda f: (f[3] is not None, f[1], f[0]))
+
+
+class RecordLayout(object):
+    """
+    A fixed record layout (numpy structured dtype) for the observations (plus reward and is_terminal signals) of one
+    step response.
+    """
+    def __init__(self, fields):
+        """
+        :param List[tuple] fields: The observation fields (obs key, dtype str, shape, scale or None) as returned by
+            `compile_fields` (or as sent by the server's 'negotiate_layout' command).
+        """
+        self.fields = [(key, dtype, tuple(shape), scale) for key, dtype, shape, scale in fields]
+        self.dtype = np.dtype([(key, dtype, shape) for key, dtype, shape, _ in self.fields + SIGNAL_FIELDS])
+        self.scales = {key: scale for key, _, _, scale in self.fields if scale is not None}
+        self.keys = [key for key, _, _, _ in self.fields]
+        self.key_set = set(self.keys)
+
+        # server side: the reused record (its buffer) and the precompiled packers to fill it
+        self._buffer = bytearray(self.dtype.itemsize)
+        self._record = np.frombuffer(self._buffer, dtype=self.dtype)
+        # runs of consecutive small fields of the same dtype: list of tuples (list of (obs key, size), dtype, struct, offset)
+        self._packers = []
+        self._views = []  # large fields: list of tuples (obs key, view into the record)
+        runs = []  # list of tuples: (dtype, list of (obs key, size))
+        for key, dtype, shape, scale in self.fields:
+            n = int(np.prod(shape))
+            if scale is not None:
+                break
+            elif n > _MAX_PACKED_SIZE:
+                self._views.append((key, self._record[key][0]))
+                runs.append((None, []))  # (ends the current run)
+            elif runs and runs[-1][0] == dtype:
+                runs[-1][1].append((key, n))
+            else:
+                runs.append((dtype, [(key, n)]))
+        for dtype, keys in runs:
+            if keys:
+                packer = struct.Struct("<{}{}".format(sum(n for _, n in keys), _STRUCT_CODES[dtype]))
+                self._packers.append((keys, dtype, packer, self.dtype.fields[keys[0][0]][1]))
+        # int16 fields: packed into a float32 staging array, then quantized all at once into their (contiguous) region
+        self._quantized = [(key, int(np.prod(shape))) for key, _, shape, scale in self.fields if scale is not None]
+        size = sum(n for _, n in self._quantized)
+        self._staging_buffer = bytearray(4 * size)
+        self._staging = np.frombuffer(self._staging_buffer, dtype=np.float32)
+        self._staging_packer = struct.Struct("<{}f".format(size))
+        self._inv_scales = np.concatenate([np.full((int(np.prod(shape)),), 1.0 / scale, dtype=np.float32)
+                                           for _, _, shape, scale in self.fields if scale is not None] or [self._staging])
+        start = self.dtype.fields[self._quantized[0][0]][1] if self._quantized else 0
+        self._int16_region = self._record.view(np.uint8)[start:start + 2 * size].view("<i2")
+        self._signals = struct.Struct("<f?")  # _reward, _is_terminal (the record's last fields)
+        self.num_saturated = 0  # number of int16 values clipped so far
+
+    @property
+    def itemsize(self):
+        return self.dtype.itemsize
+
+    def describe(self):
+        """
+        :return: The fields as plain lists (to be sent to the client, which builds the same layout from them).
+        :rtype: list
+        """
+        return [[key, dtype, list(shape), scale] for key, dtype, shape, scale in self.fields]
+
+    def encode(self, obs_dict, reward, is_terminal):
+        """
+        Writes the observations into the (reused) record and returns its bytes.
+
+        :return: Tuple: the record's bytes, list of obs keys missing in obs_dict (their fields are zeroed), list of int16
+            quantized obs keys with values outside of the int16 range (clipped; see `num_saturated`).
+        :rtype: tuple
+        :raises ValueError: If the observations don't fit the layout (e.g. wrong sizes).
+        """
+        missing = []
+        for keys, dtype, packer, offset in self._packers:
+            self._pack(keys, dtype, packer, self._buffer, offset, obs_dict, missing)
+        for key, view in self._views:
+            value = obs_dict.get(key)
+            if value is None:
+                view[...] = 0
+                missing.append(key)
+            else:
+                view[...] = value
+        saturated = []
+        if self._quantized:
+            staging = self._staging
+            self._pack(self._quantized, "<f4", self._staging_packer, self._staging_buffer, 0, obs_dict, missing)
+            np.multiply(staging, self._inv_scales, out=staging)
+            np.rint(staging, out=staging)
+            num_saturated = int(np.count_nonzero(np.abs(staging) > INT16_MAX))
+            if num_saturated:
+                self.num_saturated += num_saturated
+                offset = 0
+                for key, n in self._quantized:
+                    if np.any(np.abs(staging[offset:offset + n]) > INT16_MAX):
+                        saturated.append(key)
+                    offset += n
+                np.clip(staging, -INT16_MAX, INT16_MAX, out=staging)
+            self._int16_region[:] = staging
+        self._signals.pack_into(self._buffer, self.dtype.itemsize - self._signals.size, reward, is_terminal)
+        return bytes(self._buffer), missing, saturated
+
+    @staticmethod
+    def _pack(keys, dtype, packer, buffer, offset, obs_dict, missing):
+        """
+        Packs the (flattened) values of the given obs keys into buffer at offset (zeros for missing keys).
+        """
+        values = []
+        for key, n in keys:
+            value = obs_dict.get(key)
+            if value is None:
+                values.extend([0] * n)
+                missing.append(key)
+            elif n == 1:
+                values.append(value)
+            else:
+                values.extend(value)
+        try:
+            packer.pack_into(buffer, offset, *values)
+        # 1-tuples, nested sequences, multi-dim arrays or values of another type -> flatten and convert each value
+        except (struct.error, TypeError):
+            values = []
+            for key, n in keys:
+                value = obs_dict.get(key)
+                values.extend([0] * n if value is None else np.asarray(value).ravel().astype(dtype).tolist())
+            try:
+                packer.pack_into(buffer, offset, *values)
+            except struct.error:
+                sizes = {key: np.size(obs_dict[key]) for key, n in keys if key in obs_dict and np.size(obs_dict[key]) != n}
+                raise ValueError("Observations don't match the record layout (sizes: {})!".format(sizes))
+
+    def decode(self, payload):
+        """
+        :return: A read-only structured view of the record's bytes (no copies are made).
+        :rtype: np.ndarray
+        """
+        return np.frombuffer(payload, dtype=self.dtype, count=1)[0]
+
+    def to_obs_dict(self, record):
+        """
+        :return: The record as an obs_dict (quantized fields de-quantized to float32).
+        :rtype: dict
+        """
+        obs_dict = {}
+        for key, dtype, _, scale in self.fields:
+            if scale is not None:
+                obs_dict[key] = record[key].astype(np.float32) * np.float32(scale)
+            elif dtype == "<f2":
+                obs_dict[key] = record[key].astype(np.float32)
+            else:
+                obs_dict[key] = record[key]
+        return obs_dict
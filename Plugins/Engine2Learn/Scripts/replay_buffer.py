@@ -0,0 +1,251 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/replay_buffer.py
+
+ An array-backed prioritized replay buffer for the client (learner) side,
+ whose storage layout is derived from get_spec's observation_space_desc:
+ - one preallocated numpy ring array per obs key (optionally memory-
+   mapped to disk for buffers larger than RAM).
+ - each observation (e.g. an image frame) is stored only once: the next
+   observation of a transition is the one stored at the following slot
+   and frame stacks are rebuilt from indices at sampling time.
+ - prioritized sampling through a vectorized (array-based) sum-tree.
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import os
+import numpy as np
+
+
+class SumTree(object):
+    """
+    Array-based sum-tree over `capacity` leaves; all operations work on whole batches of indices/values at once.
+    """
+    def __init__(self, capacity):
+        self.num_leaves = 1
+        while self.num_leaves < capacity:
+            self.num_leaves *= 2
+        self.depth = int(np.log2(self.num_leaves))
+        self.tree = np.zeros((2 * self.num_leaves,), dtype=np.float64)  # root at index 1, leaves at num_leaves + i
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.num_leaves + np.asarray(indices)]
+
+    def set(self, indices, values):
+        """
+        Sets the values of the given leaves and updates all their ancestors (one vectorized pass per tree level).
+        """
+        nodes = self.num_leaves + np.asarray(indices, dtype=np.int64)
+        if len(nodes) == 0:
+            return
+        self.tree[nodes] = values
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """
+        :param np.ndarray values: Prefix-sum values in [0, total).
+        :return: For each value, the index of the leaf whose prefix-sum interval contains the value.
+        :rtype: np.ndarray
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(values.shape, dtype=np.int64)
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            go_right = values >= left
+            values -= left * go_right
+            nodes = 2 * nodes + go_right
+        return nodes - self.num_leaves
+
+
+def space_dtype(desc):
+    """
+    :return: The numpy dtype to store observations of the given observation_space descriptor with (None for
+        non-numeric spaces).
+    :rtype: Union[np.dtype,None]
+    """
+    if desc["type"] == "Bool":
+        return np.dtype(bool)
+    elif desc["type"] == "Continuous":
+        return np.dtype(np.float32)
+    elif desc["type"] == "IntBox":
+        if desc.get("min", -1) >= 0 and desc.get("max", 256) <= 255:
+            return np.dtype(np.uint8)
+        return np.dtype(np.int32)
+    return None
+
+
+class PrioritizedReplayBuffer(object):
+    """
+    Ring buffer of transitions (obs, action, reward, is_terminal) with prioritized sampling.
+    Slot t holds the observation s_t, the action a_t taken in s_t, and the resulting reward r_t and is_terminal flag d_t.
+    The next observation s_t+1 is the one stored in slot t+1 (so each observation is stored only once).
+    """
+    def __init__(self, capacity, observation_space_desc, action_shape=(), action_dtype=np.float32, alpha=0.6,
+                 frame_stack=1, storage_dir=None, seed=None):
+        """
+        :param int capacity: The max. number of transitions to store.
+        :param dict observation_space_desc: The observation_space_desc as returned by get_spec (non-numeric keys are ignored).
+        :param tuple action_shape: The shape of a single action.
+        :param action_dtype: The dtype of the actions.
+        :param float alpha: The prioritization exponent (0.0=uniform sampling).
+        :param int frame_stack: The number of most recent frames to stack for image observations (3D uint8 spaces).
+        :param Union[str,None] storage_dir: If given, all arrays are memory-mapped to .npy files in this directory.
+        :param Union[int,None] seed: The seed for the sampling RNG.
+        """
+        self.capacity = capacity
+        self.alpha = alpha
+        self.frame_stack = frame_stack
+        self.storage_dir = storage_dir
+        self.rng = np.random.RandomState(seed)
+
+        self.obs = {}
+        self.image_keys = set()
+        for key, desc in sorted(observation_space_desc.items()):
+            dtype = space_dtype(desc)
+            if dtype is None:
+                continue
+            shape = tuple(desc.get("shape", (1,)))
+            self.obs[key] = self._alloc(key, (capacity,) + shape, dtype)
+            if dtype == np.uint8 and len(shape) == 3:
+                self.image_keys.add(key)
+        self.actions = self._alloc("_actions", (capacity,) + tuple(action_shape), action_dtype)
+        self.rewards = self._alloc("_rewards", (capacity,), np.float32)
+        self.is_terminal = self._alloc("_is_terminal", (capacity,), bool)
+        self.is_first = self._alloc("_is_first", (capacity,), bool)  # first observation of an episode
+
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.size = 0
+        self._next = 0  # the slot to write to next
+
+    def _alloc(self, name, shape, dtype):
+        if self.storage_dir is None:
+            return np.zeros(shape, dtype=dtype)
+        path = os.path.join(self.storage_dir, name.replace("/", "__") + ".npy")
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    def nbytes(self):
+        """
+        :return: The total number of bytes of all storage arrays (incl. the sum-tree).
+        :rtype: int
+        """
+        arrays = list(self.obs.values()) + [self.actions, self.rewards, self.is_terminal, self.is_first, self.tree.tree]
+        return sum(a.nbytes for a in arrays)
+
+    def add(self, obs_dict, action, reward, is_terminal):
+        """
+        Adds a single transition.
+
+        :param dict obs_dict: The observation s_t (e.g. the 'obs_dict' of the previous reset/step response).
+        :param action: The action a_t taken in s_t.
+        :param float reward: The reward r_t (the '_reward' of the step response following a_t).
+        :param bool is_terminal: The '_is_terminal' flag of the step response following a_t.
+        """
+        self.add_batch({key: [value] for key, value in obs_dict.items()}, [action], [reward], [is_terminal])
+
+    def add_batch(self, obs, actions, rewards, is_terminal):
+        """
+        Adds n consecutive transitions at once.
+
+        :param dict obs: Dict mapping obs keys to arrays with n rows.
+        :param actions: Array of n actions.
+        :param rewards: Array of n rewards.
+        :param is_terminal: Array of n is_terminal flags.
+        """
+        is_terminal = np.asarray(is_terminal, dtype=bool)
+        n = len(is_terminal)
+        if n > self.capacity:
+            raise ValueError("Batch of {} transitions does not fit into a buffer of capacity {}!".format(n, self.capacity))
+        slots = (self._next + np.arange(n)) % self.capacity
+        for key, array in self.obs.items():
+            array[slots] = np.asarray(obs[key]).reshape((n,) + array.shape[1:])
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.is_terminal[slots] = is_terminal
+        # an observation is the first of an episode if the previous transition ended the episode (or there was none)
+        prev_terminal = self.is_terminal[(self._next - 1) % self.capacity] if self.size > 0 else True
+        self.is_first[slots] = np.concatenate([[prev_terminal], is_terminal[:-1]])
+
+        # the latest transition can't be sampled until its next observation has arrived (priority 0),
+        # all transitions before it (incl. the one that was the latest before this batch) get the max priority
+        sampleable = (self._next - 1 + np.arange(n)) % self.capacity if self.size > 0 else slots[:-1]
+        self.tree.set(sampleable, self.max_priority ** self.alpha)
+        self.tree.set(slots[-1:], 0.0)
+
+        self._next = (self._next + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def _stack_indices(self, indices):
+        """
+        :return: For each index, the indices of the `frame_stack` most recent frames (oldest first); frames before the
+            start of the episode (or before the oldest stored slot) are replaced by the episode's first frame.
+        :rtype: np.ndarray
+        """
+        oldest = self._next if self.size == self.capacity else 0
+        stack = np.empty((len(indices), self.frame_stack), dtype=np.int64)
+        stack[:, -1] = indices
+        for j in range(self.frame_stack - 2, -1, -1):
+            later = stack[:, j + 1]
+            move = ~self.is_first[later] & (later != oldest)
+            stack[:, j] = np.where(move, (later - 1) % self.capacity, later)
+        return stack
+
+    def _gather_obs(self, indices):
+        obs = {}
+        stack = self._stack_indices(indices) if self.frame_stack > 1 and self.image_keys else None
+        for key, array in self.obs.items():
+            if stack is not None and key in self.image_keys:
+                obs[key] = array[stack]  # batch x frame_stack x w x h x c
+            else:
+                obs[key] = array[indices]
+        return obs
+
+    def sample(self, batch_size, beta=0.4):
+        """
+        Samples a batch of transitions proportionally to their priorities (stratified over the total priority).
+
+        :param int batch_size: The number of transitions to sample.
+        :param float beta: The importance-sampling exponent (1.0=full correction of the prioritization bias).
+        :return: Dict with keys: obs, next_obs (dicts of arrays), actions, rewards, is_terminal, indices (to be passed
+            to `update_priorities`) and weights (importance-sampling weights, max-normalized).
+        :rtype: dict
+        """
+        total = self.tree.total
+        if total <= 0.0:
+            raise ValueError("Replay buffer has no sampleable transitions yet!")
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random_sample(batch_size)) * segment
+        indices = self.tree.find(np.minimum(values, np.nextafter(total, 0.0)))
+        indices = np.minimum(indices, self.capacity - 1)
+
+        probs = self.tree.get(indices) / total
+        weights = (self.size * np.maximum(probs, 1e-12)) ** -beta
+        weights /= weights.max()
+
+        next_indices = (indices + 1) % self.capacity
+        return {"obs": self._gather_obs(indices), "next_obs": self._gather_obs(next_indices),
+                "actions": self.actions[indices], "rewards": self.rewards[indices], "is_terminal": self.is_terminal[indices],
+                "indices": indices, "weights": weights.astype(np.float32)}
+
+    def update_priorities(self, indices, priorities):
+        """
+        Sets new priorities (e.g. abs. TD-errors) for previously sampled transitions.
+        """
+        priorities = np.asarray(priorities, dtype=np.float64) + 1e-6
+        self.max_priority = max(self.max_priority, priorities.max())
+        # never re-enable the latest transition (its next observation hasn't arrived yet)
+        latest = (self._next - 1) % self.capacity
+        keep = np.asarray(indices) != latest
+        self.tree.set(np.asarray(indices)[keep], priorities[keep] ** self.alpha)
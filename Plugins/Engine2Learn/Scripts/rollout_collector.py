@@ -0,0 +1,375 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/rollout_collector.py
+
+ Collects experience from many game nodes (ducandu_server endpoints) at
+ once and ships it to one central process.
+ - The collector drives each node's rollout loop (the server's
+   'rollout' command with an uploaded policy) via asyncio.
+ - Trajectories are cut into fixed-size chunks, which are shipped to the
+   central sink in a compact binary format (see `pack_chunk`).
+ - A bounded chunk queue applies backpressure: if the sink can't keep up,
+   the nodes' rollout loops wait instead of piling up memory.
+ - Throughput (transitions/sec) is reported per node and in total.
+
+ usage:
+   python rollout_collector.py sink --port 7000
+   python rollout_collector.py collect --nodes host1:6025,unix:/tmp/e2l.sock --sink localhost:7000
+   python rollout_collector.py demo --num-nodes 8 --duration 10  (local stand-in servers)
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import collections
+import struct
+import time
+
+import msgpack
+import numpy as np
+
+from ducandu_client import AsyncDucanduClient, LEN_FIELD_SIZE
+
+
+# chunk header: magic, format version, node id, num transitions, obs dim, action dim
+CHUNK_MAGIC = b"E2LC"
+CHUNK_VERSION = 1
+CHUNK_HEADER = struct.Struct("<4sBHIII")
+
+TrajectoryChunk = collections.namedtuple("TrajectoryChunk", ["node_id", "obs", "actions", "rewards", "is_terminal", "log_probs"])
+
+
+def pack_chunk(chunk):
+    """
+    Packs a TrajectoryChunk into its binary format: header followed by the raw (little-endian) arrays
+    obs (N x obs-dim float32), actions (N x action-dim float32), rewards (N float32), log_probs (N float32),
+    is_terminal (N uint8).
+
+    :rtype: bytes
+    """
+    n, obs_dim = chunk.obs.shape
+    header = CHUNK_HEADER.pack(CHUNK_MAGIC, CHUNK_VERSION, chunk.node_id, n, obs_dim, chunk.actions.shape[1])
+    return b"".join([header, chunk.obs.astype("<f4", copy=False).tobytes(), chunk.actions.astype("<f4", copy=False).tobytes(),
+                     chunk.rewards.astype("<f4", copy=False).tobytes(), chunk.log_probs.astype("<f4", copy=False).tobytes(),
+                     chunk.is_terminal.astype(np.uint8, copy=False).tobytes()])
+
+
+def chunk_body_size(n, obs_dim, action_dim):
+    return 4 * n * (obs_dim + action_dim + 2) + n
+
+
+def unpack_chunk(header, body):
+    """
+    Unpacks a binary chunk (see `pack_chunk`) into a TrajectoryChunk (arrays are views into `body`).
+
+    :param bytes header: The CHUNK_HEADER.size header bytes.
+    :param bytes body: The chunk's body bytes.
+    :rtype: TrajectoryChunk
+    """
+    magic, version, node_id, n, obs_dim, action_dim = CHUNK_HEADER.unpack(header)
+    if magic != CHUNK_MAGIC or version != CHUNK_VERSION:
+        raise ValueError("Not a (version {}) trajectory chunk!".format(CHUNK_VERSION))
+    offsets = np.cumsum([0, 4 * n * obs_dim, 4 * n * action_dim, 4 * n, 4 * n, n])
+    obs = np.frombuffer(body, dtype="<f4", count=n * obs_dim, offset=offsets[0]).reshape((n, obs_dim))
+    actions = np.frombuffer(body, dtype="<f4", count=n * action_dim, offset=offsets[1]).reshape((n, action_dim))
+    rewards = np.frombuffer(body, dtype="<f4", count=n, offset=offsets[2])
+    log_probs = np.frombuffer(body, dtype="<f4", count=n, offset=offsets[3])
+    is_terminal = np.frombuffer(body, dtype=np.uint8, count=n, offset=offsets[4]).view(np.bool_)
+    return TrajectoryChunk(node_id, obs, actions, rewards, is_terminal, log_probs)
+
+
+async def read_chunk(reader):
+    """
+    Reads the next binary chunk from an asyncio stream (None if the stream has ended).
+    """
+    try:
+        header = await reader.readexactly(CHUNK_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    _, _, _, n, obs_dim, action_dim = CHUNK_HEADER.unpack(header)
+    body = await reader.readexactly(chunk_body_size(n, obs_dim, action_dim))
+    return unpack_chunk(header, body)
+
+
+class ChunkBuilder(object):
+    """
+    Cuts a node's stream of rollout trajectories into fixed-size chunks (preallocated arrays).
+    """
+    def __init__(self, node_id, chunk_size):
+        self.node_id = node_id
+        self.chunk_size = chunk_size
+        self._arrays = None
+        self._num = 0
+
+    def add(self, trajectory):
+        """
+        :param dict trajectory: A 'rollout' response.
+        :return: List of all chunks that became full.
+        :rtype: List[TrajectoryChunk]
+        """
+        chunks = []
+        t, n = 0, trajectory["num_steps"]
+        while t < n:
+            if self._arrays is None:
+                self._arrays = TrajectoryChunk(
+                    self.node_id,
+                    np.empty((self.chunk_size, trajectory["obs"].shape[1]), dtype=np.float32),
+                    np.empty((self.chunk_size, trajectory["actions"].shape[1]), dtype=np.float32),
+                    np.empty((self.chunk_size,), dtype=np.float32),
+                    np.empty((self.chunk_size,), dtype=bool),
+                    np.empty((self.chunk_size,), dtype=np.float32))
+                self._num = 0
+            k = min(n - t, self.chunk_size - self._num)
+            for field in ("obs", "actions", "rewards", "is_terminal", "log_probs"):
+                getattr(self._arrays, field)[self._num:self._num + k] = trajectory[field][t:t + k]
+            self._num += k
+            t += k
+            if self._num == self.chunk_size:
+                chunks.append(self._arrays)
+                self._arrays = None
+        return chunks
+
+
+class ThroughputStats(object):
+    """
+    Counts transitions per node and reports transitions/sec per node and in total.
+    """
+    def __init__(self, num_nodes):
+        self.counts = np.zeros((num_nodes,), dtype=np.int64)
+        self.start_time = time.perf_counter()
+
+    def add(self, node_id, num):
+        self.counts[node_id] += num
+
+    def rates(self):
+        """
+        :return: Tuple: transitions/sec per node (array), total transitions/sec.
+        :rtype: tuple
+        """
+        elapsed = max(time.perf_counter() - self.start_time, 1e-9)
+        per_node = self.counts / elapsed
+        return per_node, per_node.sum()
+
+    def report(self):
+        per_node, total = self.rates()
+        lines = ["node {:3d}: {:10.1f} transitions/s".format(i, r) for i, r in enumerate(per_node)]
+        lines.append("   total: {:10.1f} transitions/s ({} transitions)".format(total, self.counts.sum()))
+        return "\n".join(lines)
+
+
+def parse_address(address):
+    """
+    :param str address: "host:port" or "unix:/path/to/socket".
+    :return: kwargs for the clients' constructors.
+    :rtype: dict
+    """
+    if address.startswith("unix:"):
+        return {"socket_path": address[5:]}
+    host, port = address.rsplit(":", 1)
+    return {"host": host, "port": int(port)}
+
+
+async def run_node(node_id, address, queue, stats, rollout_steps=256, policy=None, seed=None):
+    """
+    Runs the rollout loop of a single game node and puts all full chunks into the (bounded) queue.
+    """
+    client = AsyncDucanduClient(**parse_address(address))
+    await client.connect()
+    try:
+        if policy is not None:
+            response = await client.upload_policy(policy)
+            if response["status"] != "ok":
+                raise RuntimeError("Node {} ({}) rejected the policy: {}".format(node_id, address, response["message"]))
+        await client.reset()
+        builder = ChunkBuilder(node_id, queue.chunk_size)
+        episode = 0
+        while True:
+            trajectory = await client.rollout(rollout_steps, seed=None if seed is None else seed + node_id + episode)
+            if trajectory["status"] != "ok":
+                raise RuntimeError("Rollout on node {} ({}) failed: {}".format(node_id, address, trajectory["message"]))
+            stats.add(node_id, trajectory["num_steps"])
+            for chunk in builder.add(trajectory):
+                await queue.put(chunk)  # backpressure: blocks this node's loop if the shipper can't keep up
+            if trajectory["num_steps"] > 0 and trajectory["is_terminal"][-1]:
+                episode += 1
+                await client.reset()
+    finally:
+        client.close()
+
+
+async def ship_chunks(queue, address):
+    """
+    Ships all chunks from the queue to the central sink.
+    """
+    kwargs = parse_address(address)
+    if "socket_path" in kwargs:
+        _, writer = await asyncio.open_unix_connection(kwargs["socket_path"])
+    else:
+        _, writer = await asyncio.open_connection(kwargs["host"], kwargs["port"])
+    try:
+        while True:
+            chunk = await queue.get()
+            writer.write(pack_chunk(chunk))
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+class ChunkQueue(asyncio.Queue):
+    """
+    A bounded queue of full chunks that also knows the chunk size.
+    """
+    def __init__(self, chunk_size, max_chunks):
+        super().__init__(maxsize=max_chunks)
+        self.chunk_size = chunk_size
+
+
+async def collect(nodes, sink, chunk_size=1024, max_chunks=16, rollout_steps=256, policy=None, seed=None,
+                  report_interval=5.0, duration=None):
+    """
+    Runs all nodes' rollout loops plus the chunk shipper and reports the throughput every `report_interval` seconds.
+    """
+    queue = ChunkQueue(chunk_size, max_chunks)
+    stats = ThroughputStats(len(nodes))
+    tasks = [asyncio.ensure_future(run_node(i, address, queue, stats, rollout_steps, policy, seed)) for i, address in enumerate(nodes)]
+    tasks.append(asyncio.ensure_future(ship_chunks(queue, sink)))
+    start = time.perf_counter()
+    try:
+        while duration is None or time.perf_counter() - start < duration:
+            await asyncio.sleep(report_interval)
+            for t in tasks:
+                if t.done():
+                    t.result()  # re-raise the error of a failed node or the shipper
+            print(stats.report())
+    finally:
+        for t in tasks:
+            t.cancel()
+    return stats
+
+
+async def run_sink(port=None, host="0.0.0.0", socket_path=None, on_chunk=None):
+    """
+    Runs the central sink, which receives chunks from any number of collectors and passes them to `on_chunk`.
+    """
+    async def collector_connected(reader, writer):
+        while True:
+            chunk = await read_chunk(reader)
+            if chunk is None:
+                break
+            if on_chunk is not None:
+                on_chunk(chunk)
+        writer.close()
+
+    if socket_path is not None:
+        return await asyncio.start_unix_server(collector_connected, socket_path)
+    return await asyncio.start_server(collector_connected, host, port)
+
+
+async def run_stand_in_server(port, host="127.0.0.1", obs_dim=8, action_dim=2, episode_len=500, step_time=0.0):
+    """
+    A stand-in for a ducandu_server (same framing) that answers upload_policy/reset/rollout commands with random data.
+    Used to test the collector on a single machine without running any games.
+    """
+    async def client_connected(reader, writer):
+        rng = np.random.RandomState(port)
+        unpacker = msgpack.Unpacker()
+        t = 0
+        while True:
+            data = await reader.read(8192)
+            if not data:
+                break
+            unpacker.feed(data)
+            for message in unpacker:
+                if message["cmd"] == "reset":
+                    t = 0
+                    response = {"status": "ok", "obs_dict": {}, "_reward": 0.0, "_is_terminal": False}
+                elif message["cmd"] == "rollout":
+                    n = min(message["num_steps"], episode_len - t)
+                    t += n
+                    if step_time:
+                        await asyncio.sleep(n * step_time)
+                    is_terminal = np.zeros((n,), dtype=bool)
+                    is_terminal[-1:] = (t >= episode_len)
+                    response = {"status": "ok", "num_steps": n, "obs": rng.randn(n, obs_dim).astype(np.float32),
+                                "actions": rng.randn(n, action_dim).astype(np.float32), "rewards": rng.randn(n).astype(np.float32),
+                                "is_terminal": is_terminal, "log_probs": -rng.rand(n).astype(np.float32), "last_obs_dict": {}}
+                else:
+                    response = {"status": "ok"}
+                packed = msgpack.packb(response)
+                writer.write(bytes("{:0{}d}".format(len(packed), LEN_FIELD_SIZE), encoding="ascii") + packed)
+
+    return await asyncio.start_server(client_connected, host, port)
+
+
+async def demo(num_nodes=8, duration=10.0, chunk_size=1024, rollout_steps=256, base_port=16025, sink_port=17000, step_time=0.0):
+    received = collections.Counter()
+
+    def on_chunk(chunk):
+        received[chunk.node_id] += len(chunk.rewards)
+
+    servers = [await run_stand_in_server(base_port + i, step_time=step_time) for i in range(num_nodes)]
+    sink = await run_sink(sink_port, host="127.0.0.1", on_chunk=on_chunk)
+    nodes = ["127.0.0.1:{}".format(base_port + i) for i in range(num_nodes)]
+    await collect(nodes, "127.0.0.1:{}".format(sink_port), chunk_size=chunk_size, rollout_steps=rollout_steps,
+                  report_interval=min(5.0, duration), duration=duration)
+    print("sink received {} transitions in {} chunks".format(sum(received.values()), sum(received.values()) // chunk_size))
+    for server in servers + [sink]:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed rollout collector for engine2learn game nodes.")
+    sub = parser.add_subparsers(dest="mode")
+    p = sub.add_parser("collect")
+    p.add_argument("--nodes", required=True, help="comma separated list of host:port or unix:/path node addresses")
+    p.add_argument("--sink", required=True, help="host:port or unix:/path of the central sink")
+    p.add_argument("--policy", help="msgpack file holding the policy spec to upload to each node")
+    p.add_argument("--chunk-size", type=int, default=1024)
+    p.add_argument("--max-chunks", type=int, default=16)
+    p.add_argument("--rollout-steps", type=int, default=256)
+    p.add_argument("--seed", type=int)
+    p = sub.add_parser("sink")
+    p.add_argument("--port", type=int, default=7000)
+    p = sub.add_parser("demo")
+    p.add_argument("--num-nodes", type=int, default=8)
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--chunk-size", type=int, default=1024)
+    p.add_argument("--rollout-steps", type=int, default=256)
+    p.add_argument("--step-time", type=float, default=0.0, help="simulated time per game step (s)")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    if args.mode == "collect":
+        policy = None
+        if args.policy:
+            import msgpack_numpy as mnp
+            with open(args.policy, "rb") as f:
+                policy = msgpack.unpackb(f.read(), object_hook=mnp.decode)
+        loop.run_until_complete(collect(args.nodes.split(","), args.sink, args.chunk_size, args.max_chunks,
+                                        args.rollout_steps, policy, args.seed))
+    elif args.mode == "sink":
+        received = collections.Counter()
+
+        def on_chunk(chunk):
+            received[chunk.node_id] += len(chunk.rewards)
+
+        async def report():
+            start = time.perf_counter()
+            while True:
+                await asyncio.sleep(5.0)
+                print("sink: {:.1f} transitions/s ({} nodes)".format(sum(received.values()) / (time.perf_counter() - start), len(received)))
+
+        loop.run_until_complete(run_sink(args.port, on_chunk=on_chunk))
+        loop.run_until_complete(report())
+    elif args.mode == "demo":
+        loop.run_until_complete(demo(args.num_nodes, args.duration, args.chunk_size, args.rollout_steps, step_time=args.step_time))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
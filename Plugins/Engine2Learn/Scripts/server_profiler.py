@@ -0,0 +1,217 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/server_profiler.py
+
+ On-demand profiling of the python code running inside the game (see the
+ server's 'profile' command), either with the deterministic cProfile
+ profiler or with a low-overhead stack sampler (a background thread
+ periodically looks at the game thread's current python stack).
+ Profiling runs for the next N step commands and/or T seconds; results
+ are aggregated into a compact dict (top functions by cumulative time
+ and the numbers for the server's hot paths) and/or written to a file.
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import collections
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+
+
+# the server's hot paths, always reported (if they were hit) no matter their rank
+TRACKED_FUNCTIONS = ("manage_message", "step", "compile_obs_dict", "compile_multi_agent_obs_dict", "set_props",
+                     "apply_setters", "resolve_prop_spec", "read_observer", "read_signal_property",
+                     "get_scene_capture_image", "read_lidar", "read_occupancy_grid", "read_class_observers", "send_message",
+                     # UnrealEnginePython builtins (only visible to the deterministic profiler)
+                     "world_tick", "CaptureScene", "render_target_get_data", "get_property", "set_property",
+                     "input_key", "input_axis")
+
+
+def get_memory_usage_kb():
+    """
+    :return: The current resident memory (in kB) of this process (the game or a stub server) (peak memory if the current one can't be
+        determined; None if neither can be determined on this platform).
+    :rtype: Union[int,None]
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * (os.sysconf("SC_PAGE_SIZE") // 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+
+class StackSampler(object):
+    """
+    Samples the python stack of one thread every `interval` seconds from a background thread.
+    Note: The sampling thread needs the GIL, so time spent in long C++ calls that don't release the GIL is attributed to
+    the python frame that is active once the call returns.
+    """
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()  # key=tuple of function labels (outermost first), value=number of samples
+        self.num_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="e2l-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{}:{}({})".format(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.num_samples += 1
+
+    def get_stats(self, top=30):
+        """
+        :return: Dict with the top functions by inclusive ("cumulative") and exclusive ("self") sample time.
+        :rtype: dict
+        """
+        inclusive, exclusive = collections.Counter(), collections.Counter()
+        for stack, count in self.stacks.items():
+            for label in set(stack):
+                inclusive[label] += count
+            exclusive[stack[-1]] += count
+        functions = [{"function": label, "cumtime": count * self.interval, "tottime": exclusive[label] * self.interval,
+                      "samples": count} for label, count in inclusive.most_common()]
+        return {"num_samples": self.num_samples, "interval": self.interval, "top": functions[:top],
+                "tracked": [f for f in functions if _function_name(f["function"]) in TRACKED_FUNCTIONS]}
+
+    def dump(self, path):
+        """
+        Writes the sampled stacks in collapsed ("folded") format, e.g. for flamegraph tools.
+        """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write("{} {}\n".format(";".join(stack), count))
+
+
+def _function_name(label):
+    # "file:line(name)" or "{method 'name' of ...}" -> name
+    if label.endswith(")") and "(" in label:
+        return label[label.rindex("(") + 1:-1]
+    for name in TRACKED_FUNCTIONS:
+        if "'{}'".format(name) in label:
+            return name
+    return label
+
+
+class Profiler(object):
+    """
+    Profiles the game thread for the next `num_steps` step commands and/or `duration` seconds.
+    """
+    def __init__(self):
+        self.mode = None
+        self.running = False
+        self._profile = None  # cProfile.Profile (deterministic mode)
+        self._sampler = None  # StackSampler (sampling mode)
+        self._steps_left = None
+        self._end_time = None
+        self._start_time = None
+        self._elapsed = 0.0
+        self._file = None
+        self.stats = None  # the stats of the last finished profiling run
+
+    def start(self, mode="sampling", num_steps=None, duration=None, interval=0.005, file=None):
+        """
+        :param str mode: "deterministic" (cProfile; exact call counts, higher overhead) or "sampling" (stack sampler).
+        :param Union[int,None] num_steps: Stop after this many step commands.
+        :param Union[float,None] duration: Stop after this many seconds.
+        :param float interval: The sampling interval in seconds (sampling mode only).
+        :param Union[str,None] file: If given, the raw results are written to this file once profiling stops
+            (pstats format for deterministic mode, collapsed stacks for sampling mode).
+        :raises ValueError: If the mode is unknown or a profiling run is already active.
+        """
+        if self.running:
+            raise ValueError("Profiling is already running!")
+        if num_steps is None and duration is None:
+            raise ValueError("Either num_steps or duration has to be given!")
+        if mode == "deterministic":
+            self._profile = cProfile.Profile()
+        elif mode == "sampling":
+            self._sampler = StackSampler(threading.get_ident(), interval)
+        else:
+            raise ValueError("Unknown profiling mode ({})! Needs to be one of deterministic|sampling.".format(mode))
+        self.mode = mode
+        self._steps_left = num_steps
+        self._start_time = time.perf_counter()
+        self._end_time = None if duration is None else self._start_time + duration
+        self._file = file
+        self.stats = None
+        self.running = True
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            self._sampler.start()
+
+    def after_command(self, cmd):
+        """
+        Must be called after each handled command: counts steps and stops profiling once the limits are reached.
+        """
+        if not self.running:
+            return
+        if cmd == "step" and self._steps_left is not None:
+            self._steps_left -= 1
+        if (self._steps_left is not None and self._steps_left <= 0) or \
+                (self._end_time is not None and time.perf_counter() >= self._end_time):
+            self.stop()
+
+    def stop(self, top=30):
+        """
+        Stops profiling (if running) and aggregates the results into `self.stats`.
+        """
+        if not self.running:
+            return self.stats
+        self.running = False
+        self._elapsed = time.perf_counter() - self._start_time
+        if self._profile is not None:
+            self._profile.disable()
+            self.stats = self._get_profile_stats(top)
+            if self._file:
+                self._profile.dump_stats(self._file)
+            self._profile = None
+        else:
+            self._sampler.stop()
+            self.stats = self._sampler.get_stats(top)
+            if self._file:
+                self._sampler.dump(self._file)
+            self._sampler = None
+        self.stats["mode"] = self.mode
+        self.stats["elapsed"] = self._elapsed
+        self.stats["file"] = self._file
+        return self.stats
+
+    def _get_profile_stats(self, top):
+        stats = pstats.Stats(self._profile)
+        functions = []
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            label = "{}:{}({})".format(filename, line, name) if filename != "~" else name
+            functions.append({"function": label, "ncalls": ncalls, "tottime": tottime, "cumtime": cumtime})
+        functions.sort(key=lambda f: f["cumtime"], reverse=True)
+        return {"total_calls": stats.total_calls, "top": functions[:top],
+                "tracked": [f for f in functions if _function_name(f["function"]) in TRACKED_FUNCTIONS]}
@@ -10,13 +10,28 @@
 """
 
 import unreal_engine as ue
-from unreal_engine.classes import E2LObserver, GameplayStatics, CameraComponent, InputSettings, SceneCaptureComponent2D
+import asyncio
+from unreal_engine.classes import Actor, E2LEventLibrary, E2LObserver, Engine2LearnSettings, GameplayStatics, CameraComponent, \
+    InputSettings, KismetSystemLibrary, Pawn, SceneCaptureComponent2D
+from unreal_engine.enums import ETraceTypeQuery
 import numpy as np
 import re
 
+import obs_statistics
+import span_tracer
+
 
 # TODO: global observation_dict (init only once, then write to it in place) to save on garbage collection runs
 _OBS_DICT = {}
+# the absolute accumulated rewards of all agents (multi-agent mode)
+_AGENT_REWARDS = np.zeros((0,))
+
+# gameplay event types with a built-in meaning (see `get_event_signals`)
+REWARD_EVENT = "reward"  # value=reward delta
+TERMINAL_EVENT = "terminal"
+
+# the max. number of frames to wait for a level restart to happen (see `ServerContext.wait_for_restart`)
+MAX_RESTART_FRAMES = 300
 
 
 # search for the currently running world
@@ -41,6 +56,490 @@ def get_playing_world():
     return playing_world
 
 
+class CapturePool(object):
+    """
+    Pool of the render targets used by the observers' scene captures, keyed by observer identity (its path name, which
+    is stable across level restarts) and resolution.
+    Render targets are rooted (so they survive level restarts) and get re-attached to the observer's new scene capture
+    after a restart instead of being re-created. They are released deterministically on world changes, when an observer
+    changes its resolution or via the 'release_captures' command. Before a render target is un-rooted, it is detached
+    from the scene capture it was last attached to (if that one is still alive), so no live capture keeps rendering into
+    a texture that may be garbage collected.
+    Note: The scene-capture components themselves are not pooled: they are owned by the observed actors, which are
+    destroyed and re-spawned on each level restart.
+    """
+    def __init__(self):
+        self._render_targets = {}  # key=(observer key, width, height), value=render target uobject
+        self._scene_captures = {}  # key=(observer key, width, height), value=the scene capture last attached to
+        self.num_render_targets_created = 0
+        self.num_render_targets_reused = 0
+        self.num_render_targets_released = 0
+        self.num_scene_captures_created = 0
+
+    def get_render_target(self, key, width, height):
+        texture = self._render_targets.get((key, width, height))
+        if texture is not None and texture.is_valid():
+            self.num_render_targets_reused += 1
+            return texture
+        # the observer's render target has a different resolution (or got lost) -> release it
+        for k in [k for k in self._render_targets if k[0] == key]:
+            self._release(k)
+        texture = ue.create_transient_texture_render_target2d(width, height)
+        texture.add_to_root()  # keep it alive across level restarts (until released)
+        self._render_targets[(key, width, height)] = texture
+        self.num_render_targets_created += 1
+        return texture
+
+    def attach(self, scene_capture, key, width, height):
+        """
+        Attaches the observer's pooled render target (see `get_render_target`) to the given scene capture.
+
+        :return: The render target.
+        :rtype: uobject
+        """
+        texture = self.get_render_target(key, width, height)
+        scene_capture.TextureTarget = texture
+        self._scene_captures[(key, width, height)] = scene_capture
+        return texture
+
+    def _release(self, k):
+        texture = self._render_targets.pop(k)
+        scene_capture = self._scene_captures.pop(k, None)
+        if scene_capture is not None and scene_capture.is_valid():
+            scene_capture.TextureTarget = None
+        if texture.is_valid():
+            texture.remove_from_root()
+        self.num_render_targets_released += 1
+
+    def release_all(self):
+        for k in list(self._render_targets.keys()):
+            self._release(k)
+
+    def get_stats(self):
+        return {"num_render_targets": len(self._render_targets),
+                "num_render_targets_created": self.num_render_targets_created,
+                "num_render_targets_reused": self.num_render_targets_reused,
+                "num_render_targets_released": self.num_render_targets_released,
+                "num_scene_captures_created": self.num_scene_captures_created,
+                "render_targets": [{"observer": k[0], "width": k[1], "height": k[2]} for k in self._render_targets]}
+
+
+class ActorClassIndex(object):
+    """
+    Index of the playing world's actors by (observed) actor class with stable slots: an actor keeps its slot (its row in
+    the padded class-observer arrays) for as long as it lives; the slots of destroyed actors are reused by newly spawned
+    ones. The index is kept current from the plugin's spawn notifications: a class is only re-scanned (from the engine's
+    per-class object hash, see GameplayStatics.GetAllActorsOfClass; no scan over all actors) if actors were spawned
+    since its last scan (E2LObserver.GetActorSpawnGeneration() changed). Otherwise, only the slots of destroyed actors
+    (no longer valid uobjects) are freed.
+    """
+    def __init__(self):
+        self._slots = {}  # key=actor class name, value=list of actors (None=free slot)
+        self._generations = {}  # key=actor class name, value=spawn generation at the class' last scan
+
+    def clear(self):
+        self._slots = {}
+        self._generations = {}
+
+    def get_slots(self, world, actor_class):
+        """
+        :return: The slot list of the given actor class (list of actors; None for a free slot).
+        :rtype: list
+        """
+        key = actor_class.get_name()
+        slots = self._slots.get(key)
+        if slots is None:
+            slots = self._slots[key] = []
+        generation = E2LObserver.GetActorSpawnGeneration()
+        if self._generations.get(key) != generation:
+            self._update(slots, GameplayStatics.GetAllActorsOfClass(world, actor_class))
+            self._generations[key] = generation
+        else:
+            self._free_destroyed(slots)
+        return slots
+
+    @staticmethod
+    def _free_destroyed(slots):
+        for i, actor in enumerate(slots):
+            if actor is not None and not actor.is_valid():
+                slots[i] = None
+        while slots and slots[-1] is None:
+            slots.pop()
+
+    @staticmethod
+    def _update(slots, actors):
+        alive = {a.get_name(): a for a in actors}
+        # free the slots of destroyed actors, keep the slots of the survivors
+        for i, actor in enumerate(slots):
+            if actor is None:
+                continue
+            if not actor.is_valid() or alive.pop(actor.get_name(), None) is None:
+                slots[i] = None
+        # new actors go into the lowest free slots
+        free = (i for i, actor in enumerate(slots) if actor is None)
+        for actor in alive.values():
+            i = next(free, None)
+            if i is None:
+                slots.append(actor)
+            else:
+                slots[i] = actor
+        while slots and slots[-1] is None:
+            slots.pop()
+
+
+class ServerContext(object):
+    """
+    Caches the handles that (almost) every command needs: the playing world, its player controller, the registered
+    (and sanity-checked) observers and the playing world's actors.
+    Instead of re-scanning all worlds/observers/actors on each call, the handles are only looked up again after the
+    cache has been invalidated:
+    - world change: the cached world (or controller) is no longer a valid uobject (e.g. PIE session ended).
+    - level restart: UE performs the restart on a later tick, so `restart_level` only marks the restart as pending;
+      until the playing world has been replaced, nothing is kept cached (see `restart_pending`).
+    - observers: E2LObserver.GetObserversGeneration() changed (observer created/destroyed/re-attached).
+    - actors: the world was ticked (actors may have been spawned/destroyed); the actor class index only re-scans after
+      spawns (see ActorClassIndex).
+    """
+    def __init__(self):
+        self.generation = 0  # incremented each time the entire cache gets invalidated
+        self._playing_world = None
+        self._controller = None
+        self._controllers = None  # all player controllers (agents) of the playing world
+        self._observers = None  # list of tuples: (observer, parent, obs_name)
+        self._observers_generation = None
+        self._actors = None  # dict: key=actor name (w/o number extension), value=list of actors sharing that name
+        self._class_observers = None
+        self._restarting_world = None  # the world whose level restart is still pending
+        self.class_index = ActorClassIndex()
+        self.rng = np.random.RandomState()  # server-side RNG (not affected by cache invalidations)
+        self.capture_pool = CapturePool()  # render targets survive level restarts (but not world changes)
+        self.obs_stats = obs_statistics.ObsStatistics()  # running obs statistics (not affected by cache invalidations)
+
+    def invalidate(self):
+        """
+        Drops all cached handles (e.g. after a level restart or a world change).
+        """
+        self.generation += 1
+        self._playing_world = None
+        self._controller = None
+        self._controllers = None
+        self._observers = None
+        self._observers_generation = None
+        self._actors = None
+        self._class_observers = None
+        self.class_index.clear()
+
+    def invalidate_actors(self):
+        """
+        Drops only the cached actor list (e.g. after the world was ticked and actors could have been spawned/destroyed).
+        The actor class index keeps itself current (see ActorClassIndex).
+        """
+        self._actors = None
+
+    @property
+    def playing_world(self):
+        if self._restarting_world is not None:
+            self.check_restart()
+        if self._playing_world is not None and not self._playing_world.is_valid():
+            self.capture_pool.release_all()
+            self.invalidate()
+        if self._playing_world is None:
+            self._playing_world = get_playing_world()
+        return self._playing_world
+
+    @property
+    def controller(self):
+        playing_world = self.playing_world
+        if not playing_world:
+            return None
+        if self._controller is None or not self._controller.is_valid():
+            self._controller = playing_world.get_player_controller()
+        return self._controller
+
+    @property
+    def controllers(self):
+        """
+        :return: List of all player controllers (agents) of the playing world; index 0 is the first local player.
+        :rtype: list
+        """
+        playing_world = self.playing_world
+        if not playing_world:
+            return []
+        if self._controllers is None or not all(c.is_valid() for c in self._controllers):
+            self._controllers = []
+            while True:
+                controller = GameplayStatics.GetPlayerController(playing_world, len(self._controllers))
+                if not controller:
+                    break
+                self._controllers.append(controller)
+        return self._controllers
+
+    @property
+    def observers(self):
+        """
+        :return: List of tuples (observer, parent, obs_name) of all valid observers living in the playing world.
+        :rtype: List[tuple]
+        """
+        playing_world = self.playing_world
+        generation = E2LObserver.GetObserversGeneration()
+        if self._observers is None or generation != self._observers_generation:
+            self._observers = []
+            for observer in E2LObserver.GetRegisteredObservers():
+                parent, obs_name = sanity_check_observer(observer, playing_world)
+                if parent:
+                    self._observers.append((observer, parent, obs_name))
+            self._observers_generation = generation
+        return self._observers
+
+    @property
+    def class_observers(self):
+        """
+        :return: List of tuples (name, actor class, list of (prop name, template), capacity) of all enabled class observers
+            (see the plugin's ClassObservers setting); `template` is a tuple (space type, value shape, dtype) derived from
+            the actor class' default object.
+        :rtype: List[tuple]
+        """
+        if self._class_observers is None:
+            self._class_observers = []
+            for class_observer in ue.get_mutable_default(Engine2LearnSettings).ClassObservers:
+                if not class_observer.bEnabled or not class_observer.ActorClass or class_observer.MaxActors <= 0:
+                    continue
+                cdo = class_observer.ActorClass.get_cdo()
+                props = []
+                for prop_name in class_observer.PropNames:
+                    template = get_property_template(cdo, prop_name)
+                    if template is not None:
+                        props.append((prop_name, template))
+                self._class_observers.append((class_observer.Name, class_observer.ActorClass, props, class_observer.MaxActors))
+        return self._class_observers
+
+    @property
+    def actors(self):
+        """
+        :return: Dict of the playing world's actors (key=name w/o trailing _[digits], value=list of actors sharing that name).
+        :rtype: dict
+        """
+        if self._actors is None:
+            self._actors = {}
+            playing_world = self.playing_world
+            if playing_world:
+                for a in playing_world.all_actors():
+                    name = re.sub(r'_\d+$', "", a.get_name(), 1)  # remove trailing _[digits]
+                    if name not in self._actors:
+                        self._actors[name] = [a]
+                    else:
+                        self._actors[name].append(a)
+        return self._actors
+
+    def restart_level(self):
+        """
+        Triggers a restart of the playing world's level. UE performs the restart on a later tick: the cached handles are
+        dropped once that has happened (see `check_restart` and `wait_for_restart`).
+        """
+        playing_world = self.playing_world
+        if playing_world:
+            with TRACER.span("restart_level"):
+                playing_world.restart_level()
+            self._restarting_world = playing_world
+        self.invalidate()
+
+    def check_restart(self):
+        """
+        :return: Whether a level restart (see `restart_level`) is still pending. While it is, nothing is kept cached
+            (the handles would belong to the old level); once it has happened, all handles are dropped once more.
+        :rtype: bool
+        """
+        old_world = self._restarting_world
+        if old_world is None:
+            return False
+        # the restarted level lives in a new world object
+        if old_world.is_valid() and get_playing_world() is old_world:
+            self.invalidate()
+            return True
+        self.finish_restart()
+        return False
+
+    def finish_restart(self):
+        self._restarting_world = None
+        self.invalidate()
+        # events of the old episode must not leak into the new one
+        E2LEventLibrary.DrainEvents()
+
+    async def wait_for_restart(self, max_frames=MAX_RESTART_FRAMES):
+        """
+        Waits (one loop iteration = one engine frame at a time) until a pending level restart has happened.
+        """
+        for _ in range(max_frames):
+            if not self.check_restart():
+                return
+            await asyncio.sleep(0)
+        ue.log("WARNING: level restart still pending after {} frames -> continuing anyway!".format(max_frames))
+        self.finish_restart()
+
+
+# the one context object shared by all command handlers
+CONTEXT = ServerContext()
+
+# the opt-in span tracer of the game thread's hot paths (see the server's 'trace' command)
+TRACER = span_tracer.SpanTracer("engine2learn server")
+
+
+def resolve_prop_spec(prop_spec, actors):
+    """
+    Resolves an /?actor:[component(s):]?prop-name specifier into the list of matching uobjects (actors or components)
+    that own the given property.
+
+    :param str prop_spec: The actor[:comp]*:property specifier (each part may be a regular expression).
+    :param dict actors: The actors to search through (key=name w/o number extension, value=list of actors); see `ServerContext.actors`.
+    :return: Tuple: list of matching uobjects that have the property, name of the property.
+    :rtype: tuple
+    :raises ValueError: If the specifier is malformatted.
+    """
+    uobjects = None  # the final uobjects (could be actors or components or components of components, etc..)
+    while True:
+        mo = re.match(r':?(\w+)((:\w+)*)', prop_spec)
+        if not mo:
+            raise ValueError("Malformatted actor[:comp]?:property specifier ({}). "
+                             "Needs to be [actor-pattern[:comp-pattern(s)]*:property-pattern].".format(prop_spec))
+        next_, prop_spec, _ = mo.groups()
+        # next_ is a pattern for actor names
+        if uobjects is None:
+            uobjects = []
+            # go through list of actors to collect the matching ones
+            for a, l in actors.items():
+                if re.match(next_, a):
+                    uobjects.extend(l)
+        # next_ is a pattern for some sub-component of an Actor/other Component (still something left of the prop_spec)
+        elif prop_spec:
+            # go through list of uobjects to see whether they have components with the given name (next_)
+            uobjects_next = []
+            for uobj in uobjects:
+                for comp in uobj.get_actor_components():
+                    if re.match(next_, comp.get_name()):
+                        uobjects_next.append(comp)
+            # update our list of matching components
+            uobjects = uobjects_next
+        # next_ is the name of the property
+        else:
+            return [uobj for uobj in uobjects if uobj.has_property(next_)], next_
+
+
+def set_property_value(uobj, prop_name, value, is_relative=False):
+    """
+    Sets a property of a uobject to a new value (or increments it by the given value).
+    numpy values and 3-tuples (for FVector/FRotator properties) are converted into their UE4 counterparts.
+
+    :param uobject uobj: The uobject (actor or component) whose property to change.
+    :param str prop_name: The name of the property.
+    :param any value: The new value (or the increment if is_relative is True).
+    :param bool is_relative: If True, the old value of the property will be incremented by the given value.
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        value = value.tolist()
+    old_val = None
+    if is_relative or isinstance(value, (list, tuple)):
+        old_val = uobj.get_property(prop_name)
+        if isinstance(value, (list, tuple)) and isinstance(old_val, (ue.FVector, ue.FRotator)):
+            value = type(old_val)(*value)
+    if is_relative:
+        uobj.set_property(prop_name, old_val + value)
+    else:
+        uobj.set_property(prop_name, value)
+
+
+def get_property_values(uobjects, prop_name):
+    """
+    Reads a property of many uobjects at once and stacks the values into one array (one row per uobject).
+
+    :param list uobjects: The uobjects (actors or components) to read from (e.g. as returned by `resolve_prop_spec`).
+    :param str prop_name: The name of the property.
+    :return: Nx3 float64 array for FVector/FRotator properties, N-length array for bool/int/float properties, list of
+        N strings for all other (e.g. UObject) properties.
+    :rtype: Union[np.ndarray,list]
+    """
+    values = [uobj.get_property(prop_name) for uobj in uobjects]
+    if not values:
+        return np.zeros((0,))
+    type_ = type(values[0])
+    if type_ == ue.FVector or type_ == ue.FRotator:
+        array = np.empty((len(values), 3), dtype=np.float64)
+        for i, v in enumerate(values):
+            array[i] = (v[0], v[1], v[2])
+        return array
+    elif type_ == bool or type_ == int or type_ == float:
+        return np.array(values)
+    return [str(v) for v in values]
+
+
+def get_uobject_label(uobj):
+    """
+    :return: The name of an actor or "[owner name]:[component name]" for a component.
+    :rtype: str
+    """
+    owner = uobj.get_owner() if not uobj.is_a(Actor) else None
+    return uobj.get_name() if not owner else "{}:{}".format(owner.get_name(), uobj.get_name())
+
+
+def is_per_uobject_value(value, uobjects, prop_name):
+    """
+    :return: Whether a setter value is an array with one row per uobject (to be scattered across the uobjects) rather
+        than a single value shared by all uobjects: 2D numpy arrays always are, 1D numpy arrays only for non-vector
+        (bool/int/float) properties.
+    :rtype: bool
+    :raises ValueError: If the value is a per-uobject array, but its number of rows does not match the number of uobjects.
+    """
+    if not isinstance(value, np.ndarray) or value.ndim == 0 or not uobjects:
+        return False
+    if value.ndim == 1 and isinstance(uobjects[0].get_property(prop_name), (ue.FVector, ue.FRotator)):
+        return False
+    if len(value) != len(uobjects):
+        raise ValueError("Got {} values for property {}, but the setter matched {} uobjects!".format(len(value), prop_name, len(uobjects)))
+    return True
+
+
+def sample_setter_values(dist, num, rng):
+    """
+    Samples values for a randomized setter command from a distribution spec (all values are sampled at once).
+    Supported specs (dicts):
+    - {"dist": "uniform", "low": [float or list], "high": [float or list]}
+    - {"dist": "normal", "mean": [float or list], "std": [float or list]}
+    - {"dist": "choice", "values": [list of values (e.g. scalars or 3-tuples)]}
+    Each spec may also contain "per_actor" (default: False): If True, each uobject gets its own sample, otherwise
+    all uobjects share the same sampled value.
+
+    :param dict dist: The distribution spec.
+    :param int num: The number of uobjects to sample values for.
+    :param np.random.RandomState rng: The RNG to use.
+    :return: Array with `num` rows (one value per uobject).
+    :rtype: np.ndarray
+    :raises ValueError: If the distribution spec is malformatted.
+    """
+    type_ = dist.get("dist")
+    per_actor = dist.get("per_actor", False)
+    n = num if per_actor else 1
+    try:
+        if type_ == "uniform":
+            low, high = np.asarray(dist["low"], dtype=np.float64), np.asarray(dist["high"], dtype=np.float64)
+            samples = rng.uniform(low, high, size=(n,) + np.broadcast(low, high).shape)
+        elif type_ == "normal":
+            mean, std = np.asarray(dist["mean"], dtype=np.float64), np.asarray(dist["std"], dtype=np.float64)
+            samples = rng.normal(mean, std, size=(n,) + np.broadcast(mean, std).shape)
+        elif type_ == "choice":
+            values = np.asarray(dist["values"])
+            if len(values) == 0:
+                raise ValueError("Setter distribution 'choice' needs at least one value!")
+            samples = values[rng.randint(len(values), size=n)]
+        else:
+            raise ValueError("Unknown setter distribution type ({})! Needs to be one of uniform|normal|choice.".format(type_))
+    except KeyError as e:
+        raise ValueError("Setter distribution '{}' is missing parameter {}!".format(type_, e))
+
+    # shared value -> repeat the single sample for all uobjects
+    if not per_actor:
+        samples = np.repeat(samples, num, axis=0)
+    return samples
+
+
 def get_child_component(component, component_class):
     for child in component.AttachChildren:
         if child.is_a(component_class):
@@ -52,7 +551,7 @@ async def pause_game():
     """
     Pauses the game.
     """
-    playing_world = get_playing_world()
+    playing_world = CONTEXT.playing_world
     if not playing_world:
         return {"status": "error", "message": "No playing world!"}
 
@@ -85,7 +584,7 @@ def sanity_check_observer(observer, playing_world):
     return observer.GetAttachParent(), obs_name
 
 
-def get_scene_capture_and_texture(parent, obs_name, width=84, height=84):
+def get_scene_capture_and_texture(parent, obs_name, width=84, height=84, pool_key=None):
     """
     Adds a SceneCapture2DComponent to some parent camera object so we can capture the pixels for this camera view.
     Then captures the image, renders it on the render target of the scene capture and returns the image as a numpy array.
@@ -95,6 +594,8 @@ def get_scene_capture_and_texture(parent, obs_name, width=84, height=84):
     :param str obs_name: The name of the observer component.
     :param int width: The width (in px) to use for the render target.
     :param int height: The height (in px) to use for the render target.
+    :param Union[str,None] pool_key: The observer's identity (stable across level restarts) to pool its render target under
+    (default: obs_name).
     :return: numpy array containing the pixel values (0-255) of the captured image
     :rtype: np.ndarray
     """
@@ -112,13 +613,15 @@ def get_scene_capture_and_texture(parent, obs_name, width=84, height=84):
             scene_capture = parent.get_owner().add_actor_component(SceneCaptureComponent2D, "Engine2LearnScreenCapture", parent)
             scene_capture.bCaptureEveryFrame = False
             scene_capture.bCaptureOnMovement = False
+            CONTEXT.capture_pool.num_scene_captures_created += 1
     # error -> return nothing
     else:
         raise RuntimeError("Observer {} has bScreenCapture set to true, but is not a child of either a Camera or a SceneCapture2D!".format(obs_name))
 
     if not texture:
         # TODO: setup camera transform and options (greyscale, etc..)
-        texture = scene_capture.TextureTarget = ue.create_transient_texture_render_target2d(width, height)
+        # reuse the render target of this observer (e.g. from before the last level restart) if possible
+        texture = CONTEXT.capture_pool.attach(scene_capture, pool_key or obs_name, width, height)
         ue.log("DEBUG: scene capture is created in get_scene_image texture={}".format(scene_capture.TextureTarget))
 
     return scene_capture, texture
@@ -135,104 +638,523 @@ def get_scene_capture_image(scene_capture, texture):
     """
     # TODO: find out why image is not real-color (doesn't seem to be RGB encoded)
     # trigger the scene capture
-    scene_capture.CaptureScene()
+    with TRACER.span("CaptureScene"):
+        scene_capture.CaptureScene()
     # TODO: copy the bytes into the same memory location each time to avoid garbage collection
-    byte_string = bytes(texture.render_target_get_data())  # use render_target_get_data_to_buffer(data, [mipmap]?) instead
+    with TRACER.span("render_target_get_data"):
+        byte_string = bytes(texture.render_target_get_data())  # use render_target_get_data_to_buffer(data, [mipmap]?) instead
     np_array = np.frombuffer(byte_string, dtype=np.uint8)  # convert to pixel values (0-255 uint8)
     img = np_array.reshape((texture.SizeX, texture.SizeY, 4))[:, :, :3]  # slice away alpha value
 
     return img
 
 
-def compile_obs_dict(reward=None):
+def get_ray_directions(num_rays, field_of_view, yaw):
+    """
+    :return: num_rays x 2 array of the (x, y) unit directions of a horizontal fan of rays around the given yaw (degrees).
+    :rtype: np.ndarray
+    """
+    if field_of_view >= 360.0:
+        angles = np.linspace(0.0, 360.0, num_rays, endpoint=False)
+    else:
+        angles = np.linspace(-field_of_view / 2.0, field_of_view / 2.0, num_rays)
+    angles = np.radians(angles + yaw)
+    return np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+
+def get_hit_class(actor, hit_classes):
+    """
+    :return: The lidar hit class of an actor (i+1 for an actor of class hit_classes[i], len(hit_classes)+1 otherwise).
+    :rtype: int
+    """
+    for i, actor_class in enumerate(hit_classes):
+        if actor.is_a(actor_class):
+            return i + 1
+    return len(hit_classes) + 1
+
+
+def read_lidar(observer, obs_name, obs_dict):
+    """
+    Casts the observer's fan of line traces (see the observer's Lidar* settings) and writes the hit distances
+    ([obs_name]/lidar_distances; LidarRange for no hit) and hit classes ([obs_name]/lidar_classes; see `get_hit_class`,
+    0 for no hit) into the given obs_dict.
+    """
+    num_rays, range_, hit_classes = observer.LidarNumRays, observer.LidarRange, observer.LidarHitClasses
+    origin = observer.get_world_location()
+    ends = np.array([origin.x, origin.y]) + get_ray_directions(num_rays, observer.LidarFieldOfView, observer.get_world_rotation().yaw) * range_
+    distances = np.full((num_rays,), range_, dtype=np.float32)
+    classes = np.zeros((num_rays,), dtype=np.int32)
+    playing_world = CONTEXT.playing_world
+    ignore = [observer.get_owner()]
+    for i in range(num_rays):
+        end = ue.FVector(float(ends[i, 0]), float(ends[i, 1]), origin.z)
+        hit, hit_result = KismetSystemLibrary.LineTraceSingle(playing_world, origin, end, ETraceTypeQuery.TraceTypeQuery1,
+                                                              False, ignore, 0)  # 0=EDrawDebugTrace::None
+        if hit:
+            distances[i] = hit_result.Distance
+            classes[i] = get_hit_class(hit_result.Actor, hit_classes) if hit_result.Actor else len(hit_classes) + 1
+    obs_dict[obs_name + "/lidar_distances"] = distances
+    obs_dict[obs_name + "/lidar_classes"] = classes
+
+
+def read_occupancy_grid(observer, obs_name, obs_dict):
+    """
+    Rasterizes the (x, y) positions of all actors of the observer's OccupancyClasses (default: all Pawns) into a top-down
+    grid centered on the observer (x-axis=the observer's forward direction) and writes it into the given obs_dict
+    ([obs_name]/occupancy; size x size x num-classes uint8, 1=occupied). The observer's own actor is left out.
+    """
+    size, cell_size = observer.OccupancyGridSize, observer.OccupancyGridCellSize
+    classes = observer.OccupancyClasses or [Pawn]
+    grid = np.zeros((size, size, len(classes)), dtype=np.uint8)
+    origin = observer.get_world_location()
+    yaw = np.radians(observer.get_world_rotation().yaw)
+    cos, sin = np.cos(yaw), np.sin(yaw)
+    owner = observer.get_owner()
+    owner_name = owner.get_name() if owner else None
+    playing_world = CONTEXT.playing_world
+    for c, actor_class in enumerate(classes):
+        locations = [a.get_actor_location() for a in CONTEXT.class_index.get_slots(playing_world, actor_class)
+                     if a is not None and a.get_name() != owner_name]
+        if not locations:
+            continue
+        rel = np.array([(l.x, l.y) for l in locations]) - np.array([origin.x, origin.y])
+        # world -> observer frame (rotate by -yaw), then -> cell indices
+        ix = np.floor((rel[:, 0] * cos + rel[:, 1] * sin) / cell_size + size / 2.0).astype(np.int64)
+        iy = np.floor((rel[:, 1] * cos - rel[:, 0] * sin) / cell_size + size / 2.0).astype(np.int64)
+        inside = (ix >= 0) & (ix < size) & (iy >= 0) & (iy < size)
+        grid[ix[inside], iy[inside], c] = 1
+    obs_dict[obs_name + "/occupancy"] = grid
+
+
+def read_signal_property(observer, parent, obs_name):
+    """
+    Reads the single property of a reward- or is_terminal-observer.
+
+    :return: Tuple: the property's value (or None), an error response dict (or None).
+    :rtype: tuple
+    """
+    label = "Reward" if obs_name == "_reward" else "IsTerminal"
+    if len(observer.ObservedProperties) != 1:
+        return None, {"status": "error", "message": "{}-observer {} has 0 or more than 1 property!".format(label, obs_name)}
+    observed_prop = observer.ObservedProperties[0]
+    prop_name = observed_prop.PropName
+    if not parent.has_property(prop_name):
+        return None, {"status": "error", "message": "{}-property {} is not a property of parent ({})!".format(label, prop_name, parent)}
+    return parent.get_property(prop_name), None
+
+
+def read_observer(observer, parent, obs_name, obs_dict):
+    """
+    Reads all observations of a normal (non-reward/non-is_terminal) observer into the given obs_dict.
+
+    :return: An error response dict or None if everything went fine.
+    :rtype: Union[dict,None]
+    """
+    # this observer returns a camera image
+    if observer.bScreenCapture:
+        try:
+            scene_capture, texture = get_scene_capture_and_texture(parent, obs_name, pool_key=observer.get_path_name())
+        except RuntimeError as e:
+            return {"status": "error", "message": "{}".format(e)}
+        img = get_scene_capture_image(scene_capture, texture)
+        obs_dict[obs_name + "/camera"] = img
+
+    # this observer has geometry sensors (no rendering/GPU readback needed)
+    if observer.bLidar:
+        read_lidar(observer, obs_name, obs_dict)
+    if observer.bOccupancyGrid:
+        read_occupancy_grid(observer, obs_name, obs_dict)
+
+    with TRACER.span("read_properties", {"observer": obs_name}):
+        for observed_prop in observer.ObservedProperties:
+            if not observed_prop.bEnabled:
+                continue
+            prop_name = observed_prop.PropName
+            if not parent.has_property(prop_name):
+                continue
+
+            prop = parent.get_property(prop_name)
+            type_ = type(prop)
+            if type_ == ue.FVector or type_ == ue.FRotator:
+                value = (prop[0], prop[1], prop[2])
+            elif type_ == ue.UObject:
+                value = str(prop)
+            elif type_ == bool or type_ == int or type_ == float:
+                value = prop
+            else:
+                return {"status": "error", "message": "Observed property {} has an unsupported type ({})".format(prop_name, type_)}
+
+            obs_dict[obs_name+"/"+prop_name] = value
+
+    return None
+
+
+def get_property_template(uobj, prop_name):
+    """
+    :return: Tuple (space type, value shape, dtype) for the given property of a uobject (e.g. a class default object) or
+        None if the uobject doesn't have the property (or it is not numeric).
+    :rtype: Union[tuple,None]
+    """
+    if not uobj.has_property(prop_name):
+        return None
+    type_ = type(uobj.get_property(prop_name))
+    if type_ == ue.FVector or type_ == ue.FRotator:
+        return "Continuous", (3,), np.float64
+    elif type_ == bool:
+        return "Bool", (), bool
+    elif type_ == float:
+        return "Continuous", (), np.float64
+    elif type_ == int:
+        return "IntBox", (), np.int64
+    return None
+
+
+def read_class_observers(obs_dict):
+    """
+    Reads all class observers (see `ServerContext.class_observers`) into the given obs_dict: per observed property, a
+    padded array with one row per actor slot ([Name]/[PropName]; capacity x value shape), plus the validity mask of the
+    rows ([Name]/_mask) and the number of living actors of the class ([Name]/_count; may be larger than the capacity, in
+    which case the actors in the slots beyond the capacity are not observed).
+    """
+    playing_world = CONTEXT.playing_world
+    for name, actor_class, props, capacity in CONTEXT.class_observers:
+        slots = CONTEXT.class_index.get_slots(playing_world, actor_class)
+        rows = [i for i, actor in enumerate(slots[:capacity]) if actor is not None]
+        actors = [slots[i] for i in rows]
+        mask = np.zeros((capacity,), dtype=bool)
+        mask[rows] = True
+        for prop_name, (_, shape, dtype) in props:
+            array = np.zeros((capacity,) + shape, dtype=dtype)
+            if rows:
+                array[rows] = get_property_values(actors, prop_name)
+            obs_dict[name + "/" + prop_name] = array
+        obs_dict[name + "/_mask"] = mask
+        obs_dict[name + "/_count"] = sum(actor is not None for actor in slots)
+
+
+def describe_class_observers(observation_space_desc):
+    """
+    Adds the space descriptors of all class observers (see `read_class_observers`) to the given observation_space_desc.
+    """
+    for name, _, props, capacity in CONTEXT.class_observers:
+        for prop_name, (type_, shape, _) in props:
+            observation_space_desc[name + "/" + prop_name] = {"type": type_, "shape": (capacity,) + shape}
+        observation_space_desc[name + "/_mask"] = {"type": "Bool", "shape": (capacity,)}
+        observation_space_desc[name + "/_count"] = {"type": "IntBox", "shape": (1,), "min": 0}
+
+
+def drain_events():
+    """
+    Drains the gameplay event queue (events pushed by game code or Blueprints via E2LEventLibrary.PushEvent since the
+    last drain) into compact arrays.
+    The queue has a single consumer: the responses of the commands that advance the game, i.e. steps (see the server's
+    `step`; also used by 'rollout') and stream frames (see `ObsStream`). Other compiles (reset, set, ...) don't drain it
+    (see the `drain` arg of `compile_obs_dict`). If several connections step the same world, each step's response only
+    carries the events since the previous step of any connection.
+
+    :return: Dict with keys: types (list of the distinct event type names), type (int32 array; index into types), value
+        (float32 array), frame (int32 array; the engine frames the events were pushed in), source and target (lists of
+        actor names; "" for none) and num_dropped (events lost because the queue was full).
+    :rtype: dict
+    """
+    num_dropped = E2LEventLibrary.GetNumDroppedEvents()
+    events = E2LEventLibrary.DrainEvents()
+    n = len(events)
+    types = {}
+    type_ = np.empty((n,), dtype=np.int32)
+    value = np.empty((n,), dtype=np.float32)
+    frame = np.empty((n,), dtype=np.int32)
+    source, target = [], []
+    for i, event in enumerate(events):
+        type_[i] = types.setdefault(str(event.Type), len(types))
+        value[i] = event.Value
+        frame[i] = event.Frame
+        source.append(event.Source)
+        target.append(event.Target)
+    return {"types": list(types), "type": type_, "value": value, "frame": frame, "source": source, "target": target,
+            "num_dropped": num_dropped}
+
+
+def get_event_signals(events, agent_owners=None, num_agents=0):
+    """
+    Sums up the reward events' values and checks for terminal events (see REWARD_EVENT and TERMINAL_EVENT).
+    In multi-agent mode, events whose target is an agent (its pawn or controller) only count for that agent, all
+    others for all agents.
+
+    :param dict events: The drained events (see `drain_events`).
+    :param Union[dict,None] agent_owners: Dict mapping actor names to agent indices (see `get_agent_owners`; None for
+        single-agent mode).
+    :param int num_agents: The number of agents (multi-agent mode).
+    :return: Tuple: reward delta, is_terminal flag (both arrays of len num_agents in multi-agent mode).
+    :rtype: tuple
+    """
+    type_ = events["type"]
+    reward_mask = type_ == (events["types"].index(REWARD_EVENT) if REWARD_EVENT in events["types"] else -1)
+    terminal_mask = type_ == (events["types"].index(TERMINAL_EVENT) if TERMINAL_EVENT in events["types"] else -1)
+    if agent_owners is None:
+        return float(events["value"][reward_mask].sum()), bool(terminal_mask.any())
+
+    agent = np.array([agent_owners.get(t, -1) for t in events["target"]], dtype=np.int64)
+    reward = np.full((num_agents,), events["value"][reward_mask & (agent < 0)].sum(), dtype=np.float64)
+    np.add.at(reward, agent[reward_mask & (agent >= 0)], events["value"][reward_mask & (agent >= 0)])
+    is_terminal = np.full((num_agents,), (terminal_mask & (agent < 0)).any())
+    is_terminal[agent[terminal_mask & (agent >= 0)]] = True
+    return reward, is_terminal
+
+
+def reset_rewards(reward=0.0):
+    """
+    Sets the absolute accumulated reward values (single-agent and - for all agents - multi-agent) to the given value
+    (e.g. to 0 when a new episode is started), so the next step's reward deltas are taken relative to it.
+    """
+    global _REWARD, _AGENT_REWARDS
+
+    _REWARD = reward
+    _AGENT_REWARDS = np.full(_AGENT_REWARDS.shape, reward)
+
+
+def compile_obs_dict(reward=None, drain=False):
     """
     Compiles the current observations (based on all active E2LObservers) into a dictionary that is returned to the UE4Env object's reset/step/... methods.
 
     :param Union[float,None] reward: The absolute global accumulated reward value to set (mostly used to reset everything to 0 after a new episode is started).
+    :param bool drain: Whether to drain the gameplay event queue into the response ('_events'; their reward and
+        terminal signals count for this response). Only for the queue's consumer (see `drain_events`).
     :returns: The obs_dict as a python dict (ready to be sent back to the client).
     :rtype: dict
     """
     global _REWARD
 
-    playing_world = get_playing_world()
     r = 0.0
     is_terminal = False
     if reward is not None:
-        _REWARD = reward
+        reset_rewards(reward)
 
     # DEBUG
     #pydevd.settrace("localhost", port=20023, stdoutToServer=True, stderrToServer=True)  # DEBUG
     # END: DEBUG
 
-    for observer in E2LObserver.GetRegisteredObservers():
-        parent, obs_name = sanity_check_observer(observer, playing_world)
-        if not parent:
-            continue
+    for observer, parent, obs_name in CONTEXT.observers:
         # the reward observer
-        elif obs_name == "_reward":
-            if len(observer.ObservedProperties) != 1:
-                return {"status": "error", "message": "Reward-observer {} has 0 or more than 1 property!".format(obs_name)}
-            observed_prop = observer.ObservedProperties[0]
-            prop_name = observed_prop.PropName
-            if not parent.has_property(prop_name):
-                return {"status": "error", "message": "Reward-property {} is not a property of parent ({})!".format(prop_name, parent)}
-            r = parent.get_property(prop_name)[0]  # FOR NOW: use x-Location as reward (bad, but we need 20tab to add this functionality)
+        if obs_name == "_reward":
+            prop, error = read_signal_property(observer, parent, obs_name)
+            if error:
+                return error
+            r = prop[0]  # FOR NOW: use x-Location as reward (bad, but we need 20tab to add this functionality)
         # the is_terminal observer
         elif obs_name == "_is_terminal":
-            if len(observer.ObservedProperties) != 1:
-                return {"status": "error", "message": "IsTerminal-observer {} has 0 or more than 1 property!".format(obs_name)}
-            observed_prop = observer.ObservedProperties[0]
-            prop_name = observed_prop.PropName
-            if not parent.has_property(prop_name):
-                return {"status": "error", "message": "IsTerminal-property {} is not a property of parent ({})!".format(prop_name, parent)}
-            is_terminal = (parent.get_property(prop_name)[0] > 0.0)  # FOR NOW: use Rotation: x > 0 as is_terminal signal
+            prop, error = read_signal_property(observer, parent, obs_name)
+            if error:
+                return error
+            is_terminal = (prop[0] > 0.0)  # FOR NOW: use Rotation: x > 0 as is_terminal signal
         # normal (non-reward/non-is_terminal) observer
         else:
-            # this observer returns a camera image
-            if observer.bScreenCapture:
-                try:
-                    scene_capture, texture = get_scene_capture_and_texture(parent, obs_name)
-                except RuntimeError as e:
-                    return {"status": "error", "message": "{}".format(e)}
-                img = get_scene_capture_image(scene_capture, texture)
-                _OBS_DICT[obs_name + "/camera"] = img
-
-            for observed_prop in observer.ObservedProperties:
-                if not observed_prop.bEnabled:
-                    continue
-                prop_name = observed_prop.PropName
-                if not parent.has_property(prop_name):
-                    continue
-
-                prop = parent.get_property(prop_name)
-                type_ = type(prop)
-                if type_ == ue.FVector or type_ == ue.FRotator:
-                    value = (prop[0], prop[1], prop[2])
-                elif type_ == ue.UObject:
-                    value = str(prop)
-                elif type_ == bool or type_ == int or type_ == float:
-                    value = prop
-                else:
-                    return {"status": "error", "message": "Observed property {} has an unsupported type ({})".format(prop_name, type_)}
+            error = read_observer(observer, parent, obs_name, _OBS_DICT)
+            if error:
+                return error
+    with TRACER.span("read_class_observers"):
+        read_class_observers(_OBS_DICT)
 
-                _OBS_DICT[obs_name+"/"+prop_name] = value
+    # the gameplay events since the last step (exact, no matter how many ticks the step had)
+    events, event_reward, event_terminal = None, 0.0, False
+    if drain:
+        events = drain_events()
+        event_reward, event_terminal = get_event_signals(events)
 
     # update global total reward counter
     prev_reward = _REWARD
     _REWARD = r
-    message = {"status": "ok", "obs_dict": _OBS_DICT, "_reward": (r - prev_reward), "_is_terminal": is_terminal}
+    message = {"status": "ok", "obs_dict": _OBS_DICT, "_reward": (r - prev_reward) + event_reward,
+               "_is_terminal": is_terminal or event_terminal}
+    if events is not None:
+        message["_events"] = events
     return message
 
 
+def get_agent_index(observer, agent_owners):
+    """
+    :param uobject observer: The observer whose agent to find.
+    :param dict agent_owners: Dict mapping actor names (agent pawns and controllers) to agent indices (see `get_agent_owners`).
+    :return: The index of the agent (player controller) the observer belongs to (None if it does not belong to any agent).
+    :rtype: Union[int,None]
+    """
+    owner = observer.get_owner()
+    if not owner:
+        return None
+    return agent_owners.get(owner.get_name())
+
+
+def get_agent_owners(controllers):
+    """
+    :param list controllers: The agents' player controllers.
+    :return: Dict mapping the names of all agent controllers and their possessed pawns to the agent's index.
+    :rtype: dict
+    """
+    agent_owners = {}
+    for i, controller in enumerate(controllers):
+        agent_owners[controller.get_name()] = i
+        pawn = controller.get_controlled_pawn()
+        if pawn:
+            agent_owners[pawn.get_name()] = i
+    return agent_owners
+
+
+def compile_multi_agent_obs_dict(reward=None, drain=False):
+    """
+    Compiles the current observations for all agents (player controllers) into a dictionary.
+    Observers attached to an agent's pawn (or controller) are grouped per agent and stacked into batched arrays (first
+    axis=agent index) under 'agent_obs_dict'. All other observers go into 'obs_dict' (as in `compile_obs_dict`, but built
+    fresh on each call, so it never holds the keys of agent observers from a previous single-agent compile).
+    Rewards and is_terminal signals are returned as arrays (one value per agent). Agents without their own reward/is_terminal
+    observer get the global (non-agent) reward/is_terminal signal.
+
+    :param Union[float,None] reward: The absolute accumulated reward value to set for all agents (mostly used to reset everything to 0 after a new episode is started).
+    :param bool drain: Whether to drain the gameplay event queue into the response (see `compile_obs_dict`).
+    :returns: The obs_dict as a python dict (ready to be sent back to the client).
+    :rtype: dict
+    """
+    global _AGENT_REWARDS
+
+    controllers = CONTEXT.controllers
+    num_agents = len(controllers)
+    agent_owners = get_agent_owners(controllers)
+    if reward is not None:
+        reset_rewards(reward)
+    if len(_AGENT_REWARDS) != num_agents:
+        _AGENT_REWARDS = np.full((num_agents,), reward or 0.0)
+
+    r = np.full((num_agents,), np.nan)
+    is_terminal = np.zeros((num_agents,), dtype=bool)
+    has_terminal = np.zeros((num_agents,), dtype=bool)
+    global_r = 0.0
+    global_is_terminal = False
+    obs_dict = {}
+    agent_obs = [{} for _ in range(num_agents)]
+
+    for observer, parent, obs_name in CONTEXT.observers:
+        i = get_agent_index(observer, agent_owners)
+        if obs_name == "_reward" or obs_name == "_is_terminal":
+            prop, error = read_signal_property(observer, parent, obs_name)
+            if error:
+                return error
+            # same FOR NOW-hacks as in compile_obs_dict
+            if obs_name == "_reward":
+                if i is None:
+                    global_r = prop[0]
+                else:
+                    r[i] = prop[0]
+            elif i is None:
+                global_is_terminal = (prop[0] > 0.0)
+            else:
+                is_terminal[i] = (prop[0] > 0.0)
+                has_terminal[i] = True
+        else:
+            error = read_observer(observer, parent, obs_name, obs_dict if i is None else agent_obs[i])
+            if error:
+                return error
+
+    read_class_observers(obs_dict)
+
+    r[np.isnan(r)] = global_r
+    is_terminal[~has_terminal] = global_is_terminal
+
+    # stack the per-agent observations (agents that are missing some key, e.g. because their pawn died, get zeros)
+    agent_obs_dict = {}
+    keys = set()
+    for obs in agent_obs:
+        keys.update(obs.keys())
+    for key in keys:
+        template = next(np.asarray(obs[key]) for obs in agent_obs if key in obs)
+        agent_obs_dict[key] = np.stack([np.asarray(obs[key]) if key in obs else np.zeros_like(template) for obs in agent_obs])
+
+    events, event_rewards, event_terminals = None, 0.0, False
+    if drain:
+        events = drain_events()
+        event_rewards, event_terminals = get_event_signals(events, agent_owners, num_agents)
+
+    prev_rewards = _AGENT_REWARDS
+    _AGENT_REWARDS = r
+    message = {"status": "ok", "obs_dict": obs_dict, "agent_obs_dict": agent_obs_dict,
+               "_reward": (r - prev_rewards) + event_rewards, "_is_terminal": is_terminal | event_terminals}
+    if events is not None:
+        message["_events"] = events
+    return message
+
+
+def describe_observer(observer, parent, obs_name, observation_space_desc):
+    """
+    Adds the space descriptors of all observations of a normal (non-reward/non-is_terminal) observer to the given
+    observation_space_desc.
+
+    :return: An error response dict or None if everything went fine.
+    :rtype: Union[dict,None]
+    """
+    # this observer returns a camera image
+    if observer.bScreenCapture:
+        try:
+            _, texture = get_scene_capture_and_texture(parent, obs_name, pool_key=observer.get_path_name())
+        except RuntimeError as e:
+            return {"status": "error", "message": "{}".format(e)}
+        observation_space_desc[obs_name+"/camera"] = {"type": "IntBox", "shape": (texture.SizeX, texture.SizeY, 3), "min": 0, "max": 255}
+    if observer.bLidar:
+        observation_space_desc[obs_name+"/lidar_distances"] = {"type": "Continuous", "shape": (observer.LidarNumRays,),
+                                                               "min": 0.0, "max": observer.LidarRange}
+        observation_space_desc[obs_name+"/lidar_classes"] = {"type": "IntBox", "shape": (observer.LidarNumRays,),
+                                                             "min": 0, "max": len(observer.LidarHitClasses) + 1}
+    if observer.bOccupancyGrid:
+        size = observer.OccupancyGridSize
+        observation_space_desc[obs_name+"/occupancy"] = {"type": "IntBox", "shape": (size, size, len(observer.OccupancyClasses) or 1),
+                                                         "min": 0, "max": 1}
+
+    # go through non-camera/capture properties that need to be observed by this Observer
+    for observed_prop in observer.ObservedProperties:
+        if not observed_prop.bEnabled:
+            continue
+        prop_name = observed_prop.PropName
+        if not parent.has_property(prop_name):
+            continue
+
+        type_ = type(parent.get_property(prop_name))
+        if type_ == ue.FVector or type_ == ue.FRotator:
+            desc = {"type": "Continuous", "shape": (3,)}  # no min/max -> derived from samples (see `add_observed_bounds`)
+        elif type_ == ue.UObject:
+            desc = {"type": "str"}
+        elif type_ == bool:
+            desc = {"type": "Bool"}
+        elif type_ == float:
+            desc = {"type": "Continuous", "shape": (1,)}
+        elif type_ == int:
+            desc = {"type": "IntBox", "shape": (1,)}
+        else:
+            return {"status": "error", "message": "Observed property {} has an unsupported type ({})".format(prop_name, type_)}
+
+        observation_space_desc[obs_name+"/"+prop_name] = desc
+
+    return None
+
+
+def add_observed_bounds(observation_space_desc):
+    """
+    Adds the min/max values observed so far (see `ServerContext.obs_stats`) to all Continuous space descriptors that
+    don't have any bounds yet (flagged with "bounds": "observed").
+    """
+    for key, desc in observation_space_desc.items():
+        if desc["type"] != "Continuous" or "min" in desc:
+            continue
+        stats = CONTEXT.obs_stats.stats.get(key)
+        if stats is not None and stats.count > 0:
+            desc["min"], desc["max"], desc["bounds"] = stats.min.tolist(), stats.max.tolist(), "observed"
+
+
 def get_spec():
     """
     Returns the observation_space (observers) and action_space (action- and axis-mappings) of the Game as a dict with keys:
-    `observation_space` and `action_space`
+    `observation_space` and `action_space`.
+    Also returns a list of all `agents` (player controllers), each with its controller/pawn names, its action_space and
+    the observation_space of those observers that are attached to the agent's pawn (or controller).
     """
     # auto_texture_size = (84, 84)  # the default size of SceneCapture2D components automatically added to a camera
 
-    playing_world = get_playing_world()
-
     # build the action_space descriptor
     action_space_desc = {}
     input_ = ue.get_mutable_default(InputSettings)
@@ -258,48 +1180,35 @@ def get_spec():
     #pydevd.settrace("localhost", port=20023, stdoutToServer=True, stderrToServer=True)  # DEBUG
     # END: DEBUG
 
+    # the agents (all player controllers); input mappings are global, so all agents share the same action_space
+    controllers = CONTEXT.controllers
+    agent_owners = get_agent_owners(controllers)
+    agents = []
+    for controller in controllers:
+        pawn = controller.get_controlled_pawn()
+        agents.append({"controller": controller.get_name(), "pawn": pawn.get_name() if pawn else None,
+                       "action_space_desc": action_space_desc, "observation_space_desc": {}})
+
     # build the observation_space descriptor
     observation_space_desc = {}
-    for observer in E2LObserver.GetRegisteredObservers():
-        parent, obs_name = sanity_check_observer(observer, playing_world)
+    for observer, parent, obs_name in CONTEXT.observers:
         # ignore reward observer and is-terminal observer
-        if not parent or obs_name == "_reward" or obs_name == "_is_terminal":
+        if obs_name == "_reward" or obs_name == "_is_terminal":
             continue
 
         # ue.log("DEBUG: get_spec observer {}".format(obs_name))
 
-        # this observer returns a camera image
-        if observer.bScreenCapture:
-            try:
-                _, texture = get_scene_capture_and_texture(parent, obs_name)
-            except RuntimeError as e:
-                return {"status": "error", "message": "{}".format(e)}
-            observation_space_desc[obs_name+"/camera"] = {"type": "IntBox", "shape": (texture.SizeX, texture.SizeY, 3), "min": 0, "max": 255}
-
-        # go through non-camera/capture properties that need to be observed by this Observer
-        for observed_prop in observer.ObservedProperties:
-            if not observed_prop.bEnabled:
-                continue
-            prop_name = observed_prop.PropName
-            if not parent.has_property(prop_name):
-                continue
-
-            type_ = type(parent.get_property(prop_name))
-            if type_ == ue.FVector or type_ == ue.FRotator:
-                desc = {"type": "Continuous", "shape": (3,)}  # no min/max -> will be derived from samples
-            elif type_ == ue.UObject:
-                desc = {"type": "str"}
-            elif type_ == bool:
-                desc = {"type": "Bool"}
-            elif type_ == float:
-                desc = {"type": "Continuous", "shape": (1,)}
-            elif type_ == int:
-                desc = {"type": "IntBox", "shape": (1,)}
-            else:
-                return {"status": "error", "message": "Observed property {} has an unsupported type ({})".format(prop_name, type_)}
-
-            observation_space_desc[obs_name+"/"+prop_name] = desc
+        error = describe_observer(observer, parent, obs_name, observation_space_desc)
+        if error:
+            return error
+        # group the observer's spaces by agent as well
+        i = get_agent_index(observer, agent_owners)
+        if i is not None:
+            describe_observer(observer, parent, obs_name, agents[i]["observation_space_desc"])
 
+    describe_class_observers(observation_space_desc)
+    add_observed_bounds(observation_space_desc)
     # ue.log("observation_space_desc: {}".format(observation_space_desc))
 
-    return {"status": "ok", "action_space_desc": action_space_desc, "observation_space_desc": observation_space_desc}
+    return {"status": "ok", "action_space_desc": action_space_desc, "observation_space_desc": observation_space_desc,
+            "agents": agents}
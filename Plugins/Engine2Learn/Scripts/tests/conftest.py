@@ -0,0 +1,502 @@
+"""
+ -------------------------------------------------------------------------
+ engine2learn - Plugins/Engine2Learn/Scripts/tests/conftest.py
+
+ Unit tests for the script modules. The scripts import each other by
+ module name (as inside UE4), so their directory is put onto the path.
+ The server modules (ducandu_server, server_utils) are tested against a
+ fake engine (see `FakeEngine`): a small in-memory stand-in for the
+ unreal_engine module of UnrealEnginePython (worlds, actors, observers,
+ player controllers, the event queue and the plugin settings).
+ Run with: python -m pytest -q Plugins/Engine2Learn/Scripts/tests
+
+ created: 2026/10/19 in PyCharm
+ (c) 2017-2026 Roberto DeLoris (20tab) & Sven Mika (ducandu)
+ -------------------------------------------------------------------------
+"""
+
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeVector(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.z)[i]
+
+    def __add__(self, other):
+        return type(self)(self.x + other[0], self.y + other[1], self.z + other[2])
+
+    def __eq__(self, other):
+        return type(self) == type(other) and (self.x, self.y, self.z) == (other.x, other.y, other.z)
+
+
+class FakeRotator(FakeVector):
+    @property
+    def yaw(self):
+        return self.z
+
+
+class FakeUObject(object):
+    """
+    A uobject (actor, component, texture, ...): its (UPROPERTY-like) properties are readable through get_property and
+    as capitalized attributes.
+    """
+    def __init__(self, name, uclass=None, owner=None, **props):
+        self.__dict__.update(name=name, uclass=uclass, owner=owner, props=dict(props), valid=True, components=[])
+
+    def __getattr__(self, name):
+        props = self.__dict__["props"]
+        if name in props:
+            return props[name]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            self.__dict__[name] = value
+        else:
+            self.props[name] = value
+
+    def __repr__(self):
+        return self.name
+
+    def get_name(self):
+        return self.name
+
+    def get_path_name(self):
+        return "{}.{}".format(self.owner.get_path_name(), self.name) if self.owner else "/Game/Level." + self.name
+
+    def is_valid(self):
+        return self.valid
+
+    def is_a(self, uclass):
+        c = self.uclass
+        while c is not None:
+            if c is uclass:
+                return True
+            c = c.parent
+        return False
+
+    def has_property(self, prop_name):
+        return prop_name in self.props
+
+    def get_property(self, prop_name):
+        return self.props[prop_name]
+
+    def set_property(self, prop_name, value):
+        self.props[prop_name] = value
+
+    def get_owner(self):
+        return self.owner
+
+    def get_actor_components(self):
+        return self.components
+
+    def get_actor_location(self):
+        return self.props.get("Location", FakeVector())
+
+    def add_actor_component(self, uclass, name, parent):
+        component = FakeUObject(name, uclass, owner=self, TextureTarget=None)
+        self.components.append(component)
+        parent.AttachChildren.append(component)
+        return component
+
+    def CaptureScene(self):
+        self.props["NumCaptures"] = self.props.get("NumCaptures", 0) + 1
+
+
+class FakeClass(object):
+    def __init__(self, name, parent=None, **defaults):
+        self.name = name
+        self.parent = parent
+        self.defaults = defaults
+
+    def get_name(self):
+        return self.name
+
+    def get_cdo(self):
+        return FakeUObject("Default__" + self.name, self, **self.defaults)
+
+
+class FakeTexture(FakeUObject):
+    def __init__(self, width, height):
+        super(FakeTexture, self).__init__("TextureRenderTarget2D", SizeX=width, SizeY=height)
+        self.__dict__["rooted"] = False
+
+    def add_to_root(self):
+        self.rooted = True
+
+    def remove_from_root(self):
+        self.rooted = False
+
+    def render_target_get_data(self):
+        return bytes(self.SizeX * self.SizeY * 4)
+
+
+class FakeController(FakeUObject):
+    def __init__(self, name, pawn):
+        super(FakeController, self).__init__(name, CLASSES.PlayerController)
+        self.__dict__.update(pawn=pawn, axis_inputs=[], key_inputs=[])
+
+    def get_controlled_pawn(self):
+        return self.pawn
+
+    def input_axis(self, key, value, delta_time):
+        self.axis_inputs.append((key.KeyName, value))
+
+    def input_key(self, key, event):
+        self.key_inputs.append((key.KeyName, event))
+
+
+class FakeObserver(FakeUObject):
+    """
+    An E2LObserver component attached to (and observing the properties of) its owner.
+    """
+    def __init__(self, name, owner, prop_names=(), parent=None, **settings):
+        props = dict(bEnabled=True, bScreenCapture=False, bLidar=False, bOccupancyGrid=False, LidarNumRays=16,
+                     LidarFieldOfView=360.0, LidarRange=2000.0, LidarHitClasses=[], OccupancyGridSize=32,
+                     OccupancyGridCellSize=100.0, OccupancyClasses=[],
+                     ObservedProperties=[types.SimpleNamespace(PropName=p, bEnabled=True) for p in prop_names])
+        props.update(settings)
+        super(FakeObserver, self).__init__(name, CLASSES.E2LObserver, owner=owner, **props)
+        self.__dict__["parent"] = parent or owner
+
+    def has_world(self):
+        return self.owner.world is not None
+
+    def get_world(self):
+        return self.owner.world
+
+    def GetAttachParent(self):
+        return self.parent
+
+    def get_world_location(self):
+        return self.owner.get_actor_location()
+
+    def get_world_rotation(self):
+        return self.owner.props.get("Rotation", FakeRotator())
+
+
+class FakeWorld(object):
+    def __init__(self, engine):
+        self.engine = engine
+        self.valid = True
+        self.paused = False
+        self.actors = []
+        self.controllers = []
+        self.num_ticks = 0
+
+    def is_valid(self):
+        return self.valid
+
+    def get_world_type(self):
+        return 1  # game
+
+    def all_actors(self):
+        return [a for a in self.actors if a.is_valid()]
+
+    def get_player_controller(self):
+        return self.controllers[0] if self.controllers else None
+
+    def world_tick(self, delta_time, increase_fundamental_tick):
+        self.num_ticks += 1
+        for hook in list(self.engine.tick_hooks):
+            hook(self)
+
+    def restart_level(self):
+        self.engine.num_restarts += 1
+        # UE restarts the level on a later tick
+        asyncio.get_event_loop().call_soon(self.engine.load_world)
+
+
+class FakeEngine(object):
+    """
+    The state behind the fake unreal_engine module: the playing world (re-built from scratch by every level restart;
+    see `load_world`), the registered observers, the gameplay event queue and the class defaults (plugin and input
+    settings).
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.world = None
+        self.observers = []
+        self.observers_generation = 0
+        self.events = []
+        self.num_restarts = 0
+        self.num_class_scans = 0
+        self.actor_spawn_generation = 0
+        self.num_dropped_events = 0
+        self.tick_hooks = []  # called after each world tick
+        self.setup_hooks = []  # called for each newly loaded world (e.g. to add more actors or observers)
+        self.logs = []
+        self.line_trace = lambda origin, end: (False, None)
+        self.num_agents = 1
+        self.defaults = {
+            CLASSES.Engine2LearnSettings: types.SimpleNamespace(Address="", Port=0, SocketPath="", ClassObservers=[]),
+            CLASSES.InputSettings: types.SimpleNamespace(
+                ActionMappings=[types.SimpleNamespace(ActionName="Jump", Key=types.SimpleNamespace(KeyName="SpaceBar"))],
+                AxisMappings=[types.SimpleNamespace(AxisName="MoveForward", Key=types.SimpleNamespace(KeyName="W"), Scale=1.0)]),
+        }
+
+    def load_world(self, num_agents=None):
+        """
+        (Re-)builds the playing world: one player controller and pawn (with an observer "Obs" of its Health) per agent,
+        plus a non-agent actor "Level" (observer "World" of its Time) and whatever the `setup_hooks` add. The previous
+        world becomes invalid.
+        """
+        if num_agents is not None:
+            self.num_agents = num_agents
+        if self.world is not None:
+            self.world.valid = False
+            for actor in self.world.actors:
+                actor.valid = False
+        self.world = world = FakeWorld(self)
+        self.observers = []
+        for i in range(self.num_agents):
+            pawn = self.spawn(CLASSES.Pawn, "Pawn_{}".format(i), Health=100.0, Location=FakeVector(100.0 * i, 0.0, 0.0))
+            self.observers.append(FakeObserver("Obs", pawn, ["Health"]))
+            world.controllers.append(FakeController("PlayerController_{}".format(i), pawn))
+        level = self.spawn(CLASSES.Actor, "Level_0", Time=0.0)
+        self.observers.append(FakeObserver("World", level, ["Time"]))
+        for hook in self.setup_hooks:
+            hook(world)
+        self.observers_generation += 1
+        return world
+
+    def spawn(self, uclass, name, **props):
+        actor = FakeUObject(name, uclass, **dict(uclass.defaults, **props))
+        actor.__dict__["world"] = self.world
+        self.world.actors.append(actor)
+        self.actor_spawn_generation += 1
+        return actor
+
+    def destroy(self, actor):
+        actor.valid = False
+        self.world.actors.remove(actor)
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+        self.observers_generation += 1
+        return observer
+
+    def push_event(self, type_, value=0.0, source="", target=""):
+        self.events.append(types.SimpleNamespace(Type=type_, Value=value, Frame=0, Source=source, Target=target))
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def run_frames(self, num_frames=1):
+        """
+        Runs the event loop for the given number of loop iterations (engine frames).
+        """
+        for _ in range(num_frames):
+            self.loop.run_until_complete(asyncio.sleep(0))
+
+
+CLASSES = types.SimpleNamespace()
+CLASSES.UObject = FakeClass("Object")
+CLASSES.Actor = FakeClass("Actor", CLASSES.UObject)
+CLASSES.Pawn = FakeClass("Pawn", CLASSES.Actor)
+CLASSES.PlayerController = FakeClass("PlayerController", CLASSES.Actor)
+CLASSES.E2LObserver = FakeClass("E2LObserver", CLASSES.UObject)
+CLASSES.CameraComponent = FakeClass("CameraComponent", CLASSES.UObject)
+CLASSES.SceneCaptureComponent2D = FakeClass("SceneCaptureComponent2D", CLASSES.UObject)
+CLASSES.Engine2LearnSettings = FakeClass("Engine2LearnSettings", CLASSES.UObject)
+CLASSES.InputSettings = FakeClass("InputSettings", CLASSES.UObject)
+
+# the engine the fake modules' functions operate on (set by the `engine` fixture)
+ENGINE = None
+
+
+def _install_fake_modules():
+    ue = types.ModuleType("unreal_engine")
+    ue.FVector, ue.FRotator, ue.UObject = FakeVector, FakeRotator, FakeUObject
+    ue.log = lambda text: ENGINE.logs.append(text)
+    ue.all_worlds = lambda: [ENGINE.world] if ENGINE.world is not None else []
+    ue.get_mutable_default = lambda uclass: ENGINE.defaults[uclass]
+    ue.set_random_seed = lambda value: None
+    ue.create_transient_texture_render_target2d = FakeTexture
+
+    classes = types.ModuleType("unreal_engine.classes")
+    for name in ("Actor", "Pawn", "CameraComponent", "SceneCaptureComponent2D", "Engine2LearnSettings", "InputSettings"):
+        setattr(classes, name, getattr(CLASSES, name))
+
+    class E2LObserver(object):
+        GetRegisteredObservers = staticmethod(lambda: list(ENGINE.observers))
+        GetObserversGeneration = staticmethod(lambda: ENGINE.observers_generation)
+        GetActorSpawnGeneration = staticmethod(lambda: ENGINE.actor_spawn_generation)
+
+    class E2LEventLibrary(object):
+        @staticmethod
+        def DrainEvents():
+            events, ENGINE.events = ENGINE.events, []
+            return events
+        GetNumDroppedEvents = staticmethod(lambda: ENGINE.num_dropped_events)
+
+    class GameplayStatics(object):
+        @staticmethod
+        def SetGamePaused(world, paused):
+            world.paused = paused
+            return True
+        IsGamePaused = staticmethod(lambda world: world.paused)
+        GetPlayerController = staticmethod(lambda world, i: world.controllers[i] if i < len(world.controllers) else None)
+
+        @staticmethod
+        def GetAllActorsOfClass(world, uclass):
+            ENGINE.num_class_scans += 1
+            return [a for a in world.all_actors() if a.is_a(uclass)]
+
+    class KismetSystemLibrary(object):
+        LineTraceSingle = staticmethod(lambda world, origin, end, channel, complex_, ignore, draw: ENGINE.line_trace(origin, end))
+
+    classes.E2LObserver, classes.E2LEventLibrary = E2LObserver, E2LEventLibrary
+    classes.GameplayStatics, classes.KismetSystemLibrary = GameplayStatics, KismetSystemLibrary
+
+    structs = types.ModuleType("unreal_engine.structs")
+    structs.Key = lambda KeyName: types.SimpleNamespace(KeyName=KeyName)
+    enums = types.ModuleType("unreal_engine.enums")
+    enums.EInputEvent = types.SimpleNamespace(IE_Pressed=0, IE_Released=1)
+    enums.ETraceTypeQuery = types.SimpleNamespace(TraceTypeQuery1=0)
+
+    ue.classes, ue.structs, ue.enums = classes, structs, enums
+    for module in (ue, classes, structs, enums, types.ModuleType("ue_asyncio"), types.ModuleType("pydevd")):
+        sys.modules[module.__name__] = module
+
+
+_install_fake_modules()
+
+
+def _import_server():
+    """
+    Imports the server module (which cancels the previous tasks through the py3.6 API `asyncio.Task.all_tasks` and reads
+    the plugin settings on import).
+    """
+    global ENGINE
+
+    class Task(asyncio.Task):
+        all_tasks = staticmethod(lambda: set())
+
+    task, asyncio.Task = asyncio.Task, Task
+    engine, ENGINE = ENGINE, ENGINE or FakeEngine(None)
+    try:
+        import ducandu_server
+    finally:
+        asyncio.Task = task
+        ENGINE = engine
+    return ducandu_server
+
+
+# the test modules import the server module
+_import_server()
+
+
+@pytest.fixture
+def engine():
+    """
+    A fresh fake engine with a loaded world, a fresh server context and a fresh event loop (one loop iteration = one
+    engine frame) for each test.
+    """
+    global ENGINE
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    ENGINE = FakeEngine(loop)
+    ENGINE.load_world()
+    import command_scheduler
+    import ducandu_server as server
+    import server_utils as util
+
+    util.CONTEXT = util.ServerContext()
+    util._OBS_DICT.clear()
+    util._AGENT_REWARDS = util.np.zeros((0,))
+    util.reset_rewards(0.0)
+    server.CONNECTIONS.clear()
+    server.SPECTATORS.clear()
+    server._BROADCAST_SEQ = 0
+    server.SCHEDULER = command_scheduler.CommandScheduler()
+    try:
+        yield ENGINE
+    finally:
+        server.SCHEDULER.close()
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        asyncio.set_event_loop(None)
+        ENGINE = None
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.write_buffer_size = 0
+        self.aborted = False
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        pass
+
+    def get_write_buffer_size(self):
+        return self.write_buffer_size
+
+    def abort(self):
+        self.aborted = True
+
+
+class FakeWriter(object):
+    """
+    The writing end of a client connection: collects the written (length-prefixed msgpack) messages.
+    """
+    def __init__(self, name="client"):
+        self.name = name
+        self.transport = FakeTransport()
+        self.data = b""
+        self.closed = False
+
+    def get_extra_info(self, key):
+        return self.name
+
+    def is_closing(self):
+        return self.closed or self.transport.aborted
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def read_messages(self):
+        """
+        :return: All messages written so far (decoded); clears the written data.
+        :rtype: list
+        """
+        import msgpack
+        messages = []
+        data, self.data = self.data, b""
+        while data:
+            len_ = int(data[:8])
+            messages.append(msgpack.unpackb(data[8:8 + len_], raw=False))
+            data = data[8 + len_:]
+        return messages
+
+
+@pytest.fixture
+def connect(engine):
+    """
+    :return: A function creating a new (registered) ClientConnection with a FakeWriter.
+    """
+    import ducandu_server as server
+
+    def connect_(name="client"):
+        connection = server.ClientConnection(FakeWriter(name))
+        server.CONNECTIONS.add(connection)
+        return connection
+    return connect_
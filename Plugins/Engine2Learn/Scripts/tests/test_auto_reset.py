@@ -0,0 +1,99 @@
+import pytest
+
+import ducandu_server as server
+import server_utils as util
+
+
+@pytest.fixture
+def learner(engine, connect):
+    """
+    An auto-reset connection whose next step ends in a terminal state.
+    """
+    connection = connect()
+    response = server.manage_message({"cmd": "auto_reset", "setters": [("Pawn:Health", 50.0)]}, connection)
+    assert response == {"status": "ok", "enabled": True}
+    engine.push_event("terminal")
+    return connection
+
+
+def terminal_step(engine, connection):
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    assert response["_is_terminal"] and response["auto_reset"]
+    assert engine.num_restarts == 1
+    return response
+
+
+def test_reset_picks_up_the_compiled_observation(engine, learner):
+    terminal_step(engine, learner)
+    engine.run_frames(5)
+    response = server.manage_message({"cmd": "reset"}, learner)
+    assert response["status"] == "ok" and response["obs_dict"]["Obs/Health"] == 50.0
+    assert engine.num_restarts == 1 and learner.pending_reset is None
+
+
+def test_reset_waits_for_the_restart(engine, learner):
+    terminal_step(engine, learner)
+    assert server.manage_message({"cmd": "reset"}, learner) is None
+    engine.run_frames(5)
+    response, = learner.writer.read_messages()
+    assert response["obs_dict"]["Obs/Health"] == 50.0
+    assert engine.num_restarts == 1
+
+
+def test_the_pending_observation_is_a_copy(engine, learner):
+    terminal_step(engine, learner)
+    engine.run_frames(5)
+    # e.g. another connection's compile reuses the global obs_dict before the client picks up its reset observation
+    engine.world.actors[0].Health = 5.0
+    util.compile_obs_dict()
+    response = server.manage_message({"cmd": "reset"}, learner)
+    assert response["obs_dict"]["Obs/Health"] == 50.0
+
+
+@pytest.mark.parametrize("num_frames", [0, 5])
+def test_reset_with_setters_reuses_the_restart(engine, learner, num_frames):
+    terminal_step(engine, learner)
+    engine.run_frames(num_frames)
+    assert server.manage_message({"cmd": "reset", "setters": [("Level:Time", 7.0)]}, learner) is None
+    engine.run_frames(5)
+    response, = learner.writer.read_messages()
+    # applied on top of the auto-reset's setters
+    assert response["obs_dict"]["Obs/Health"] == 50.0 and response["obs_dict"]["World/Time"] == 7.0
+    assert engine.num_restarts == 1
+
+
+@pytest.mark.parametrize("cmd", ["step", "set", "seed", "rollout"])
+def test_controlling_commands_are_refused_while_the_restart_is_pending(engine, learner, cmd):
+    terminal_step(engine, learner)
+    response = server.manage_message({"cmd": cmd}, learner)
+    assert response["status"] == "error" and "restart is pending" in response["message"]
+    assert engine.world.num_ticks == 1
+    # read-only commands are fine
+    assert server.manage_message({"cmd": "get_spec"}, learner)["status"] == "ok"
+    assert learner.pending_reset is not None
+
+
+def test_step_after_the_restart_discards_the_observation(engine, learner):
+    terminal_step(engine, learner)
+    engine.run_frames(5)
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, learner)
+    assert response["status"] == "ok" and not response["_is_terminal"]
+    # the new episode has started (incl. the setters) nevertheless
+    assert response["obs_dict"]["Obs/Health"] == 50.0
+    assert learner.pending_reset is None and learner.pending_episode is None
+    # the next reset is a real one
+    assert server.manage_message({"cmd": "reset"}, learner) is None
+    engine.run_frames(5)
+    assert learner.writer.read_messages()[0]["obs_dict"]["Obs/Health"] == 100.0
+    assert engine.num_restarts == 2
+
+
+def test_disabled(engine, learner):
+    server.manage_message({"cmd": "auto_reset", "enabled": False}, learner)
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, learner)
+    assert response["_is_terminal"] and "auto_reset" not in response
+    assert engine.num_restarts == 0
+
+
+def test_invalid_setters(engine, connect):
+    assert server.manage_message({"cmd": "auto_reset", "setters": "Pawn:Health"}, connect())["status"] == "error"
@@ -0,0 +1,62 @@
+import numpy as np
+
+import ducandu_server as server
+from conftest import FakeVector
+
+
+def test_get_stacks_the_values(engine, connect):
+    engine.load_world(num_agents=3)
+    response = server.manage_message({"cmd": "get", "selectors": ["Pawn:Health", "Pawn:Location", "Level:Time"]}, connect())
+    assert response["status"] == "ok"
+    np.testing.assert_array_equal(response["values"]["Pawn:Health"], [100.0] * 3)
+    np.testing.assert_array_equal(response["values"]["Pawn:Location"], [[0.0, 0.0, 0.0], [100.0, 0.0, 0.0], [200.0, 0.0, 0.0]])
+    assert response["names"]["Pawn:Location"] == ["Pawn_0", "Pawn_1", "Pawn_2"]
+    assert response["values"]["Level:Time"].shape == (1,)
+
+
+def test_get_errors(engine, connect):
+    connection = connect()
+    assert server.manage_message({"cmd": "get"}, connection)["status"] == "error"
+    assert server.manage_message({"cmd": "get", "selectors": ["::"]}, connection)["status"] == "error"
+    # no match -> empty
+    response = server.manage_message({"cmd": "get", "selectors": ["Pawn:Mana"]}, connection)
+    assert response["values"]["Pawn:Mana"].shape == (0,) and response["names"]["Pawn:Mana"] == []
+
+
+def test_set_scatters_arrays(engine, connect):
+    engine.load_world(num_agents=2)
+    response = server.manage_message({"cmd": "set", "setters": [
+        ("Pawn:Health", np.array([10.0, 20.0])),
+        ("Pawn:Location", np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])),
+        ("Level:Time", 5.0, True)]}, connect())
+    assert response["status"] == "ok"
+    pawns = engine.world.actors[:2]
+    assert [p.Health for p in pawns] == [10.0, 20.0]
+    assert pawns[1].Location == FakeVector(4.0, 5.0, 6.0)
+    assert engine.world.actors[2].Time == 5.0
+
+
+def test_set_shared_vector_value(engine, connect):
+    engine.load_world(num_agents=2)
+    server.manage_message({"cmd": "set", "setters": [("Pawn:Location", np.array([1.0, 2.0, 3.0]))]}, connect())
+    assert all(p.Location == FakeVector(1.0, 2.0, 3.0) for p in engine.world.actors[:2])
+
+
+def test_set_wrong_number_of_rows(engine, connect):
+    engine.load_world(num_agents=2)
+    response = server.manage_message({"cmd": "set", "setters": [("Pawn:Health", np.array([1.0, 2.0, 3.0]))]}, connect())
+    assert response["status"] == "error" and "3 values" in response["message"]
+
+
+def test_set_samples_distributions(engine, connect):
+    engine.load_world(num_agents=3)
+    connection = connect()
+    server.manage_message({"cmd": "seed", "value": 1}, connection)
+    server.manage_message({"cmd": "set", "setters": [
+        ("Pawn:Health", {"dist": "uniform", "low": 0.0, "high": 1.0, "per_actor": True})]}, connection)
+    values = [p.Health for p in engine.world.actors[:3]]
+    assert len(set(values)) == 3 and all(0.0 <= v < 1.0 for v in values)
+    server.manage_message({"cmd": "set", "setters": [("Pawn:Health", {"dist": "choice", "values": [7.0]})]}, connection)
+    assert [p.Health for p in engine.world.actors[:3]] == [7.0] * 3
+    response = server.manage_message({"cmd": "set", "setters": [("Pawn:Health", {"dist": "beta"})]}, connection)
+    assert response["status"] == "error"
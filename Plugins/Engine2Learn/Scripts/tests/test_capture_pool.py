@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import ducandu_server as server
+import server_utils as util
+from conftest import CLASSES, FakeObserver, FakeUObject
+
+
+@pytest.fixture
+def cameras(engine):
+    """
+    Adds a camera with a screen-capture observer ("Cam") to the pawn of each (re-)loaded world.
+    """
+    cameras = []
+
+    def add_camera(world):
+        pawn = world.actors[0]
+        camera = FakeUObject("Camera", CLASSES.CameraComponent, owner=pawn, AttachChildren=[])
+        engine.observers.append(FakeObserver("Cam", pawn, parent=camera, bScreenCapture=True))
+        cameras.append(camera)
+    engine.setup_hooks.append(add_camera)
+    engine.load_world()
+    return cameras
+
+
+def restart(engine, connection):
+    server.manage_message({"cmd": "reset"}, connection)
+    engine.run_frames(3)
+    return connection.writer.read_messages()[0]
+
+
+def test_render_targets_survive_level_restarts(engine, connect, cameras):
+    connection = connect()
+    image = util.compile_obs_dict()["obs_dict"]["Cam/camera"]
+    assert image.shape == (84, 84, 3) and image.dtype == np.uint8
+    texture = cameras[0].AttachChildren[0].TextureTarget
+    assert texture.rooted
+
+    response = restart(engine, connection)
+    assert response["obs_dict"]["Cam/camera"].shape == (84, 84, 3)
+    assert len(cameras) == 2
+    # the new level's scene capture renders into the pooled render target
+    assert cameras[1].AttachChildren[0].TextureTarget is texture
+    stats = util.CONTEXT.capture_pool.get_stats()
+    assert stats["num_render_targets_created"] == 1 and stats["num_render_targets_reused"] >= 1
+    assert stats["num_scene_captures_created"] == 2
+
+
+def test_get_spec_uses_the_pooled_render_target(engine, cameras):
+    spec = util.get_spec()
+    assert spec["observation_space_desc"]["Cam/camera"]["shape"] == (84, 84, 3)
+    util.compile_obs_dict()
+    assert util.CONTEXT.capture_pool.get_stats()["num_render_targets_created"] == 1
+
+
+def test_release_detaches_from_the_live_scene_capture(engine, connect, cameras):
+    util.compile_obs_dict()
+    scene_capture = cameras[0].AttachChildren[0]
+    texture = scene_capture.TextureTarget
+    response = server.manage_message({"cmd": "release_captures"}, connect())
+    assert response == {"status": "ok", "num_released": 1}
+    assert scene_capture.TextureTarget is None and not texture.rooted
+    # re-created on demand
+    util.compile_obs_dict()
+    assert scene_capture.TextureTarget is not None and scene_capture.TextureTarget is not texture
+
+
+def test_world_change_releases_the_render_targets(engine, cameras):
+    util.compile_obs_dict()
+    texture = cameras[0].AttachChildren[0].TextureTarget
+    # e.g. the PIE session ended and a new one started
+    engine.load_world()
+    assert util.CONTEXT.playing_world is engine.world
+    assert not texture.rooted
+    assert util.CONTEXT.capture_pool.get_stats()["num_render_targets"] == 0
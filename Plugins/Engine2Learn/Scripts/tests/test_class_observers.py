@@ -0,0 +1,72 @@
+import types
+
+import numpy as np
+import pytest
+
+import ducandu_server as server
+import server_utils as util
+from conftest import CLASSES, FakeClass, FakeVector
+
+
+ENEMY = FakeClass("Enemy", CLASSES.Actor, Health=0.0, Location=FakeVector())
+
+
+@pytest.fixture
+def enemies(engine):
+    """
+    Observes up to 3 actors of class Enemy (their Health and Location) and spawns 2 of them.
+    """
+    engine.defaults[CLASSES.Engine2LearnSettings].ClassObservers = [
+        types.SimpleNamespace(Name="Enemies", ActorClass=ENEMY, PropNames=["Health", "Location", "Mana"], MaxActors=3,
+                              bEnabled=True)]
+    return [engine.spawn(ENEMY, "Enemy_{}".format(i), Health=10.0 * (i + 1), Location=FakeVector(i, 0.0, 0.0))
+            for i in range(2)]
+
+
+def test_padded_arrays(engine, enemies):
+    obs_dict = util.compile_obs_dict()["obs_dict"]
+    np.testing.assert_array_equal(obs_dict["Enemies/Health"], [10.0, 20.0, 0.0])
+    assert obs_dict["Enemies/Location"].shape == (3, 3)
+    np.testing.assert_array_equal(obs_dict["Enemies/_mask"], [True, True, False])
+    assert obs_dict["Enemies/_count"] == 2
+    assert "Enemies/Mana" not in obs_dict
+    desc = util.get_spec()["observation_space_desc"]
+    assert desc["Enemies/Health"]["shape"] == (3,) and desc["Enemies/Location"]["shape"] == (3, 3)
+
+
+def test_slots_are_stable(engine, enemies):
+    util.compile_obs_dict()
+    engine.destroy(enemies[0])
+    obs_dict = util.compile_obs_dict()["obs_dict"]
+    # the survivor keeps its row
+    np.testing.assert_array_equal(obs_dict["Enemies/Health"], [0.0, 20.0, 0.0])
+    np.testing.assert_array_equal(obs_dict["Enemies/_mask"], [False, True, False])
+    # the newcomer takes the lowest free slot
+    engine.spawn(ENEMY, "Enemy_2", Health=30.0)
+    obs_dict = util.compile_obs_dict()["obs_dict"]
+    np.testing.assert_array_equal(obs_dict["Enemies/Health"], [30.0, 20.0, 0.0])
+    assert obs_dict["Enemies/_count"] == 2
+
+
+def test_count_beyond_capacity(engine, enemies):
+    for i in range(2, 5):
+        engine.spawn(ENEMY, "Enemy_{}".format(i), Health=1.0)
+    obs_dict = util.compile_obs_dict()["obs_dict"]
+    assert obs_dict["Enemies/_count"] == 5 and obs_dict["Enemies/_mask"].all()
+
+
+def test_no_rescans_without_spawns(engine, connect, enemies):
+    connection = connect()
+    for _ in range(3):
+        server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    assert engine.num_class_scans == 1
+    # destroyed actors are noticed without a scan
+    engine.destroy(enemies[1])
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    np.testing.assert_array_equal(response["obs_dict"]["Enemies/_mask"], [True, False, False])
+    assert engine.num_class_scans == 1
+    # spawns trigger a re-scan
+    engine.spawn(ENEMY, "Enemy_2", Health=30.0)
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    np.testing.assert_array_equal(response["obs_dict"]["Enemies/Health"], [10.0, 30.0, 0.0])
+    assert engine.num_class_scans == 2
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+import command_scheduler
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_control_commands_run_inline():
+    async def main():
+        scheduler = command_scheduler.CommandScheduler()
+        future = scheduler.submit("control", lambda x: x + 1, 1)
+        assert future.done()
+        scheduler.close()
+        return await future
+    assert run(main()) == 2
+
+
+def test_exceptions_are_passed_to_the_future():
+    async def main():
+        scheduler = command_scheduler.CommandScheduler()
+        with pytest.raises(ZeroDivisionError):
+            await scheduler.submit("monitoring", lambda: 1 / 0)
+        scheduler.close()
+    run(main())
+
+
+def test_unknown_priority_raises():
+    with pytest.raises(ValueError):
+        command_scheduler.CommandScheduler().submit("urgent", lambda: None)
+
+
+def test_low_priority_work_is_deferred_to_later_frames():
+    async def main():
+        scheduler = command_scheduler.CommandScheduler(frame_budget=0.002)
+        futures = [scheduler.submit("monitoring", time.sleep, 0.003) for _ in range(3)]
+        await asyncio.sleep(0)
+        # one command per frame (each one exceeds the budget)
+        assert sum(f.done() for f in futures) == 1
+        await asyncio.gather(*futures)
+        stats = scheduler.get_stats()
+        assert stats["priorities"]["monitoring"]["num_commands"] == 3
+        assert stats["num_deferred_frames"] >= 2
+        scheduler.close()
+    run(main())
+
+
+def test_each_class_runs_at_least_once_per_frame():
+    async def main():
+        scheduler = command_scheduler.CommandScheduler(frame_budget=0.001)
+        evaluation = [scheduler.submit("evaluation", time.sleep, 0.002) for _ in range(5)]
+        monitoring = scheduler.submit("monitoring", lambda: "stats")
+        await asyncio.sleep(0)
+        assert sum(f.done() for f in evaluation) == 1 and monitoring.done()
+        await asyncio.gather(*evaluation)
+        scheduler.close()
+    run(main())
+
+
+def test_inline_time_only_counts_for_the_current_frame():
+    async def main():
+        scheduler = command_scheduler.CommandScheduler(frame_budget=0.005)
+        # lots of control work spread over many (idle) frames
+        for _ in range(5):
+            scheduler.submit("control", time.sleep, 0.002)
+            await asyncio.sleep(0)
+        futures = [scheduler.submit("evaluation", lambda: None) for _ in range(3)]
+        await asyncio.sleep(0)
+        # the budget of this frame was not used up by the control commands of the earlier frames
+        assert all(f.done() for f in futures)
+        scheduler.close()
+    run(main())
+
+
+def test_no_ticker_without_waiting_commands():
+    async def main():
+        scheduler = command_scheduler.CommandScheduler()
+        scheduler.submit("control", lambda: None)
+        assert scheduler._task is None
+        future = scheduler.submit("monitoring", lambda: "stats")
+        assert scheduler._task is not None
+        assert (await future) == "stats"
+        # all queues are empty -> the ticker exits
+        await asyncio.sleep(0)
+        assert scheduler._task.done()
+        # ... and is started again by the next queued command
+        assert (await scheduler.submit("evaluation", lambda: 1)) == 1
+        scheduler.close()
+    run(main())
+
+
+def test_close_cancels_the_waiting_commands():
+    async def main():
+        scheduler = command_scheduler.CommandScheduler()
+        future = scheduler.submit("monitoring", lambda: "stats")
+        scheduler.close()
+        assert future.cancelled() and scheduler._task is None
+        assert scheduler.get_stats()["priorities"]["monitoring"]["num_queued"] == 0
+        # still usable
+        assert (await scheduler.submit("monitoring", lambda: "stats")) == "stats"
+        scheduler.close()
+    run(main())
@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pytest
+
+import embedded_policy
+
+
+OBS_DESC = {"A/Location": {"type": "Continuous", "shape": (3,)}, "A/name": {"type": "Str"}}
+ACTION_DESC = {"Jump": {"type": "action", "keys": ["SpaceBar"]},
+               "MoveRight": {"type": "axis", "keys": [("Gamepad_Left", 0.0), ("D", 1.0), ("A", -1.0)]},
+               "Turn": {"type": "axis", "keys": [("Right", 2.0)]}}
+
+
+def make_spec(b, outputs):
+    return {"inputs": ["A/Location"], "layers": [{"W": np.zeros((3, len(b))), "b": np.asarray(b)}], "outputs": outputs}
+
+
+def test_zero_scale_keys_are_skipped():
+    policy = embedded_policy.EmbeddedPolicy(make_spec([0.0], [{"name": "MoveRight", "type": "axis", "log_std": 0.0}]),
+                                            OBS_DESC, ACTION_DESC)
+    _, axes, _, _ = policy.act(np.zeros((3,), dtype=np.float32), np.random.RandomState(0), deterministic=True)
+    assert axes == [("D", 0.0)]
+    with pytest.raises(ValueError):
+        embedded_policy.EmbeddedPolicy(make_spec([0.0], [{"name": "MoveRight", "type": "axis", "log_std": 0.0}]),
+                                       OBS_DESC, {"MoveRight": {"type": "axis", "keys": [("D", 0.0)]}})
+
+
+def test_log_probs_are_finite_for_saturated_outputs():
+    spec = make_spec([1000.0, 0.0, 50.0], [{"name": "Jump", "type": "action"}, {"name": "MoveRight", "type": "axis", "values": [-1.0, 1.0]}])
+    policy = embedded_policy.EmbeddedPolicy(spec, OBS_DESC, ACTION_DESC)
+    rng = np.random.RandomState(0)
+    for _ in range(20):
+        raw, _, actions, log_prob = policy.act(np.zeros((3,), dtype=np.float32), rng)
+        assert np.isfinite(log_prob)
+
+
+def test_clipped_gaussian_log_prob():
+    # mean 5 -> (almost) always clipped to 1.0, which has (almost) all the probability mass
+    policy = embedded_policy.EmbeddedPolicy(make_spec([5.0], [{"name": "Turn", "type": "axis", "log_std": 0.0}]),
+                                            OBS_DESC, ACTION_DESC)
+    raw, axes, _, log_prob = policy.act(np.zeros((3,), dtype=np.float32), np.random.RandomState(0))
+    assert raw[0] == 1.0 and axes == [("Right", 0.5)]
+    assert log_prob == pytest.approx(0.0, abs=1e-4)
+    # unclipped values keep the Gaussian density
+    policy = embedded_policy.EmbeddedPolicy(make_spec([0.0], [{"name": "Turn", "type": "axis", "log_std": -3.0}]),
+                                            OBS_DESC, ACTION_DESC)
+    raw, _, _, log_prob = policy.act(np.zeros((3,), dtype=np.float32), np.random.RandomState(0), deterministic=True)
+    assert raw[0] == 0.0 and log_prob == pytest.approx(3.0 - 0.5 * math.log(2.0 * math.pi))
+
+
+def test_check_inputs():
+    policy = embedded_policy.EmbeddedPolicy(make_spec([0.0], [{"name": "Turn", "type": "axis"}]), OBS_DESC, ACTION_DESC)
+    policy.check_inputs(OBS_DESC)
+    with pytest.raises(ValueError):
+        policy.check_inputs({"A/Location": {"type": "Continuous", "shape": (2,)}})
+    with pytest.raises(ValueError):
+        policy.check_inputs({"A/name": {"type": "Str"}})
+    with pytest.raises(KeyError):
+        policy.featurize({"A/name": "a"})
@@ -0,0 +1,63 @@
+import numpy as np
+
+import ducandu_server as server
+
+
+def test_step_drains_the_events(engine, connect):
+    connection = connect()
+    engine.push_event("reward", 1.5, source="Level_0")
+    engine.push_event("hit", 3.0, source="Pawn_0", target="Level_0")
+    engine.push_event("reward", 0.5)
+    engine.num_dropped_events = 2
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    events = response["_events"]
+    assert events["types"] == ["reward", "hit"]
+    np.testing.assert_array_equal(events["type"], [0, 1, 0])
+    np.testing.assert_array_equal(events["value"], [1.5, 3.0, 0.5])
+    assert events["type"].dtype == np.int32 and events["value"].dtype == np.float32
+    assert events["source"] == ["Level_0", "Pawn_0", ""] and events["target"] == ["", "Level_0", ""]
+    assert events["num_dropped"] == 2
+    assert response["_reward"] == 2.0 and not response["_is_terminal"]
+    assert not engine.events
+    # each event is only reported once
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    assert len(response["_events"]["type"]) == 0 and response["_reward"] == 0.0
+
+
+def test_terminal_event(engine, connect):
+    engine.push_event("terminal")
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connect())
+    assert response["_is_terminal"] and response["_events"]["types"] == ["terminal"]
+
+
+def test_only_steps_drain(engine, connect):
+    connection = connect()
+    engine.push_event("reward", 1.0)
+    response = server.manage_message({"cmd": "set", "setters": [("Level:Time", 1.0, True)]}, connection)
+    assert response["status"] == "ok" and "_events" not in response
+    assert server.manage_message({"cmd": "get_spec"}, connection)["status"] == "ok"
+    assert len(engine.events) == 1
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    assert response["_reward"] == 1.0
+
+
+def test_reset_drops_the_old_episodes_events(engine, connect):
+    connection = connect()
+    engine.push_event("terminal")
+    server.manage_message({"cmd": "reset"}, connection)
+    engine.run_frames(3)
+    response, = connection.writer.read_messages()
+    assert "_events" not in response
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connection)
+    assert not response["_is_terminal"] and len(response["_events"]["type"]) == 0
+
+
+def test_multi_agent_event_targets(engine, connect):
+    engine.load_world(num_agents=3)
+    engine.push_event("reward", 1.0, target="Pawn_1")
+    engine.push_event("reward", 0.5)  # no agent target -> all agents
+    engine.push_event("reward", 2.0, target="Level_0")
+    engine.push_event("terminal", target="PlayerController_2")
+    response = server.manage_message({"cmd": "step", "num_ticks": 1, "agent_axes": {"W": [0.0] * 3}}, connect())
+    np.testing.assert_array_equal(response["_reward"], [2.5, 3.5, 2.5])
+    np.testing.assert_array_equal(response["_is_terminal"], [False, False, True])
@@ -0,0 +1,99 @@
+import msgpack
+import numpy as np
+import pytest
+
+import ducandu_server as server
+from conftest import FakeWriter
+
+
+IMAGE_RESPONSE = {"status": "ok", "obs_dict": {"Cam/camera": np.zeros((8, 8, 3), dtype=np.uint8), "Obs/Health": 1.0},
+                  "_reward": 0.0, "_is_terminal": False}
+PLAIN_RESPONSE = {"status": "ok", "obs_dict": {"Obs/Health": 1.0}, "_reward": 0.0, "_is_terminal": False}
+
+
+def configure(connection, policy):
+    response = server.manage_message({"cmd": "flow_control", "policy": policy, "high_water": 100, "low_water": 10}, connection)
+    assert response["status"] == "ok" and response["policy"] == policy
+    connection.writer.transport.write_buffer_size = 1000  # the client stopped reading
+
+
+def test_invalid_configurations(engine, connect):
+    connection = connect()
+    assert server.manage_message({"cmd": "flow_control", "policy": "ignore"}, connection)["status"] == "error"
+    assert server.manage_message({"cmd": "flow_control", "high_water": 10, "low_water": 20}, connection)["status"] == "error"
+
+
+def test_disconnect(engine, connect):
+    connection = connect()
+    configure(connection, "disconnect")
+    server.send_message(PLAIN_RESPONSE, connection)
+    assert connection.writer.transport.aborted and connection.writer.data == b""
+
+
+def test_drop_strips_images(engine, connect):
+    connection = connect()
+    configure(connection, "drop")
+    server.send_message(IMAGE_RESPONSE, connection)
+    response, = connection.writer.read_messages()
+    assert response["obs_dict"] == {"Obs/Health": 1.0} and response["dropped_obs"] == ["Cam/camera"]
+    assert connection.num_dropped_obs == 1
+    assert not connection.should_block()
+    # the server's own obs_dict is untouched
+    assert "Cam/camera" in IMAGE_RESPONSE["obs_dict"]
+
+
+def test_drop_falls_back_to_block(engine, connect):
+    connection = connect()
+    configure(connection, "drop")
+    server.send_message(PLAIN_RESPONSE, connection)
+    response, = connection.writer.read_messages()
+    assert response["obs_dict"] == {"Obs/Health": 1.0} and response["dropped_obs"] == []
+    assert connection.should_block()
+    assert connection.get_buffer_stats()["num_drop_fallbacks"] == 1
+
+
+def test_block(engine, connect):
+    connection = connect()
+    configure(connection, "block")
+    server.send_message(IMAGE_RESPONSE, connection)
+    response, = connection.writer.read_messages()
+    assert "Cam/camera" in response["obs_dict"]
+    assert connection.should_block()
+    connection.writer.transport.write_buffer_size = 0
+    assert not connection.should_block()
+
+
+class FakeReader(object):
+    def __init__(self, messages):
+        self.data = [msgpack.packb(message) for message in messages]
+
+    async def read(self, n):
+        return self.data.pop(0) if self.data else b""
+
+
+class SlowClientWriter(FakeWriter):
+    """
+    The client only reads (drains the write buffer) when the server waits for it.
+    """
+    def __init__(self):
+        super(SlowClientWriter, self).__init__()
+        self.num_drains = 0
+
+    def write(self, data):
+        super(SlowClientWriter, self).write(data)
+        self.transport.write_buffer_size += 1000
+
+    async def drain(self):
+        self.num_drains += 1
+        self.transport.write_buffer_size = 0
+
+
+@pytest.mark.parametrize("policy, num_blocked", [("block", 2), ("drop", 1), ("disconnect", 0)])
+def test_command_loop_blocks(engine, policy, num_blocked):
+    writer = SlowClientWriter()
+    # neither response has anything to drop (only the second one is sent while over the high-water mark)
+    messages = [{"cmd": "flow_control", "policy": policy, "high_water": 100, "low_water": 10}, {"cmd": "get_stats"}]
+    engine.run(server.new_client_connected(FakeReader(messages), writer))
+    assert writer.num_drains == num_blocked
+    assert writer.transport.aborted == (policy == "disconnect")
+    assert not server.CONNECTIONS
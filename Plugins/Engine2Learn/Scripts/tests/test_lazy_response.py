@@ -0,0 +1,43 @@
+import msgpack
+import msgpack_numpy as mnp
+import numpy as np
+import pytest
+
+import lazy_response
+
+
+mnp.patch()
+
+
+def make_response():
+    obs_dict = {"Cam/camera": np.arange(300, dtype=np.uint8).reshape((10, 10, 3)), "A/Location": (1.0, 2.0, 3.0),
+                "A/Health": 5.5, "A/bJumping": True, "A/name": "x", "A/f": np.float32(2.5), "A/none": None,
+                "A/arr": np.arange(70000, dtype=np.int64), "A" * 40: 1}
+    return {"status": "ok", "obs_dict": obs_dict, "_reward": 0.5, "_is_terminal": False, "_events": {"types": ["a"]}}
+
+
+def test_lazy_matches_eager():
+    payload = bytearray(msgpack.packb(make_response()))
+    eager = msgpack.unpackb(payload)
+    lazy = lazy_response.decode_lazy(payload)
+    assert lazy["_reward"] == 0.5 and lazy["_events"] == {"types": ["a"]}
+    assert set(lazy["obs_dict"]) == set(eager["obs_dict"])
+    for key, value in eager["obs_dict"].items():
+        assert type(lazy["obs_dict"][key]) == type(value)
+        assert np.array_equal(np.asarray(lazy["obs_dict"][key]), np.asarray(value))
+
+
+def test_entries_are_decoded_on_access_only():
+    payload = bytearray(msgpack.packb(make_response()))
+    obs_dict = lazy_response.decode_lazy(payload)["obs_dict"]
+    assert obs_dict.num_decoded == 0
+    camera = obs_dict["Cam/camera"]
+    assert obs_dict.num_decoded == 1
+    assert obs_dict["Cam/camera"] is camera
+    # zero-copy: the array is a view into the payload
+    assert camera.base is not None and camera.shape == (10, 10, 3)
+
+
+def test_non_map_response_raises():
+    with pytest.raises(ValueError):
+        lazy_response.decode_lazy(msgpack.packb([1, 2, 3]))
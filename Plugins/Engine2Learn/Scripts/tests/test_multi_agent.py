@@ -0,0 +1,64 @@
+import numpy as np
+
+import ducandu_server as server
+import server_utils as util
+
+
+def test_step_drives_all_controllers(engine, connect):
+    engine.load_world(num_agents=2)
+    connection = connect()
+    response = server.manage_message({"cmd": "step", "num_ticks": 1, "agent_axes": {"W": [0.5, -0.5]},
+                                      "agent_actions": {"SpaceBar": [True, False]}}, connection)
+    assert response["status"] == "ok"
+    assert [c.axis_inputs for c in engine.world.controllers] == [[("W", 0.5)], [("W", -0.5)]]
+    assert engine.world.controllers[0].key_inputs[0] == ("SpaceBar", 0)
+    assert engine.world.controllers[1].key_inputs[0] == ("SpaceBar", 1)
+    np.testing.assert_array_equal(response["agent_obs_dict"]["Obs/Health"], [100.0, 100.0])
+    assert response["obs_dict"] == {"World/Time": 0.0}
+    assert response["_reward"].shape == (2,) and response["_is_terminal"].shape == (2,)
+
+
+def test_wrong_number_of_agent_inputs(engine, connect):
+    engine.load_world(num_agents=2)
+    response = server.manage_message({"cmd": "step", "agent_axes": {"W": [0.5]}}, connect())
+    assert response["status"] == "error"
+
+
+def test_agent_events_count_for_their_agent_only(engine, connect):
+    engine.load_world(num_agents=2)
+    engine.tick_hooks.append(lambda world: engine.push_event("reward", 2.0, target="Pawn_1"))
+    engine.tick_hooks.append(lambda world: engine.push_event("reward", 1.0))
+    response = server.manage_message({"cmd": "step", "num_ticks": 1, "agent_axes": {"W": [0.0, 0.0]}}, connect())
+    np.testing.assert_array_equal(response["_reward"], [1.0, 3.0])
+
+
+def test_obs_dict_holds_no_stale_agent_keys(engine):
+    engine.load_world(num_agents=2)
+    util.compile_obs_dict()
+    assert "Obs/Health" in util.compile_obs_dict()["obs_dict"]
+    response = util.compile_multi_agent_obs_dict()
+    assert "Obs/Health" not in response["obs_dict"]
+    assert set(response["agent_obs_dict"]) == {"Obs/Health"}
+
+
+def test_reset_returns_batched_observations(engine, connect):
+    engine.load_world(num_agents=2)
+    connection = connect()
+    assert server.manage_message({"cmd": "reset"}, connection) is None
+    engine.run_frames(3)
+    response, = connection.writer.read_messages()
+    assert response["status"] == "ok"
+    assert response["agent_obs_dict"]["Obs/Health"].shape == (2,)
+
+    # explicitly single-agent
+    server.manage_message({"cmd": "reset", "multi_agent": False}, connection)
+    engine.run_frames(3)
+    response, = connection.writer.read_messages()
+    assert "agent_obs_dict" not in response and "Obs/Health" in response["obs_dict"]
+
+
+def test_reset_restarts_the_reward_accumulators(engine, connect):
+    engine.load_world(num_agents=2)
+    util.compile_multi_agent_obs_dict(reward=5.0)
+    util.reset_rewards(0.0)
+    np.testing.assert_array_equal(util.compile_multi_agent_obs_dict()["_reward"], [0.0, 0.0])
@@ -0,0 +1,38 @@
+import numpy as np
+
+import obs_statistics
+
+
+def test_running_stats_match_numpy():
+    rng = np.random.RandomState(0)
+    data = rng.normal(3.0, 2.0, size=(100, 3))
+    stats = obs_statistics.RunningStats((3,))
+    for batch in np.array_split(data, 7):
+        stats.update(batch)
+    assert stats.count == 100
+    assert np.allclose(stats.mean, data.mean(axis=0))
+    assert np.allclose(stats.var, data.var(axis=0))
+    assert np.allclose(stats.min, data.min(axis=0)) and np.allclose(stats.max, data.max(axis=0))
+
+
+def test_obs_statistics_ignores_non_numeric_and_large():
+    stats = obs_statistics.ObsStatistics(max_size=8)
+    stats.update({"a": (1.0, 2.0, 3.0), "s": "name", "img": np.zeros((4, 4, 3), dtype=np.uint8)})
+    assert set(stats.get_stats().keys()) == {"a"}
+
+
+def test_normalize_and_clip():
+    stats = obs_statistics.ObsStatistics()
+    for value in (0.0, 2.0, 4.0):
+        stats.update({"x": value, "s": "name"})
+    normalized = stats.normalize({"x": 100.0, "s": "name"}, clip=5.0)
+    assert normalized["x"] == np.float32(5.0)
+    assert normalized["s"] == "name"
+
+
+def test_batched_update_and_shape_change():
+    stats = obs_statistics.ObsStatistics()
+    stats.update({"x": np.array([[1.0, 2.0], [3.0, 4.0]])}, batched=True)
+    assert stats.stats["x"].count == 2
+    stats.update({"x": (1.0, 2.0, 3.0)})
+    assert stats.stats["x"].shape == (3,) and stats.stats["x"].count == 1
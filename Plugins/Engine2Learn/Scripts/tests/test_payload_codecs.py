@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import payload_codecs
+
+
+def test_choose_codec_follows_client_preference():
+    assert payload_codecs.choose_codec(["unknown", "zlib", "delta+zlib"]) == "zlib"
+    assert payload_codecs.choose_codec(["unknown"]) is None
+
+
+@pytest.mark.parametrize("codec", payload_codecs.available_codecs())
+def test_roundtrip(codec):
+    rng = np.random.RandomState(0)
+    encoder = payload_codecs.PayloadEncoder(codec, threshold=16)
+    decoder = payload_codecs.PayloadDecoder()
+    frame = rng.randint(0, 256, size=(32, 32, 3)).astype(np.uint8)
+    for _ in range(3):
+        obs_dict = {"Cam/camera": frame, "A/Health": 5.0}
+        encoded = encoder.encode_obs_dict(obs_dict)
+        assert isinstance(encoded["Cam/camera"], dict)
+        assert obs_dict["Cam/camera"] is frame  # the input is not altered
+        decoded = decoder.decode_obs_dict(dict(encoded))
+        assert np.array_equal(decoded["Cam/camera"], frame)
+        assert decoded["A/Health"] == 5.0
+        frame = frame.copy()
+        frame[:4] = 0
+
+
+def test_small_arrays_are_not_compressed():
+    encoder = payload_codecs.PayloadEncoder("zlib", threshold=4096)
+    obs_dict = {"Cam/camera": np.zeros((8, 8, 3), dtype=np.uint8)}
+    assert encoder.encode_obs_dict(obs_dict) is obs_dict
+
+
+def test_delta_frame_without_key_frame_raises():
+    encoder = payload_codecs.PayloadEncoder("delta+zlib", threshold=16)
+    frame = np.ones((16, 16, 3), dtype=np.uint8)
+    encoder.encode_obs_dict({"c": frame})
+    delta = encoder.encode_obs_dict({"c": frame})
+    assert delta["c"]["delta"]
+    with pytest.raises(ValueError):
+        payload_codecs.PayloadDecoder().decode_obs_dict(delta)
+
+
+def test_unknown_codec_raises():
+    with pytest.raises(ValueError):
+        payload_codecs.PayloadEncoder("brotli")
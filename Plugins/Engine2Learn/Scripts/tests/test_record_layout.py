@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import record_layout
+
+
+DESC = {"A/Location": {"type": "Continuous", "shape": (3,), "min": [-100.0] * 3, "max": [100.0] * 3},
+        "A/Health": {"type": "Continuous", "shape": (1,)},
+        "A/bJumping": {"type": "Bool"},
+        "A/name": {"type": "Str"},
+        "Cam/camera": {"type": "IntBox", "shape": (4, 4, 3), "min": 0, "max": 255}}
+
+
+def make_obs():
+    return {"A/Location": (10.0, -20.5, 99.0), "A/Health": 42.0, "A/bJumping": True, "A/name": "x",
+            "Cam/camera": np.arange(48, dtype=np.uint8).reshape((4, 4, 3))}
+
+
+def test_roundtrip_without_quantization():
+    layout = record_layout.RecordLayout(record_layout.compile_fields(DESC))
+    assert "A/name" not in layout.key_set
+    payload, missing, saturated = layout.encode(make_obs(), 0.5, True)
+    assert missing == [] and saturated == []
+    record = layout.decode(payload)
+    obs_dict = layout.to_obs_dict(record)
+    assert np.allclose(obs_dict["A/Location"], make_obs()["A/Location"])
+    assert obs_dict["A/bJumping"]
+    assert np.array_equal(obs_dict["Cam/camera"], make_obs()["Cam/camera"])
+    assert record["_reward"] == np.float32(0.5) and record["_is_terminal"]
+
+
+def test_client_layout_from_description():
+    server = record_layout.RecordLayout(record_layout.compile_fields(DESC, {"A/Location": "int16"}))
+    client = record_layout.RecordLayout(server.describe())
+    payload, _, _ = server.encode(make_obs(), 0.0, False)
+    assert client.dtype == server.dtype
+    assert np.allclose(client.to_obs_dict(client.decode(payload))["A/Location"], make_obs()["A/Location"], atol=0.01)
+
+
+def test_float16_quantization():
+    layout = record_layout.RecordLayout(record_layout.compile_fields(DESC, {"A/Health": "float16"}))
+    payload, _, _ = layout.encode(make_obs(), 0.0, False)
+    assert layout.to_obs_dict(layout.decode(payload))["A/Health"].dtype == np.float32
+
+
+def test_missing_keys_are_zeroed_and_reported():
+    layout = record_layout.RecordLayout(record_layout.compile_fields(DESC))
+    obs_dict = make_obs()
+    del obs_dict["A/Health"]
+    payload, missing, _ = layout.encode(obs_dict, 0.0, False)
+    assert missing == ["A/Health"]
+    assert layout.decode(payload)["A/Health"][0] == 0.0
+
+
+@pytest.mark.parametrize("quantize", [{"A/bJumping": "int16"}, {"A/Health": "int16"}, {"A/Location": "int8"},
+                                      {"B/unknown": "float16"}])
+def test_invalid_quantization_raises(quantize):
+    with pytest.raises(ValueError):
+        record_layout.compile_fields(DESC, quantize)
+
+
+def test_int16_saturation_is_reported():
+    layout = record_layout.RecordLayout(record_layout.compile_fields(DESC, {"A/Location": {"type": "int16", "scale": 0.001}}))
+    payload, _, saturated = layout.encode(make_obs(), 0.0, False)
+    assert saturated == ["A/Location"] and layout.num_saturated == 1
+    assert np.allclose(layout.to_obs_dict(layout.decode(payload))["A/Location"], [10.0, -20.5, 32.767])
+
+
+def test_large_fields_stay_out_of_the_record():
+    layout = record_layout.RecordLayout(record_layout.compile_fields(DESC, max_field_bytes=16))
+    assert "Cam/camera" not in layout.key_set and "A/Location" in layout.key_set
+    with pytest.raises(ValueError):
+        record_layout.compile_fields(DESC, {"A/Location": "int16"}, max_field_bytes=4)
+
+
+def test_size_mismatch_raises():
+    layout = record_layout.RecordLayout(record_layout.compile_fields(DESC))
+    obs_dict = make_obs()
+    obs_dict["A/Location"] = (1.0, 2.0)
+    with pytest.raises(ValueError):
+        layout.encode(obs_dict, 0.0, False)
+
+
+def test_values_of_any_container_type():
+    layout = record_layout.RecordLayout(record_layout.compile_fields(DESC, {"A/Health": "float16"}))
+    obs_dict = make_obs()
+    obs_dict.update({"A/Location": np.array([[10.0, -20.5, 99.0]]), "A/Health": (42.0,), "A/bJumping": np.bool_(True)})
+    payload, _, _ = layout.encode(obs_dict, np.float64(0.5), np.bool_(False))
+    decoded = layout.to_obs_dict(layout.decode(payload))
+    assert np.allclose(decoded["A/Location"], [10.0, -20.5, 99.0]) and decoded["A/Health"][0] == 42.0
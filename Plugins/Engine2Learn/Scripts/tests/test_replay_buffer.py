@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import replay_buffer
+
+
+DESC = {"A/Location": {"type": "Continuous", "shape": (3,)}, "A/name": {"type": "Str"},
+        "Cam/camera": {"type": "IntBox", "shape": (4, 4, 3), "min": 0, "max": 255}}
+
+
+def make_obs(i):
+    return {"A/Location": np.full((3,), i, dtype=np.float32), "Cam/camera": np.full((4, 4, 3), i, dtype=np.uint8)}
+
+
+def test_sum_tree_find_and_total():
+    tree = replay_buffer.SumTree(5)
+    tree.set([0, 1, 2, 3, 4], [1.0, 2.0, 3.0, 0.0, 4.0])
+    assert tree.total == 10.0
+    assert list(tree.find([0.5, 1.5, 3.5, 6.5, 9.5])) == [0, 1, 2, 4, 4]
+
+
+def test_add_and_sample_next_obs():
+    buffer = replay_buffer.PrioritizedReplayBuffer(8, DESC, seed=0)
+    assert "A/name" not in buffer.obs
+    for i in range(5):
+        buffer.add(make_obs(i), 0.0, float(i), False)
+    batch = buffer.sample(16)
+    # the latest transition has no next observation yet -> never sampled
+    assert 4 not in batch["indices"]
+    assert np.array_equal(batch["next_obs"]["A/Location"][:, 0], batch["obs"]["A/Location"][:, 0] + 1)
+    assert np.all(batch["weights"] <= 1.0)
+
+
+def test_priorities_shift_sampling():
+    buffer = replay_buffer.PrioritizedReplayBuffer(8, DESC, alpha=1.0, seed=0)
+    for i in range(6):
+        buffer.add(make_obs(i), 0.0, 0.0, False)
+    buffer.update_priorities([0, 1, 2, 3], [0.0, 0.0, 0.0, 0.0])
+    batch = buffer.sample(64)
+    assert set(batch["indices"]) == {4}
+
+
+def test_frame_stack_stops_at_episode_start():
+    buffer = replay_buffer.PrioritizedReplayBuffer(8, DESC, frame_stack=3, seed=0)
+    for i, terminal in enumerate([False, True, False, False]):
+        buffer.add(make_obs(i), 0.0, 0.0, terminal)
+    stack = buffer._stack_indices(np.array([3, 2]))
+    assert stack.tolist() == [[2, 2, 3], [2, 2, 2]]
+
+
+def test_batch_larger_than_capacity_raises():
+    buffer = replay_buffer.PrioritizedReplayBuffer(2, DESC)
+    with pytest.raises(ValueError):
+        buffer.add_batch({k: np.stack([v] * 3) for k, v in make_obs(0).items()}, [0.0] * 3, [0.0] * 3, [False] * 3)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import ducandu_server as server
+
+
+def upload(connection, inputs=("Obs/Health",)):
+    policy = {"inputs": list(inputs), "layers": [{"W": np.zeros((len(inputs), 1)), "b": np.zeros((1,))}],
+              "outputs": [{"name": "MoveForward", "type": "axis", "log_std": 0.0}]}
+    return server.manage_message({"cmd": "upload_policy", "policy": policy}, connection)
+
+
+def test_rollout(engine, connect):
+    connection = connect()
+    assert upload(connection)["status"] == "ok"
+    response = server.manage_message({"cmd": "rollout", "num_steps": 3, "seed": 1, "num_ticks": 2}, connection)
+    assert response["status"] == "ok" and response["num_steps"] == 3
+    np.testing.assert_array_equal(response["obs"], [[100.0]] * 3)
+    assert response["actions"].shape == (3, 1) and response["log_probs"].shape == (3,)
+    assert engine.world.num_ticks == 6
+
+
+def test_rollout_stops_at_terminal_states(engine, connect):
+    connection = connect()
+    upload(connection)
+    engine.tick_hooks.append(lambda world: engine.push_event("terminal") if world.num_ticks == 2 else None)
+    response = server.manage_message({"cmd": "rollout", "num_steps": 5, "num_ticks": 1}, connection)
+    assert response["num_steps"] == 2
+    np.testing.assert_array_equal(response["is_terminal"], [False, True])
+
+
+@pytest.mark.parametrize("num_steps", [0, -1, 2.5, "3", True, None])
+def test_invalid_num_steps(engine, connect, num_steps):
+    connection = connect()
+    upload(connection)
+    response = server.manage_message({"cmd": "rollout", "num_steps": num_steps}, connection)
+    assert response["status"] == "error" and "num_steps" in response["message"]
+    assert engine.world.num_ticks == 0
+
+
+def test_missing_fields(engine, connect):
+    connection = connect()
+    assert server.manage_message({"cmd": "rollout", "num_steps": 1}, connection)["status"] == "error"
+    upload(connection)
+    assert server.manage_message({"cmd": "rollout"}, connection)["status"] == "error"
+    assert server.manage_message({"cmd": "rollout", "num_steps": 1, "seed": -1}, connection)["status"] == "error"
+
+
+def test_unknown_inputs_are_refused_at_upload(engine, connect):
+    response = upload(connect(), inputs=("Obs/Mana",))
+    assert response["status"] == "error" and "Obs/Mana" in response["message"]
+
+
+def test_inputs_are_checked_against_the_current_spec(engine, connect):
+    connection = connect()
+    upload(connection)
+    # the observer is gone (e.g. the pawn was destroyed) -> error instead of a KeyError
+    engine.observers = engine.observers[1:]
+    engine.observers_generation += 1
+    response = server.manage_message({"cmd": "rollout", "num_steps": 3}, connection)
+    assert response["status"] == "error" and "Obs/Health" in response["message"]
+    assert engine.world.num_ticks == 0
+
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+import ducandu_server as server
+
+
+def test_schedule(engine, connect):
+    connection = connect()
+    response = server.manage_message({"cmd": "schedule", "priority": "monitoring", "frame_budget": 0.01}, connection)
+    assert response["status"] == "ok" and response["priority"] == "monitoring" and response["frame_budget"] == 0.01
+    assert connection.priority == "monitoring"
+    assert set(response["priorities"]) == {"control", "evaluation", "monitoring"}
+
+
+@pytest.mark.parametrize("message", [{"priority": "urgent"}, {"frame_budget": 0}, {"frame_budget": "fast"},
+                                     {"frame_budget": None}])
+def test_invalid_schedule(engine, connect, message):
+    connection = connect()
+    response = server.manage_message(dict(message, cmd="schedule"), connection)
+    assert response["status"] == "error"
+    assert connection.priority == "control" and server.SCHEDULER.frame_budget > 0.0
+
+
+def test_lower_priority_commands_are_deferred(engine, connect):
+    monitor = connect()
+    server.manage_message({"cmd": "schedule", "priority": "monitoring"}, monitor)
+    learner = connect()
+
+    async def main():
+        stats = server.SCHEDULER.submit(monitor.priority, server.handle_message, {"cmd": "get_stats"}, monitor)
+        step = server.SCHEDULER.submit(learner.priority, server.handle_message, {"cmd": "step", "num_ticks": 1}, learner)
+        assert step.done() and not stats.done()
+        assert (await stats)["status"] == "ok"
+    engine.run(main())
+    priorities = server.SCHEDULER.get_stats()["priorities"]
+    assert priorities["control"]["num_commands"] == 1 and priorities["monitoring"]["num_commands"] == 1
+
+
+def test_server_shutdown_closes_the_scheduler(engine, tmp_path):
+    async def main():
+        task = asyncio.ensure_future(server.spawn_unix_server(str(tmp_path / "e2l.sock")))
+        while "unix socket server spawned on {}".format(tmp_path / "e2l.sock") not in engine.logs:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        waiting = server.SCHEDULER.submit("monitoring", lambda: None)
+        await asyncio.gather(task, return_exceptions=True)
+        assert waiting.cancelled()
+        assert "unix socket server ended" in engine.logs
+    engine.run(main())
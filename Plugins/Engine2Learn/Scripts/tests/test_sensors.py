@@ -0,0 +1,72 @@
+import types
+
+import numpy as np
+import pytest
+
+import ducandu_server as server
+import server_utils as util
+from conftest import CLASSES, FakeObserver, FakeRotator, FakeVector
+
+
+@pytest.fixture
+def sensors(engine):
+    """
+    Adds a geometry-sensor observer ("Eyes": 4-ray lidar, 4x4 occupancy grid with 100cm cells) to the first pawn of each
+    (re-)loaded world and a second pawn 100cm in front of it.
+    """
+    def add_sensors(world):
+        engine.observers.append(FakeObserver("Eyes", world.actors[0], bLidar=True, LidarNumRays=4, LidarRange=1000.0,
+                                             LidarHitClasses=[CLASSES.Pawn], bOccupancyGrid=True, OccupancyGridSize=4))
+        engine.spawn(CLASSES.Pawn, "Pawn_9", Location=FakeVector(100.0, 0.0, 0.0))
+    engine.setup_hooks.append(add_sensors)
+    engine.load_world()
+
+
+def hit_ahead(actor_name, distance):
+    """
+    :return: A line trace that only hits (the named actor at the given distance) for rays pointing along +x.
+    """
+    def line_trace(origin, end):
+        if end.x <= origin.x + 1.0:
+            return False, None
+        actor = [a for a in util.CONTEXT.playing_world.actors if a.get_name() == actor_name][0] if actor_name else None
+        return True, types.SimpleNamespace(Distance=distance, Actor=actor)
+    return line_trace
+
+
+def test_ray_directions():
+    np.testing.assert_allclose(util.get_ray_directions(4, 360.0, 0.0), [[1, 0], [0, 1], [-1, 0], [0, -1]], atol=1e-9)
+    np.testing.assert_allclose(util.get_ray_directions(3, 90.0, 90.0)[1], [0, 1], atol=1e-9)
+
+
+@pytest.mark.parametrize("actor_name, hit_class", [("Pawn_9", 1), ("Level_0", 2), (None, 2)])
+def test_lidar(engine, sensors, actor_name, hit_class):
+    engine.line_trace = hit_ahead(actor_name, 99.0)
+    obs_dict = util.compile_obs_dict()["obs_dict"]
+    np.testing.assert_array_equal(obs_dict["Eyes/lidar_distances"], [99.0, 1000.0, 1000.0, 1000.0])
+    np.testing.assert_array_equal(obs_dict["Eyes/lidar_classes"], [hit_class, 0, 0, 0])
+    assert obs_dict["Eyes/lidar_distances"].dtype == np.float32
+
+
+def test_occupancy_grid(engine, sensors):
+    engine.spawn(CLASSES.Pawn, "Pawn_10", Location=FakeVector(1000.0, 0.0, 0.0))  # outside the grid
+    grid = util.compile_obs_dict()["obs_dict"]["Eyes/occupancy"]
+    assert grid.shape == (4, 4, 1) and grid.dtype == np.uint8
+    # the observer's own pawn is left out
+    assert grid.sum() == 1 and grid[3, 2, 0] == 1
+
+
+def test_occupancy_grid_rotates_with_the_observer(engine, sensors):
+    engine.world.actors[0].Rotation = FakeRotator(0.0, 0.0, 90.0)
+    grid = util.compile_obs_dict()["obs_dict"]["Eyes/occupancy"]
+    # the pawn in front (+x) is now to the observer's right
+    assert grid.sum() == 1 and grid[2, 1, 0] == 1
+
+
+def test_spec_and_step(engine, connect, sensors):
+    desc = util.get_spec()["observation_space_desc"]
+    assert desc["Eyes/lidar_distances"] == {"type": "Continuous", "shape": (4,), "min": 0.0, "max": 1000.0}
+    assert desc["Eyes/lidar_classes"]["max"] == 2
+    assert desc["Eyes/occupancy"]["shape"] == (4, 4, 1)
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, connect())
+    assert response["obs_dict"]["Eyes/occupancy"].sum() == 1
@@ -0,0 +1,56 @@
+import server_utils as util
+
+
+def test_handles_are_cached(engine):
+    context = util.CONTEXT
+    world = context.playing_world
+    assert world is engine.world
+    assert context.controller is engine.world.controllers[0]
+    assert [obs_name for _, _, obs_name in context.observers] == ["Obs", "World"]
+    observers = context.observers
+    assert context.observers is observers
+    assert context.generation == 0
+
+
+def test_observers_are_rescanned_on_generation_change(engine):
+    context = util.CONTEXT
+    observers = context.observers
+    engine.add_observer(engine.observers[0].__class__("Extra", engine.world.actors[-1], ["Time"]))
+    assert context.observers is not observers
+    assert [obs_name for _, _, obs_name in context.observers] == ["Obs", "World", "Extra"]
+
+
+def test_invalid_world_is_dropped(engine):
+    context = util.CONTEXT
+    old_world = context.playing_world
+    engine.load_world()
+    assert context.playing_world is engine.world is not old_world
+    assert context.generation == 1
+
+
+def test_nothing_is_cached_while_the_restart_is_pending(engine):
+    context = util.CONTEXT
+    old_world, old_controller = context.playing_world, context.controller
+    context.restart_level()
+    # UE has not restarted the level yet: the handles belong to the old level (and must not stay cached)
+    assert context.check_restart()
+    assert context.playing_world is old_world
+    generation = context.generation
+    assert context.controller is old_controller
+    assert context.generation > generation
+
+    engine.run(context.wait_for_restart())
+    assert not context.check_restart()
+    assert context.playing_world is engine.world is not old_world
+    assert context.controller is engine.world.controllers[0]
+    generation = context.generation
+    assert context.controller is engine.world.controllers[0]
+    assert context.generation == generation
+
+
+def test_restart_drains_the_old_episodes_events(engine):
+    context = util.CONTEXT
+    engine.push_event("reward", 1.0)
+    context.restart_level()
+    engine.run(context.wait_for_restart())
+    assert engine.events == []
@@ -0,0 +1,45 @@
+import json
+import threading
+
+import span_tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = span_tracer.SpanTracer("test")
+    with tracer.span("a"):
+        pass
+    assert tracer.get_stats()["num_spans"] == 0
+
+
+def test_spans_per_thread_and_chrome_events(tmp_path):
+    tracer = span_tracer.SpanTracer("test")
+    tracer.start()
+    with tracer.span("outer", {"cmd": "step"}):
+        with tracer.span("inner"):
+            pass
+    thread = threading.Thread(target=lambda: tracer.span("other").__enter__().__exit__(None, None, None))
+    thread.start()
+    thread.join()
+    events = [e for e in tracer.get_events() if e["ph"] == "X"]
+    assert sorted(e["name"] for e in events) == ["inner", "other", "outer"]
+    outer = [e for e in events if e["name"] == "outer"][0]
+    inner = [e for e in events if e["name"] == "inner"][0]
+    assert outer["args"] == {"cmd": "step"}
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert tracer.get_stats()["num_threads"] == 2
+
+    path = str(tmp_path / "trace.json")
+    span_tracer.write_trace(path, tracer.get_events(), [])
+    with open(path) as f:
+        assert len(json.load(f)["traceEvents"]) == len(tracer.get_events())
+
+
+def test_ring_buffer_overwrites_oldest():
+    tracer = span_tracer.SpanTracer("test", capacity=4)
+    tracer.start()
+    for i in range(10):
+        with tracer.span(str(i)):
+            pass
+    stats = tracer.get_stats()
+    assert stats["num_spans"] == 4 and stats["num_overwritten"] == 6
+    assert [e["name"] for e in tracer.get_events() if e["ph"] == "X"] == ["6", "7", "8", "9"]
@@ -0,0 +1,124 @@
+import asyncio
+import socket
+
+import msgpack
+import numpy as np
+import pytest
+
+import ducandu_client
+import ducandu_server as server
+
+
+def pack(message):
+    payload = msgpack.packb(message)
+    return bytes("{:08d}".format(len(payload)), encoding="ascii") + payload
+
+
+@pytest.fixture
+def spectator(engine, connect):
+    connection = connect("spectator")
+    assert server.manage_message({"cmd": "subscribe"}, connection)["status"] == "ok"
+    return connection
+
+
+def test_steps_are_broadcast(engine, connect, spectator):
+    learner = connect()
+    response = server.manage_message({"cmd": "step", "num_ticks": 1}, learner)
+    assert spectator.writer.data == b""  # only after the learner's response has been sent
+    engine.run_frames(2)
+    frame, = spectator.writer.read_messages()
+    assert frame["cmd"] == "broadcast" and frame["seq"] == 1
+    assert frame["obs_dict"] == response["obs_dict"] and frame["_reward"] == response["_reward"]
+    assert server.SPECTATORS == {spectator}
+
+
+def test_every_nth_frame(engine, connect):
+    spectator = connect("spectator")
+    server.manage_message({"cmd": "subscribe", "every": 2}, spectator)
+    learner = connect()
+    for _ in range(4):
+        server.manage_message({"cmd": "step", "num_ticks": 1}, learner)
+        engine.run_frames(2)
+    assert [frame["seq"] for frame in spectator.writer.read_messages()] == [1, 3]
+
+
+def test_frames_are_snapshots(engine, connect, spectator):
+    engine.load_world(num_agents=2)
+    response = server.manage_message({"cmd": "step", "num_ticks": 1, "agent_axes": {"W": [0.0, 0.0]}}, connect())
+    # e.g. the next compile reuses/changes the arrays before the frame got serialized
+    response["agent_obs_dict"]["Obs/Health"][:] = -1.0
+    response["obs_dict"]["World/Time"] = -1.0
+    engine.run_frames(2)
+    frame, = spectator.writer.read_messages()
+    np.testing.assert_array_equal(frame["agent_obs_dict"]["Obs/Health"], [100.0, 100.0])
+    assert frame["obs_dict"]["World/Time"] == 0.0
+
+
+@pytest.mark.parametrize("cmd", ["step", "reset", "get_spec", "get_stats", "subscribe", "negotiate_compression"])
+def test_spectators_may_only_unsubscribe(engine, spectator, cmd):
+    response = server.manage_message({"cmd": cmd}, spectator)
+    assert response["status"] == "error" and "spectator" in response["message"]
+
+
+def test_act_on_a_spectator_connection_gets_no_response(engine, spectator):
+    assert server.manage_message({"cmd": "act", "axes": [("W", 1.0)]}, spectator) is None
+
+
+def test_unsubscribe(engine, connect, spectator):
+    learner = connect()
+    server.manage_message({"cmd": "step", "num_ticks": 1}, learner)
+    engine.run_frames(2)
+    response = server.manage_message({"cmd": "unsubscribe"}, spectator)
+    assert response["status"] == "ok" and response["num_sent"] == 1
+    assert not server.SPECTATORS
+    assert server.manage_message({"cmd": "get_spec"}, spectator)["status"] == "ok"
+    assert server.manage_message({"cmd": "unsubscribe"}, spectator)["status"] == "error"
+    server.manage_message({"cmd": "step", "num_ticks": 1}, learner)
+    engine.run_frames(2)
+    assert len(spectator.writer.read_messages()) == 1  # only the first step's frame
+
+
+def test_streaming_connections_cant_subscribe(engine, connect):
+    connection = connect()
+    server.manage_message({"cmd": "stream"}, connection)
+    assert server.manage_message({"cmd": "subscribe"}, connection)["status"] == "error"
+    server.manage_message({"cmd": "stream", "enabled": False}, connection)
+
+
+def test_client_request_keeps_broadcast_frames():
+    server_socket, client_socket = socket.socketpair()
+    client = ducandu_client.DucanduClient(port=0)
+    client.socket = client_socket
+    try:
+        server_socket.sendall(pack({"status": "ok", "cmd": "broadcast", "seq": 1}) +
+                              pack({"status": "ok", "cmd": "broadcast", "seq": 2}) + pack({"status": "ok", "num_sent": 2}))
+        assert client.unsubscribe() == {"status": "ok", "num_sent": 2}
+        assert msgpack.unpackb(server_socket.recv(1024)) == {"cmd": "unsubscribe"}
+        assert client.recv_broadcast()["seq"] == 1
+        server_socket.sendall(pack({"status": "ok", "cmd": "broadcast", "seq": 3}))
+        assert client.recv_broadcast()["seq"] == 2
+        assert client.recv_broadcast()["seq"] == 3
+    finally:
+        client.close()
+        server_socket.close()
+
+
+def test_async_client_hands_out_broadcast_frames_separately():
+    async def main():
+        protocol = ducandu_client._ResponseProtocol(ducandu_client.decode_response)
+        data = pack({"status": "ok", "cmd": "broadcast", "seq": 1}) + pack({"status": "ok", "num_sent": 1})
+        buffer = protocol.get_buffer(len(data))
+        buffer[:len(data)] = data
+        protocol.buffer_updated(len(data))
+        assert (await protocol.next_response()) == {"status": "ok", "num_sent": 1}
+        assert (await protocol.next_broadcast())["seq"] == 1
+        waiter = protocol.next_broadcast()
+        protocol.connection_lost(None)
+        with pytest.raises(ConnectionError):
+            await waiter
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
@@ -0,0 +1,85 @@
+import pytest
+
+import ducandu_server as server
+
+
+@pytest.fixture
+def streamer(engine, connect):
+    """
+    A connection streaming at (practically) one frame per engine frame.
+    """
+    connection = connect()
+    response = server.manage_message({"cmd": "stream", "rate": 1e6}, connection)
+    assert response["status"] == "ok" and response["rate"] == 1e6
+    assert not engine.world.paused
+    return connection
+
+
+def test_frames(engine, streamer):
+    engine.push_event("reward", 2.0)
+    engine.run_frames(3)
+    frames = streamer.writer.read_messages()
+    assert len(frames) >= 3 and all(frame["cmd"] == "stream" for frame in frames)
+    assert [frame["seq"] for frame in frames] == list(range(1, len(frames) + 1))
+    assert frames[0]["obs_dict"]["Obs/Health"] == 100.0 and frames[0]["last_action"] is None
+    # the stream is the event queue's consumer
+    assert frames[0]["_reward"] == 2.0 and frames[0]["_events"]["types"] == ["reward"]
+    assert len(frames[1]["_events"]["type"]) == 0
+
+
+def test_act(engine, streamer):
+    controller = engine.world.controllers[0]
+    assert server.manage_message({"cmd": "act", "axes": [("W", 0.5)], "actions": [("SpaceBar", True)], "seq": 7,
+                                  "client_time": 1.5}, streamer) is None
+    assert controller.key_inputs == [("SpaceBar", 0)]
+    engine.run_frames(2)
+    # axis values are held
+    assert len(controller.axis_inputs) >= 2 and set(controller.axis_inputs) == {("W", 0.5)}
+    frame = streamer.writer.read_messages()[-1]
+    assert frame["last_action"]["seq"] == 7 and frame["last_action"]["client_time"] == 1.5
+    assert "error" not in frame["last_action"]
+
+
+def test_act_without_controller(engine, connect):
+    engine.load_world(num_agents=0)
+    connection = connect()
+    server.manage_message({"cmd": "stream", "rate": 1e6}, connection)
+    assert server.manage_message({"cmd": "act", "axes": [("W", 1.0)], "seq": 1}, connection) is None
+    engine.run_frames(1)
+    frame = connection.writer.read_messages()[-1]
+    assert "player controller" in frame["last_action"]["error"]
+
+
+def test_act_without_stream(engine, connect):
+    connection = connect()
+    assert server.manage_message({"cmd": "act", "axes": [("W", 1.0)]}, connection) is None
+    engine.run_frames(1)
+    assert connection.writer.data == b"" and not engine.world.controllers[0].axis_inputs
+    assert any("only allowed in streaming mode" in log for log in engine.logs)
+
+
+@pytest.mark.parametrize("cmd", ["step", "rollout"])
+def test_lockstep_commands_are_refused_while_streaming(engine, connect, streamer, cmd):
+    response = server.manage_message({"cmd": cmd, "num_steps": 1}, connect())
+    assert response["status"] == "error" and "stream" in response["message"]
+    assert engine.world.num_ticks == 0
+
+
+def test_stop(engine, connect, streamer):
+    engine.run_frames(2)
+    response = server.manage_message({"cmd": "stream", "enabled": False}, streamer)
+    assert response["status"] == "ok" and response["num_sent"] >= 2 and response["num_frames"] >= response["num_sent"]
+    assert engine.world.paused and streamer.stream is None
+    engine.run_frames(2)
+    assert len(streamer.writer.read_messages()) == response["num_sent"]
+    # lockstep again
+    assert server.manage_message({"cmd": "step", "num_ticks": 1}, connect())["status"] == "ok"
+    assert server.manage_message({"cmd": "stream", "enabled": False}, streamer)["status"] == "error"
+
+
+@pytest.mark.parametrize("rate", [0, -1.0, "fast", None])
+def test_invalid_rate(engine, connect, rate):
+    connection = connect()
+    response = server.manage_message({"cmd": "stream", "rate": rate}, connection)
+    assert response["status"] == "error" and "rate" in response["message"]
+    assert connection.stream is None
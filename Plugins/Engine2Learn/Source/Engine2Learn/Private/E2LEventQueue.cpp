@@ -0,0 +1,71 @@
+// Fill out your copyright notice in the Description page of Project Settings.
+
+#include "E2LEventQueue.h"
+
+E2LEventQueue& E2LEventQueue::Get()
+{
+	static E2LEventQueue *EventQueue = nullptr;
+	if (!EventQueue)
+	{
+		EventQueue = new E2LEventQueue();
+		EventQueue->Events.SetNum(Capacity);
+	}
+
+	return *EventQueue;
+}
+
+void E2LEventQueue::Push(const FE2LGameEvent &Event)
+{
+	E2LEventQueue &Queue = E2LEventQueue::Get();
+	// full -> overwrite the oldest event
+	if (Queue.Num == Capacity)
+	{
+		Queue.Head = (Queue.Head + 1) % Capacity;
+		Queue.Num--;
+		Queue.NumDropped++;
+	}
+	Queue.Events[(Queue.Head + Queue.Num) % Capacity] = Event;
+	Queue.Num++;
+}
+
+TArray<FE2LGameEvent> E2LEventQueue::Drain()
+{
+	E2LEventQueue &Queue = E2LEventQueue::Get();
+	TArray<FE2LGameEvent> Drained;
+	Drained.Reserve(Queue.Num);
+	for (int32 i = 0; i < Queue.Num; i++)
+	{
+		Drained.Add(Queue.Events[(Queue.Head + i) % Capacity]);
+	}
+	Queue.Head = 0;
+	Queue.Num = 0;
+	Queue.NumDropped = 0;
+	return Drained;
+}
+
+int32 E2LEventQueue::GetNumDropped()
+{
+	return E2LEventQueue::Get().NumDropped;
+}
+
+
+void UE2LEventLibrary::PushEvent(FName Type, float Value, AActor *Source, AActor *Target)
+{
+	FE2LGameEvent Event;
+	Event.Type = Type;
+	Event.Value = Value;
+	Event.Source = Source ? Source->GetName() : FString();
+	Event.Target = Target ? Target->GetName() : FString();
+	Event.Frame = (int32)GFrameCounter;
+	E2LEventQueue::Push(Event);
+}
+
+TArray<FE2LGameEvent> UE2LEventLibrary::DrainEvents()
+{
+	return E2LEventQueue::Drain();
+}
+
+int32 UE2LEventLibrary::GetNumDroppedEvents()
+{
+	return E2LEventQueue::GetNumDropped();
+}
@@ -202,6 +202,12 @@ UE2LObserver::UE2LObserver()
 	BillboardComponent->AttachToComponent(this, FAttachmentTransformRules::KeepRelativeTransform);
 
 	bEnabled = true;
+
+	LidarNumRays = 16;
+	LidarFieldOfView = 360.0f;
+	LidarRange = 2000.0f;
+	OccupancyGridSize = 32;
+	OccupancyGridCellSize = 100.0f;
 }
 
 UE2LObserver::~UE2LObserver()
@@ -215,6 +221,16 @@ TArray<UE2LObserver *> UE2LObserver::GetRegisteredObservers()
 	return E2LObserversManager::GetObservers();
 }
 
+int32 UE2LObserver::GetObserversGeneration()
+{
+	return E2LObserversManager::GetGeneration();
+}
+
+int32 UE2LObserver::GetActorSpawnGeneration()
+{
+	return E2LObserversManager::GetActorSpawnGeneration();
+}
+
 
 // Called when the game starts
 void UE2LObserver::BeginPlay()
@@ -243,6 +259,9 @@ void UE2LObserver::OnAttachmentChanged()
 {
 	Super::OnAttachmentChanged();
 
+	// parent changed -> python-side observer caches are stale
+	E2LObserversManager::BumpGeneration();
+
 	USceneComponent *Parent = GetAttachParent();
 	if (Parent)
 	{
@@ -16,11 +16,15 @@ E2LObserversManager& E2LObserversManager::Get()
 void E2LObserversManager::RegisterObserver(UE2LObserver *Observer)
 {
 	E2LObserversManager::Get().Observers.Add(Observer);
+	BumpGeneration();
 }
 
 void E2LObserversManager::UnregisterObserver(UE2LObserver *Observer)
 {
-	E2LObserversManager::Get().Observers.Remove(Observer);
+	if (E2LObserversManager::Get().Observers.Remove(Observer) > 0)
+	{
+		BumpGeneration();
+	}
 }
 
 TArray<UE2LObserver *> E2LObserversManager::GetObservers()
@@ -28,3 +32,29 @@ TArray<UE2LObserver *> E2LObserversManager::GetObservers()
 	return E2LObserversManager::Get().Observers;
 }
 
+
+int32 E2LObserversManager::GetGeneration()
+{
+	return E2LObserversManager::Get().Generation;
+}
+
+void E2LObserversManager::BumpGeneration()
+{
+	E2LObserversManager::Get().Generation++;
+}
+
+int32 E2LObserversManager::GetActorSpawnGeneration()
+{
+	return E2LObserversManager::Get().ActorSpawnGeneration;
+}
+
+void E2LObserversManager::OnPostWorldInitialization(UWorld *World, const UWorld::InitializationValues IVS)
+{
+	// the handler is owned by the world (and goes away with it)
+	World->AddOnActorSpawnedHandler(FOnActorSpawned::FDelegate::CreateStatic(&E2LObserversManager::OnActorSpawned));
+}
+
+void E2LObserversManager::OnActorSpawned(AActor *Actor)
+{
+	E2LObserversManager::Get().ActorSpawnGeneration++;
+}
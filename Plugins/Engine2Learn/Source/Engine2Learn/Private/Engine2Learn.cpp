@@ -9,6 +9,7 @@
 
 #include "Engine2LearnSettings.h"
 #include "E2LObserver.h"
+#include "E2LObserversManager.h"
 
 #define LOCTEXT_NAMESPACE "FEngine2LearnModule"
 
@@ -39,6 +40,9 @@ void FEngine2LearnModule::StartupModule()
 		//Custom detail views
 		PropertyModule->RegisterCustomPropertyTypeLayout("E2LObservedProperty", FOnGetPropertyTypeCustomizationInstance::CreateStatic(&FE2LObservedPropertyDetails::MakeInstance));
 	}
+
+	// count actor spawns in all worlds (lets the python server re-scan its actor class index only after spawns)
+	PostWorldInitializationHandle = FWorldDelegates::OnPostWorldInitialization.AddStatic(&E2LObserversManager::OnPostWorldInitialization);
 }
 
 void FEngine2LearnModule::ShutdownModule()
@@ -55,6 +59,8 @@ void FEngine2LearnModule::ShutdownModule()
 	{
 		PropertyModule->UnregisterCustomPropertyTypeLayout("E2LObservedProperty");
 	}
+
+	FWorldDelegates::OnPostWorldInitialization.Remove(PostWorldInitializationHandle);
 }
 
 #undef LOCTEXT_NAMESPACE
@@ -0,0 +1,80 @@
+// Fill out your copyright notice in the Description page of Project Settings.
+
+#pragma once
+
+#include "CoreMinimal.h"
+#include "GameFramework/Actor.h"
+#include "Kismet/BlueprintFunctionLibrary.h"
+#include "E2LEventQueue.generated.h"
+
+// a typed gameplay event (e.g. hit, kill, pickup, reward, terminal) pushed by game code or Blueprints
+USTRUCT(BlueprintType)
+struct FE2LGameEvent
+{
+	GENERATED_BODY()
+
+	UPROPERTY(BlueprintReadWrite)
+	FName Type;
+
+	UPROPERTY(BlueprintReadWrite)
+	float Value;
+
+	// names of the actors involved (if any)
+	UPROPERTY(BlueprintReadWrite)
+	FString Source;
+
+	UPROPERTY(BlueprintReadWrite)
+	FString Target;
+
+	// the engine frame the event was pushed in
+	UPROPERTY(BlueprintReadWrite)
+	int32 Frame;
+
+	FE2LGameEvent()
+	{
+		Value = 0.0f;
+		Frame = 0;
+	}
+
+};
+
+/**
+ * Fixed-capacity ring buffer of gameplay events (the oldest events are overwritten once full),
+ * drained by the python server on each step.
+ */
+class ENGINE2LEARN_API E2LEventQueue
+{
+public:
+	static E2LEventQueue &Get();
+
+	static void Push(const FE2LGameEvent &Event);
+	static TArray<FE2LGameEvent> Drain();
+	static int32 GetNumDropped();
+
+	static const int32 Capacity = 4096;
+
+private:
+	TArray<FE2LGameEvent> Events;
+	int32 Head = 0;  // index of the oldest event
+	int32 Num = 0;
+	int32 NumDropped = 0;  // events overwritten before they could be drained (since the last drain)
+};
+
+UCLASS()
+class ENGINE2LEARN_API UE2LEventLibrary : public UBlueprintFunctionLibrary
+{
+	GENERATED_BODY()
+
+public:
+	// pushes an event into the queue (it is sent to the ML client with the next step's response)
+	UFUNCTION(BlueprintCallable, Category = Engine2Learn)
+	static void PushEvent(FName Type, float Value, AActor *Source, AActor *Target);
+
+	// returns (and removes) all queued events (oldest first)
+	UFUNCTION()
+	static TArray<FE2LGameEvent> DrainEvents();
+
+	// the number of events that were dropped (queue full) since the last DrainEvents call
+	UFUNCTION()
+	static int32 GetNumDroppedEvents();
+};
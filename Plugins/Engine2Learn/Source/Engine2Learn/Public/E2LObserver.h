@@ -79,6 +79,37 @@ public:
 	UPROPERTY(EditAnywhere)
 	bool bScreenCapture;
 
+	// lidar-style sensor: a horizontal fan of line traces (distances and hit classes) starting at this observer
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	bool bLidar;
+
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	int32 LidarNumRays;
+
+	// the angle (degrees) covered by the fan of rays (centered around the observer's forward direction)
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	float LidarFieldOfView;
+
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	float LidarRange;
+
+	// hit class i+1 is reported for actors of LidarHitClasses[i] (0=no hit, len+1=any other actor)
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	TArray<TSubclassOf<AActor>> LidarHitClasses;
+
+	// top-down occupancy grid of actor positions (one channel per class) centered on (and rotated with) this observer
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	bool bOccupancyGrid;
+
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	int32 OccupancyGridSize;
+
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	float OccupancyGridCellSize;
+
+	UPROPERTY(EditAnywhere, Category = Sensors)
+	TArray<TSubclassOf<AActor>> OccupancyClasses;
+
 	UPROPERTY(EditAnywhere, Category = ObservedProperties)
 	TArray<FE2LObservedProperty> ObservedProperties;
 
@@ -88,6 +119,14 @@ public:
 	UFUNCTION()
 	static TArray<UE2LObserver *> GetRegisteredObservers();
 
+	// cheap change-detection for python-side caches of the registered observers
+	UFUNCTION()
+	static int32 GetObserversGeneration();
+
+	// cheap change-detection for python-side caches of the playing world's actors (bumped on each actor spawn)
+	UFUNCTION()
+	static int32 GetActorSpawnGeneration();
+
 	void OnAttachmentChanged() override;
 
 	void PostEditChangeProperty(FPropertyChangedEvent & PropertyChangedEvent);
@@ -3,6 +3,7 @@
 #pragma once
 
 #include "CoreMinimal.h"
+#include "Engine/World.h"
 #include "E2LObserver.h"
 
 /**
@@ -17,6 +18,17 @@ public:
 	static void UnregisterObserver(UE2LObserver *);
 	static TArray<UE2LObserver *> GetObservers();
 
+	// generation counter: bumped whenever the set of observers (or one of their attachments) changes
+	static int32 GetGeneration();
+	static void BumpGeneration();
+
+	// spawn counter: bumped whenever an actor gets spawned in any world (hooked into each world on its initialization)
+	static int32 GetActorSpawnGeneration();
+	static void OnPostWorldInitialization(UWorld *World, const UWorld::InitializationValues IVS);
+	static void OnActorSpawned(AActor *Actor);
+
 private:
 	TArray<UE2LObserver *> Observers;
+	int32 Generation = 0;
+	int32 ActorSpawnGeneration = 0;
 };
@@ -4,8 +4,40 @@
 
 #include "CoreMinimal.h"
 #include "UObject/NoExportTypes.h"
+#include "GameFramework/Actor.h"
 #include "Engine2LearnSettings.generated.h"
 
+// observes some properties of all actors of one class at once (as fixed-capacity padded arrays plus a validity mask and count)
+USTRUCT()
+struct FE2LClassObserver
+{
+	GENERATED_BODY()
+
+	// the prefix of the obs keys ([Name]/[PropName], [Name]/_mask, [Name]/_count)
+	UPROPERTY(EditAnywhere, config)
+	FString Name;
+
+	UPROPERTY(EditAnywhere, config)
+	TSubclassOf<AActor> ActorClass;
+
+	UPROPERTY(EditAnywhere, config)
+	TArray<FString> PropNames;
+
+	// the capacity of the padded arrays
+	UPROPERTY(EditAnywhere, config)
+	int32 MaxActors;
+
+	UPROPERTY(EditAnywhere, config)
+	bool bEnabled;
+
+	FE2LClassObserver()
+	{
+		MaxActors = 32;
+		bEnabled = true;
+	}
+
+};
+
 /**
  * 
  */
@@ -19,4 +51,12 @@ class ENGINE2LEARN_API UEngine2LearnSettings : public UObject
 	
 		UPROPERTY(EditAnywhere, config, Category = Custom)
 		uint32 Port;
+
+		// optional path of a unix domain socket to listen on (for learners running on the same machine as the game)
+		UPROPERTY(EditAnywhere, config, Category = Custom)
+		FString SocketPath;
+
+		// observers declared by actor class (instead of one E2LObserver component per actor)
+		UPROPERTY(EditAnywhere, config, Category = Custom)
+		TArray<FE2LClassObserver> ClassObservers;
 };